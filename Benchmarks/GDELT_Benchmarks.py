@@ -0,0 +1,1178 @@
+"""
+BENCHMARKS FOR THE GDELT PROCESSING
+==========================================
+In this file the classes of the processing are timed on fixture files
+The fixture files are synthetic GDELT zips (same layout as the files on the GDELT site)
+written to a local folder, so no network is needed
+
+Run it as:
+    python Benchmarks/GDELT_Benchmarks.py <benchmark name> [--rows N] [--repeat N]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# ================== Resolve paths relative to this script ======================
+
+# Path of this file: .../Benchmarks/GDELT_Benchmarks.py, the repository is one folder up
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Path to dictionary: BASE, folder, file
+DICT_PATH = os.path.join(BASE_DIR, "Dictionary", "Dictionaries.xlsx")
+
+# Path to the fixture files: BASE, folder
+FIXTURE_DIR = os.path.join(BASE_DIR, "Output", "BenchmarkFixtures")
+
+# Timestamp used for the fixture files
+FIXTURE_TIMESTAMP = "20251201143000"
+
+
+# ================== Fixture files ==============================================
+
+# Themes and countries used to fill the synthetic rows
+FIXTURE_THEMES = [
+    "EPU_ECONOMY_HISTORIC", "EPU_POLICY", "TAX_FNCACT_MINISTER", "TAX_POLICY", "WB_678_DIGITAL",
+    "LEADER", "ECON_STOCKMARKET", "GENERAL_GOVERNMENT", "CRISISLEX_CRISISLEXREC", "MEDIA_MSM"
+]
+FIXTURE_COUNTRIES = ["FR", "GM", "IT", "SP", "US", "UK", "CH", "PL", "NL", "BE"]
+# Themes without the EPU/TAX prefixes and countries outside DEFAULT_COUNTRY_CODES (rows the default filters drop)
+FIXTURE_OTHER_THEMES = ["WB_678_DIGITAL", "LEADER", "ECON_STOCKMARKET", "GENERAL_GOVERNMENT", "CRISISLEX_CRISISLEXREC", "MEDIA_MSM"]
+FIXTURE_OTHER_COUNTRIES = ["US", "UK", "CH", "JA", "BR"]
+
+
+def _fixture_url(timestamp: str, i: int) -> str:
+    return f"https://news{i % 97}.example.com/{timestamp}/article-{i % 400}.html"
+
+
+def _gkg_rows(timestamp: str, rows: int, rng: random.Random, match_share: float = None) -> list:
+    out = []
+    for i in range(rows):
+        themes_pool, countries_pool = FIXTURE_THEMES, FIXTURE_COUNTRIES
+        if match_share is not None and rng.random() >= match_share:
+            # Outside the default filters: no EPU/TAX theme or no country of DEFAULT_COUNTRY_CODES
+            if rng.random() < 0.5:
+                themes_pool = FIXTURE_OTHER_THEMES
+            else:
+                countries_pool = FIXTURE_OTHER_COUNTRIES
+        themes = rng.sample(themes_pool, 4)
+        v1 = ";".join(themes) + ";"
+        v2 = ";".join(f"{t},{rng.randint(1, 5000)}" for t in themes + themes[:2]) + ";"
+        locations = ";".join(
+            f"4#City {c}, Region, Country#{c}#{c}{rng.randint(1, 40):02d}#1234#{rng.uniform(-60, 60):.4f}#{rng.uniform(-120, 120):.4f}#-123456#{rng.randint(1, 5000)}"
+            for c in rng.sample(countries_pool, 3)
+        )
+        tone = f"{rng.uniform(-8, 8):.6f},2.1,3.4,5.5,22.1,0.4,{rng.randint(100, 2000)}"
+        gcam = ",".join(f"c{k}.{k % 7}:{rng.randint(1, 30)}" for k in range(60))
+        cols = [
+            f"{timestamp}-{i}", timestamp, "1", f"news{i % 97}.example.com", _fixture_url(timestamp, i),
+            "", "", v1, v2, "", locations, "", "", "", "", tone, f"wc:{rng.randint(100, 2000)},{gcam}",
+            "", "", "", "", "", "", "", "", "", ""
+        ]
+        out.append("\t".join(cols))
+    return out
+
+
+def _export_rows(timestamp: str, rows: int, first_id: int, rng: random.Random, match_share: float = None) -> list:
+    out = []
+    for i in range(rows):
+        # Actor1Geo_CountryCode (the export country filter) outside DEFAULT_COUNTRY_CODES for the rows that do not match
+        actor1_countries = FIXTURE_COUNTRIES
+        if match_share is not None and rng.random() >= match_share:
+            actor1_countries = FIXTURE_OTHER_COUNTRIES
+        cols = [""] * 61
+        cols[0] = str(first_id + i)
+        cols[1], cols[2], cols[3], cols[4] = timestamp[:8], timestamp[:6], timestamp[:4], "2025.9151"
+        cols[5], cols[6] = "USAGOV", "UNITED STATES"
+        cols[25], cols[26], cols[27], cols[28], cols[29] = "1", "043", "043", "04", "1"
+        cols[30] = f"{rng.uniform(-10, 10):.1f}"
+        cols[31], cols[32], cols[33] = str(rng.randint(1, 20)), "1", str(rng.randint(1, 20))
+        cols[34] = f"{rng.uniform(-8, 8):.6f}"
+        for start in (35, 43, 52):
+            country = rng.choice(actor1_countries if start == 35 else FIXTURE_COUNTRIES)
+            cols[start:start + 8] = [
+                "4", f"City, Region, {country}", country, f"{country}01", "", f"{rng.uniform(-60, 60):.4f}",
+                f"{rng.uniform(-120, 120):.4f}", str(rng.randint(-900000, 900000))
+            ]
+        cols[59] = timestamp
+        cols[60] = _fixture_url(timestamp, i)
+        out.append("\t".join(cols))
+    return out
+
+
+def _mentions_rows(timestamp: str, rows: int, first_id: int, rng: random.Random) -> list:
+    out = []
+    for i in range(rows):
+        cols = [
+            str(first_id + rng.randint(0, rows - 1)), timestamp, timestamp, "1", f"news{i % 97}.example.com",
+            _fixture_url(timestamp, i), "1", "-1", "-1", "120", "1", "50", str(rng.randint(500, 9000)),
+            f"{rng.uniform(-8, 8):.6f}", "", ""
+        ]
+        out.append("\t".join(cols))
+    return out
+
+
+def write_fixture_zips(folder: str, timestamps: list, rows: int = 2000, seed: int = 1, match_share: float = None) -> dict:
+    """
+    Write synthetic gkg, mentions and export zips for the given timestamps.
+
+    Inputs:
+        folder: Folder where the zips are written (created if needed)
+        timestamps: Timestamps in format YYYYMMDDHHMMSS
+        rows: Rows per file
+        seed: Seed of the random generator (same seed = same files)
+        match_share: Optional share of the gkg and export rows that can pass the default country and themes filters
+                     (the others get only other themes or other countries). None: almost all the rows pass them
+
+    Returns:
+        Dictionary {file name: path}
+    """
+
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    written = {}
+    for k, timestamp in enumerate(timestamps):
+        first_id = 1_000_000_000 + k * rows
+        files = [
+            (".gkg.csv.zip", ".gkg.csv", _gkg_rows(timestamp, rows, rng, match_share)),
+            (".mentions.CSV.zip", ".mentions.CSV", _mentions_rows(timestamp, rows * 3, first_id, rng)),
+            (".export.CSV.zip", ".export.CSV", _export_rows(timestamp, rows, first_id, rng, match_share)),
+        ]
+        for suffix, csv_suffix, lines in files:
+            path = os.path.join(folder, f"{timestamp}{suffix}")
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                zip_file.writestr(f"{timestamp}{csv_suffix}", "\n".join(lines) + "\n")
+            written[os.path.basename(path)] = path
+    return written
+
+
+# Inputs of the GDELTProcessor as set in GDELT_Process.py (default configuration)
+DEFAULT_COUNTRY_CODES = [
+    'FR', 'GM', 'LU', 'LH', 'PL', 'RE', 'AU', 'BE', 'SP', 'DA', 'SZ', 'NL', 'FI',
+    'IT', 'HU', 'BU', 'SW', 'LG', 'EZ', 'MT', 'EN', 'IC', 'GL', 'LS', 'LO', 'SI',
+    'CY', 'NO', 'PO', 'HR', 'VT', 'MN', 'GK'
+]
+DEFAULT_THEMES_TAGS = ["EPU", "TAX"]
+DEFAULT_GKG_COLUMNS_TO_DROP = [
+    "V2SOURCECOLLECTIONIDENTIFIER", "V2GCAM", "V2.1SHARINGIMAGE",
+    "V2.1RELATEDIMAGES", "V2.1SOCIALIMAGEEMBEDS", "V2.1SOCIALVIDEOEMBEDS",
+    "V2.1QUOTATIONS", "V2.1ALLNAMES", "V2.1AMOUNTS", "V2.1ENHANCEDDATES",
+    "V2.1TRANSLATIONINFO", "V2EXTRASXML", "V1COUNTS", "V2.1COUNTS",
+    "V1PERSONS", "V2ENHANCEDPERSONS", "V1ORGANIZATIONS", "V2ENHANCEDORGANIZATIONS"
+]
+DEFAULT_MENTIONS_COLUMNS_TO_MAP = ["MentionDocTone"]
+DEFAULT_EXPORT_COLUMNS_TO_MAP = [
+    "Actor1Code", "Actor1Name", "Actor1Geo_Type", "Actor1Geo_Fullname", "Actor1Geo_CountryCode",
+    "Actor2Geo_CountryCode", "ActionGeo_CountryCode", "NumMentions", "GoldsteinScale", "AvgTone"
+]
+DEFAULT_JOINCASE = "gkg_export"
+DEFAULT_KEY_COLUMNS = {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "export": "SOURCEURL"}
+
+
+def default_processor(output_dir: str, **kwargs):
+    """GDELTProcessor with the default configuration of GDELT_Process.py (kwargs override it)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTProcessor
+
+    inputs = dict(
+        dictionary_path=DICT_PATH,
+        output_dir=output_dir,
+        country_codes=DEFAULT_COUNTRY_CODES,
+        themes_tags=DEFAULT_THEMES_TAGS,
+        gkg_columns_to_drop=DEFAULT_GKG_COLUMNS_TO_DROP,
+        mentions_columns_to_map=DEFAULT_MENTIONS_COLUMNS_TO_MAP,
+        export_columns_to_map=DEFAULT_EXPORT_COLUMNS_TO_MAP
+    )
+    inputs.update(kwargs)
+    return GDELTProcessor(**inputs)
+
+
+@contextlib.contextmanager
+def fixture_server(folder: str):
+    """Local HTTP server of a folder (the fixture zips, as on the GDELT site). Yields its base URL"""
+
+    import functools
+    import http.server
+
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=folder))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def served_processor(output_dir: str, base_url: str, **kwargs):
+    """default_processor that downloads the files from base_url (a fixture_server)"""
+
+    processor = default_processor(output_dir, **kwargs)
+    processor.loader.base_url = base_url
+    return processor
+
+
+def write_range_fixture(name: str, timestamps: list, rows: int, missing: tuple = ()) -> str:
+    """
+    Fixture zips of several timestamps in their own folder of FIXTURE_DIR (served by fixture_server).
+    The export zip of the timestamps in missing is left out, so those timestamps fail.
+    """
+
+    folder = os.path.join(FIXTURE_DIR, name)
+    shutil.rmtree(folder, ignore_errors=True)
+    write_fixture_zips(folder, timestamps, rows=rows)
+    for ts in missing:
+        os.remove(os.path.join(folder, f"{ts}.export.CSV.zip"))
+    return folder
+
+
+def assert_same_rows(expected: pd.DataFrame, actual: pd.DataFrame, label: str) -> None:
+    """Same columns and values, row by row (numbers compared as float64, as the sql engine gives them; the index is ignored)"""
+
+    assert list(expected.columns) == list(actual.columns), f"{label}: different columns"
+    assert len(expected) == len(actual), f"{label}: {len(expected)} rows vs {len(actual)}"
+    for col in expected.columns:
+        a, b = expected[col].reset_index(drop=True), actual[col].reset_index(drop=True)
+        if pd.api.types.is_numeric_dtype(a.dtype) and pd.api.types.is_numeric_dtype(b.dtype):
+            same = np.allclose(a.astype("float64"), b.astype("float64"), rtol=1e-6, equal_nan=True)
+        else:
+            same = a.astype(object).where(a.notna(), None).equals(b.astype(object).where(b.notna(), None))
+        assert same, f"{label}: different values in {col}"
+
+
+def assert_same_stats(expected, actual, label: str, ignore: tuple = ()) -> None:
+    """Same statistics (nested dicts and lists of numbers, texts and data frames); the keys in ignore are not compared"""
+
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict), f"{label}: not a dict"
+        keys = [key for key in expected if key not in ignore]
+        assert set(keys) == {key for key in actual if key not in ignore}, f"{label}: different keys"
+        for key in keys:
+            assert_same_stats(expected[key], actual[key], f"{label}[{key!r}]", ignore)
+    elif isinstance(expected, (pd.DataFrame, pd.Series)):
+        assert_same_rows(pd.DataFrame(expected), pd.DataFrame(actual), label)
+    elif isinstance(expected, (list, tuple, np.ndarray)):
+        assert len(expected) == len(actual), f"{label}: different lengths"
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            assert_same_stats(a, b, f"{label}[{i}]", ignore)
+    elif isinstance(expected, (float, np.floating)):
+        assert np.isclose(expected, actual, rtol=1e-6, equal_nan=True), f"{label}: {expected} vs {actual}"
+    else:
+        assert expected == actual, f"{label}: {expected!r} vs {actual!r}"
+
+
+def _best_of(function, repeat: int) -> float:
+    """Best wall time (seconds) of repeat calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# ================== Benchmarks =================================================
+
+def benchmark_key_stats(rows: int, repeat: int) -> None:
+    """Time of check_key_columns with each key stats engine, and the range statistics merged over 4 timestamps (exact vs hll)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import (
+        GDELTDataLoader, GDELTTimestampBatchRunner, GKGProcessor, KeyColumnsCheckUp
+    )
+
+    timestamps = [FIXTURE_TIMESTAMP, "20251201144500", "20251201150000", "20251201151500"]
+    files = write_fixture_zips(FIXTURE_DIR, timestamps, rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    frames = []
+    for ts in timestamps:
+        data = {}
+        for df_name in ["gkg_df", "mentions_df", "export_df"]:
+            with open(files[f"{ts}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb") as f:
+                data[df_name] = loader.read_zipped_csv(f.read(), df_name, ts)
+        data["gkg_df"] = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP).process(data["gkg_df"])
+        frames.append(data)
+    key_columns = {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "mentions": ["MentionIdentifier", "GlobalEventID"], "export": "GlobalEventID"}
+
+    def check(engine: str, data: dict) -> KeyColumnsCheckUp:
+        checkup = KeyColumnsCheckUp(key_columns, key_stats_engine=engine)
+        checkup.check_key_columns(data["gkg_df"], data["mentions_df"], data["export_df"])
+        return checkup
+
+    # Per timestamp: every engine gives the statistics of the original one ("strings"), "hll" approximately
+    print(f"{'engine':<10}{'seconds':>10}")
+    per_ts = {}
+    for engine in KeyColumnsCheckUp.KEY_STATS_ENGINES:
+        per_ts[engine] = KeyColumnsCheckUp(key_columns, key_stats_engine=engine).check_key_columns(
+            frames[0]["gkg_df"], frames[0]["mentions_df"], frames[0]["export_df"]
+        )
+        seconds = _best_of(lambda: check(engine, frames[0]), repeat)
+        print(f"{engine:<10}{seconds:>10.3f}")
+    assert per_ts["exact"] == per_ts["strings"], "The exact engine gives other statistics than the strings engine"
+
+    # Range: the sketches of the timestamps merged as the batch runner does, against the statistics of all the rows at once
+    whole = {name: pd.concat([data[name] for data in frames], ignore_index=True) for name in frames[0]}
+    expected = KeyColumnsCheckUp(key_columns, key_stats_engine="strings").check_key_columns(
+        whole["gkg_df"], whole["mentions_df"], whole["export_df"]
+    )
+    print(f"\n{'statistic (range of 4 timestamps)':<62}{'true':>10}{'exact':>10}{'hll':>10}")
+    merged = {}
+    for engine in ("exact", "hll"):
+        acc = {}
+        for data in frames:
+            acc = GDELTTimestampBatchRunner._merge_key_sketches(acc, check(engine, data).sketches)
+        merged[engine] = acc["key_columns_stats_range"]
+    assert merged["exact"] == expected, "The merged exact sketches give other statistics than all the rows at once"
+    for file_key, metrics in expected.items():
+        for name, value in metrics.items():
+            if name.endswith("_uniquevalues_length"):
+                print(f"{file_key + ' ' + name:<62}{value:>10}{merged['exact'][file_key][name]:>10}{merged['hll'][file_key][name]:>10}")
+    print("Same range statistics with the merged exact sketches as with all the rows at once")
+
+
+def benchmark_mapping_checkup(rows: int, repeat: int) -> None:
+    """Time and memory of KeyColumnsCheckUp.key_cols_mapping_checkup with each mapping engine (and check both give the same counts)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GKGProcessor, KeyColumnsCheckUp
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    data = {}
+    for df_name in ["gkg_df", "mentions_df", "export_df"]:
+        with open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb") as f:
+            data[df_name] = loader.read_zipped_csv(f.read(), df_name, FIXTURE_TIMESTAMP)
+    gkg = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP).process(data["gkg_df"])
+    key_columns = {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "mentions": ["MentionIdentifier", "GlobalEventID"], "export": "GlobalEventID"}
+
+    print(f"{'engine':<10}{'values':<8}{'seconds':>10}{'memory MB':>12}")
+    outputs = {}
+    for engine in KeyColumnsCheckUp.MAPPING_ENGINES:
+        for mapped_values in ((False, True) if engine == "counts" else (True,)):
+            checkup = KeyColumnsCheckUp(key_columns, mapping_engine=engine, mapped_values=mapped_values)
+            run = lambda: checkup.key_cols_mapping_checkup(gkg, data["mentions_df"], data["export_df"])
+            outputs[(engine, mapped_values)] = run()
+            seconds = _best_of(run, repeat)
+            memory = sum(df.memory_usage(deep=True).sum() for df in outputs[(engine, mapped_values)].values())
+            print(f"{engine:<10}{str(mapped_values):<8}{seconds:>10.3f}{memory / 1e6:>12.2f}")
+
+    # Same keys and counts with both engines, and the same lists when the counts engine keeps them
+    lists = outputs[("lists", True)]
+    for (engine, mapped_values), output in outputs.items():
+        for name, df in lists.items():
+            for col in df.columns:
+                if col in output[name].columns:
+                    assert df[col].astype(object).equals(output[name][col].astype(object)), f"{engine} gives other {col} in {name}"
+    print("Same counts (and mapped values) with all the engines")
+
+
+def benchmark_parity(rows: int, repeat: int) -> None:
+    """
+    Time of a range with the process pool, the join store, the sinks, resume and follow, and check each one gives
+    the timestamps, failures, statistics and joined rows of a serial run (one timestamp of the range fails)
+    """
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import (
+        GDELTFileSet, GDELTLastUpdateWatcher, GDELTMappingQuality, GDELTParquetDatasetSink, GDELTParquetFileSink,
+        GDELTSQLiteJoinStore, GDELTTimestampBatchRunner
+    )
+
+    timestamps = ["20251201143000", "20251201144500", "20251201150000", "20251201151500", "20251201153000"]
+    failing = timestamps[1]
+    folder = write_range_fixture("Parity", timestamps, rows, missing=(failing,))
+    fileset = GDELTFileSet(
+        timestamp=timestamps[0],
+        joincase="all",
+        statistics="all",
+        key_column_dictionary_document={
+            "gkg": "gkg_V2DOCUMENTIDENTIFIER", "mentions": ["MentionIdentifier", "GlobalEventID"], "export": "GlobalEventID"
+        }
+    )
+    mapping_columns = GDELTMappingQuality(
+        checkmapping_cols=["gkg_ACTUAL_TONE", "Export_AvgTone"], identifier_col="gkg_V2DOCUMENTIDENTIFIER"
+    )
+    # follow reads the latest timestamp from lastupdate.txt of the site (here the fixture folder)
+    with open(os.path.join(folder, "lastupdate.txt"), "w", encoding="utf-8") as f:
+        for suffix in (".export.CSV.zip", ".mentions.CSV.zip", ".gkg.csv.zip"):
+            f.write(f"0 0 http://data.gdeltproject.org/gdeltv2/{timestamps[-1]}{suffix}\n")
+    # The memory of the ingest depends on where the files are parsed (here or in a worker), not on the rows
+    memory_keys = ("peak_memory_bytes", "memory_bytes_by_file")
+
+    with fixture_server(folder) as base_url:
+
+        def runner(mode: str) -> GDELTTimestampBatchRunner:
+            return GDELTTimestampBatchRunner(served_processor(os.path.join(folder, "Output", mode), base_url))
+
+        def run(mode: str, timestamp_end: str = timestamps[-1], **kwargs) -> dict:
+            return runner(mode).run(
+                fileset, mapping_columns, timestamp_start=timestamps[0], timestamp_end=timestamp_end,
+                on_error="skip", flatten_df_key_columns_stats=False, **kwargs
+            )
+
+        def sink_rows(path: str) -> pd.DataFrame:
+            # The partitions of the dataset sink come back as the columns date and hour
+            return pd.read_parquet(path).drop(columns=["date", "hour"], errors="ignore")
+
+        def store_run() -> dict:
+            with GDELTSQLiteJoinStore(
+                os.path.join(folder, "Output", "store", "join.sqlite"), DEFAULT_MENTIONS_COLUMNS_TO_MAP, DEFAULT_EXPORT_COLUMNS_TO_MAP
+            ) as store:
+                return run("store", join_store=store)
+
+        def resume_run(mode: str, sink_path=None) -> dict:
+            # The first part of the range, then the whole range again with resume
+            make_sink = (lambda: GDELTParquetDatasetSink(sink_path)) if sink_path else (lambda: None)
+            run(mode, timestamp_end=timestamps[2], checkpoint=True, sink=make_sink())
+            result = run(mode, resume=True, sink=make_sink())
+            expected = [ts for ts in timestamps[:3] if ts != failing]
+            assert result["checkpoint"]["timestamps_resumed"] == expected, f"{mode}: other timestamps resumed"
+            return result
+
+        def follow_run() -> dict:
+            follow_runner = runner("follow")
+            return follow_runner.follow(
+                fileset, GDELTParquetDatasetSink(os.path.join(folder, "Output", "follow", "Joined")), mapping_columns,
+                watcher=GDELTLastUpdateWatcher(base_url + "lastupdate.txt"), start_after="20251201141500",
+                poll_interval_seconds=0.1, max_retries=1, max_timestamps=len(timestamps), checkpoint=False
+            )
+
+        dataset_path = os.path.join(folder, "Output", "dataset", "Joined")
+        file_path = os.path.join(folder, "Output", "file", "joined.parquet")
+        resume_sink_path = os.path.join(folder, "Output", "resume_sink", "Joined")
+        modes = {
+            "serial": (lambda: run("serial"), None),
+            "pool": (lambda: run("pool", process_workers=2), None),
+            "join_store": (store_run, None),
+            "dataset_sink": (lambda: run("dataset", sink=GDELTParquetDatasetSink(dataset_path)), dataset_path),
+            "file_sink": (lambda: run("file", sink=GDELTParquetFileSink(file_path)), file_path),
+            "resume": (lambda: resume_run("resume"), None),
+            "resume_sink": (lambda: resume_run("resume_sink", resume_sink_path), resume_sink_path),
+            "follow": (follow_run, os.path.join(folder, "Output", "follow", "Joined")),
+        }
+
+        print(f"{'mode':<14}{'processed':>10}{'failed':>8}{'rows':>10}{'seconds':>10}")
+        expected = None
+        for mode, (function, sink_path) in modes.items():
+            start = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - start
+            joined = sink_rows(sink_path) if sink_path else result["joined_df"]
+            print(f"{mode:<14}{len(result['timestamps_processed']):>10}{len(result['timestamps_failed']):>8}{len(joined):>10}{seconds:>10.3f}")
+
+            if expected is None:
+                expected = (result, joined)
+                assert list(result["timestamps_failed"]) == [failing], "The missing file did not fail its timestamp"
+                continue
+            serial, serial_joined = expected
+            assert result["timestamps_processed"] == serial["timestamps_processed"], f"{mode}: other timestamps processed"
+            assert list(result["timestamps_failed"]) == list(serial["timestamps_failed"]), f"{mode}: other failures"
+            assert_same_stats(serial["stats"], result["stats"], f"{mode} stats", ignore=memory_keys)
+            assert_same_rows(serial_joined, joined, f"{mode} joined rows")
+    print("Same timestamps, failures, statistics and joined rows in every mode as in the serial run")
+
+
+def benchmark_parse_engines(rows: int, repeat: int) -> None:
+    """Rows/sec of each GDELTDataLoader parse engine on the fixture gkg, mentions and export files"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+
+    print(f"{'file':<14}{'engine':<10}{'rows':>10}{'seconds':>10}{'rows/sec':>14}")
+    for df_name in ["gkg_df", "mentions_df", "export_df"]:
+        path = files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"]
+        with open(path, "rb") as f:
+            content = f.read()
+        for engine in GDELTDataLoader.PARSE_ENGINES:
+            loader.parse_engine = engine
+            n_rows = len(loader.read_zipped_csv(content, df_name, FIXTURE_TIMESTAMP))
+            seconds = _best_of(lambda: loader.read_zipped_csv(content, df_name, FIXTURE_TIMESTAMP), repeat)
+            print(f"{df_name:<14}{engine:<10}{n_rows:>10}{seconds:>10.3f}{n_rows / seconds:>14,.0f}")
+
+
+def benchmark_prefetch(rows: int, repeat: int) -> None:
+    """Time of run with sequential and concurrent downloads from a local HTTP server (and check the order, results and on_error)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTFileSet, GDELTTimestampBatchRunner
+
+    timestamps = ["20251201143000", "20251201144500", "20251201150000", "20251201151500", "20251201153000", "20251201154500"]
+    failing = timestamps[2]
+    folder = write_range_fixture("Prefetch", timestamps, rows, missing=(failing,))
+    fileset = GDELTFileSet(
+        timestamp=timestamps[0],
+        joincase=DEFAULT_JOINCASE,
+        statistics="key_columns_stats",
+        key_column_dictionary_document=DEFAULT_KEY_COLUMNS
+    )
+
+    with fixture_server(folder) as base_url:
+
+        def run(download_workers: int, on_error: str) -> dict:
+            runner = GDELTTimestampBatchRunner(served_processor(os.path.join(folder, "Output"), base_url))
+            return runner.run(
+                fileset, timestamp_start=timestamps[0], timestamp_end=timestamps[-1],
+                on_error=on_error, download_workers=download_workers
+            )
+
+        print(f"{'download workers':<18}{'processed':>10}{'failed':>8}{'seconds':>10}")
+        results = {}
+        for download_workers in (1, 4):
+            results[download_workers] = run(download_workers, "skip")
+            seconds = _best_of(lambda: run(download_workers, "skip"), repeat)
+            result = results[download_workers]
+            print(f"{download_workers:<18}{len(result['timestamps_processed']):>10}{len(result['timestamps_failed']):>8}{seconds:>10.3f}")
+
+        # The same timestamps, in timestamp order, with the same failure and the same rows and statistics
+        serial, concurrent = results[1], results[4]
+        expected = [ts for ts in timestamps if ts != failing]
+        assert serial["timestamps_processed"] == concurrent["timestamps_processed"] == expected, "Timestamps processed out of order"
+        assert list(serial["timestamps_failed"]) == list(concurrent["timestamps_failed"]) == [failing], "Different failed timestamps"
+        assert list(dict.fromkeys(concurrent["joined_df"]["Time Stamp"])) == expected, "Joined rows out of timestamp order"
+        assert serial["joined_df"].astype(object).equals(concurrent["joined_df"].astype(object)), "Different joined rows"
+        for ts in expected:
+            for sheet, df in serial["stats"]["df_key_columns_stats_by_timestamp"][ts].items():
+                other = concurrent["stats"]["df_key_columns_stats_by_timestamp"][ts][sheet]
+                assert df.astype(str).equals(other.astype(str)), f"Different key column statistics for {ts}"
+
+        # With on_error="raise" the run stops at the failing timestamp
+        try:
+            run(4, "raise")
+        except Exception as e:
+            print(f"on_error='raise' stopped the run: {type(e).__name__}")
+        else:
+            raise AssertionError("on_error='raise' did not raise for the missing file")
+    print("Same timestamps, order, rows, statistics and failures with concurrent downloads")
+
+
+def benchmark_projection(rows: int, repeat: int) -> None:
+    """Time and memory of parsing all columns vs only the columns used by the default GDELT_Process.py configuration"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTFileSet
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    processor = default_processor(FIXTURE_DIR)
+    fileset = GDELTFileSet(
+        timestamp=FIXTURE_TIMESTAMP,
+        joincase=DEFAULT_JOINCASE,
+        statistics="key_columns_stats",
+        key_column_dictionary_document=DEFAULT_KEY_COLUMNS
+    )
+    usecols = processor._get_usecols_for_fileset(fileset)
+    loader = processor.loader
+
+    print(f"{'file':<14}{'columns':>12}{'seconds':>18}{'MB':>16}")
+    for df_name in ["gkg_df", "export_df"]:
+        file_type = GDELTDataLoader.FILE_CONFIGS[df_name]["dict_key"]
+        path = files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"]
+        with open(path, "rb") as f:
+            content = f.read()
+        measures = []
+        for cols in (None, usecols[file_type]):
+            df = loader.read_zipped_csv(content, df_name, FIXTURE_TIMESTAMP, cols)
+            seconds = _best_of(lambda: loader.read_zipped_csv(content, df_name, FIXTURE_TIMESTAMP, cols), repeat)
+            measures.append((df.shape[1], seconds, df.memory_usage(deep=True).sum() / 1024**2))
+        (c0, t0, m0), (c1, t1, m1) = measures
+        print(
+            f"{df_name:<14}{f'{c0} -> {c1}':>12}{f'{t0:.3f} -> {t1:.3f}':>18}{f'{m0:.1f} -> {m1:.1f}':>16}"
+            f"   (saved {100 * (1 - t1 / t0):.0f}% time, {100 * (1 - m1 / m0):.0f}% memory)"
+        )
+
+
+def benchmark_pushdown(rows: int, repeat: int) -> None:
+    """
+    Time of process_fileset with and without filter pushdown on the default configuration (and check both give the same rows),
+    on the default fixture (almost every row passes the filters) and on a selective one (a fifth of the rows can pass them)
+    """
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTFileSet
+
+    fixtures = {
+        "default": write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows),
+        "selective": write_fixture_zips(os.path.join(FIXTURE_DIR, "Selective"), [FIXTURE_TIMESTAMP], rows=rows, match_share=0.2),
+    }
+    fileset = GDELTFileSet(
+        timestamp=FIXTURE_TIMESTAMP,
+        joincase=DEFAULT_JOINCASE,
+        statistics="none",
+        key_column_dictionary_document=DEFAULT_KEY_COLUMNS
+    )
+
+    print(f"{'fixture':<12}{'pushdown':<10}{'rows':>10}{'seconds':>10}")
+    for fixture, files in fixtures.items():
+
+        def raw_files() -> dict:
+            return {
+                df_name: open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb")
+                for df_name in ["gkg_df", "export_df"]
+            }
+
+        outputs = {}
+        for pushdown in (False, True):
+            processor = default_processor(FIXTURE_DIR, filter_pushdown=pushdown)
+            outputs[pushdown] = processor.process_fileset(fileset, raw_files=raw_files())
+            ingest_stats = processor.loader.ingest_stats.pop(FIXTURE_TIMESTAMP, {})
+            seconds = _best_of(lambda: processor.process_fileset(fileset, raw_files=raw_files()), repeat)
+            print(f"{fixture:<12}{str(pushdown):<10}{len(outputs[pushdown]):>10}{seconds:>10.3f}")
+            for name, counts in ingest_stats.get("pushdown_by_file", {}).items():
+                print(f"    {name:<14} rows kept {counts['rows_kept']} of {counts['rows_parsed']}")
+
+        without, with_pushdown = outputs[False], outputs[True]
+        assert list(without.columns) == list(with_pushdown.columns), f"{fixture}: the pushdown gives different columns"
+        assert without.astype(object).equals(with_pushdown.astype(object)), f"{fixture}: the pushdown gives different rows"
+    print("Same rows with and without pushdown on both fixtures")
+
+
+def benchmark_themes_filter(rows: int, repeat: int) -> None:
+    """Time of the themes_tags filter with each engine and the default themes_tags (and check both keep the same rows)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTProcessor, GKGProcessor
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    with open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS['gkg_df']['suffix']}"], "rb") as f:
+        gkg = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP).process(loader.read_zipped_csv(f.read(), "gkg_df", FIXTURE_TIMESTAMP))
+    themes = gkg["gkg_V2ENHANCEDTHEMES_list_str"]
+    tags = tuple(DEFAULT_THEMES_TAGS)
+
+    print(f"{'engine':<10}{'rows':>10}{'kept':>10}{'seconds':>10}{'rows/sec':>14}")
+    masks = {}
+    for engine in GDELTProcessor.THEMES_FILTER_ENGINES:
+        processor = default_processor(FIXTURE_DIR, themes_filter_engine=engine)
+        masks[engine] = processor._themes_tags_mask(themes, tags)
+        seconds = _best_of(lambda: processor._themes_tags_mask(themes, tags), repeat)
+        print(f"{engine:<10}{len(themes):>10}{int(masks[engine].sum()):>10}{seconds:>10.3f}{len(themes) / seconds:>14,.0f}")
+
+    first, *others = masks.values()
+    for other in others:
+        assert np.array_equal(first, other), "The themes filter engines keep different rows"
+    print("Same rows with all the engines")
+
+
+def benchmark_theme_output(rows: int, repeat: int) -> None:
+    """Memory and Parquet size of the joined output with each theme_output (and check both have the same rows and themes)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTFileSet, GKGProcessor
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    fileset = GDELTFileSet(
+        timestamp=FIXTURE_TIMESTAMP,
+        joincase=DEFAULT_JOINCASE,
+        statistics="none",
+        key_column_dictionary_document=DEFAULT_KEY_COLUMNS
+    )
+
+    def raw_files() -> dict:
+        return {
+            df_name: open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb")
+            for df_name in ["gkg_df", "export_df"]
+        }
+
+    print(f"{'output':<10}{'rows':>10}{'seconds':>10}{'memory MB':>12}{'parquet MB':>12}")
+    outputs = {}
+    for theme_output in GKGProcessor.THEME_OUTPUTS:
+        processor = default_processor(FIXTURE_DIR, theme_output=theme_output)
+        outputs[theme_output] = processor.process_fileset(fileset, raw_files=raw_files())
+        seconds = _best_of(lambda: processor.process_fileset(fileset, raw_files=raw_files()), repeat)
+        parquet_path = os.path.join(FIXTURE_DIR, f"theme_output_{theme_output}.parquet")
+        outputs[theme_output].to_parquet(parquet_path, index=False)
+        memory = outputs[theme_output].memory_usage(deep=True).sum()
+        print(
+            f"{theme_output:<10}{len(outputs[theme_output]):>10}{seconds:>10.3f}"
+            f"{memory / 1e6:>12.2f}{os.path.getsize(parquet_path) / 1e6:>12.2f}"
+        )
+
+    # Same rows, and the compact lists are the same themes as the strings
+    strings, compact = outputs["strings"], outputs["compact"]
+    assert len(strings) == len(compact), "The theme outputs give different rows"
+    for col in ["gkg_V1THEMES_list", "gkg_V2ENHANCEDTHEMES_list", "gkg_Theme_row_common", "gkg_Theme_row_only_in_V1", "gkg_Theme_row_only_in_V2"]:
+        decoded = [", ".join(themes) for themes in compact[col].tolist()]
+        assert strings[f"{col}_str"].fillna("").tolist() == decoded, f"The theme outputs give different themes in {col}"
+    print("Same rows and themes with both outputs")
+
+
+def benchmark_theme_parsing(rows: int, repeat: int) -> None:
+    """Time of GKGProcessor._process_themes with each theme engine on the fixture gkg file (and check both give the same output)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GKGProcessor
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    with open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS['gkg_df']['suffix']}"], "rb") as f:
+        gkg = loader.read_zipped_csv(f.read(), "gkg_df", FIXTURE_TIMESTAMP)
+
+    print(f"{'engine':<12}{'rows':>10}{'seconds':>10}{'rows/sec':>14}")
+    outputs = {}
+    for engine in GKGProcessor.THEME_ENGINES:
+        processor = GKGProcessor(theme_engine=engine)
+        outputs[engine] = processor._process_themes(gkg.copy())
+        seconds = _best_of(lambda: processor._process_themes(gkg.copy()), repeat)
+        print(f"{engine:<12}{len(gkg):>10}{seconds:>10.3f}{len(gkg) / seconds:>14,.0f}")
+
+    # Same columns and same values with both engines
+    first, *others = outputs.values()
+    for other in others:
+        assert list(first.columns) == list(other.columns), "The theme engines give different columns"
+        assert first.astype(object).equals(other.astype(object)), "The theme engines give different values"
+    print("Same output with all the engines")
+
+
+# Script run in a new python process by benchmark_cold_start (argv: dictionary_cache, rows): prints the seconds of each step
+COLD_START_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {base_dir!r})
+from Benchmarks.GDELT_Benchmarks import DEFAULT_JOINCASE, DEFAULT_KEY_COLUMNS, FIXTURE_DIR, FIXTURE_TIMESTAMP, default_processor, write_fixture_zips
+from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTFileSet
+imported = time.perf_counter()
+files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=int(sys.argv[2]))
+written = time.perf_counter()
+processor = default_processor(FIXTURE_DIR, dictionary_cache=sys.argv[1] == "True")
+built = time.perf_counter()
+fileset = GDELTFileSet(FIXTURE_TIMESTAMP, DEFAULT_JOINCASE, "none", DEFAULT_KEY_COLUMNS)
+raw_files = {{
+    df_name: open(files[FIXTURE_TIMESTAMP + GDELTDataLoader.FILE_CONFIGS[df_name]["suffix"]], "rb")
+    for df_name in ["gkg_df", "export_df"]
+}}
+processor.process_fileset(fileset, raw_files=raw_files)
+done = time.perf_counter()
+print(imported - start, built - written, done - built, (imported - start) + (done - written))
+"""
+
+
+def benchmark_aggregations(rows: int, repeat: int) -> None:
+    """Time and memory of the rollups merged per timestamp (GDELTAggregation) vs a group-by of all the joined rows (and check both agree)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTAggregation, GDELTDataLoader, GDELTFileSet
+
+    timestamps = ["20251201143000", "20251201144500", "20251201150000", "20251201151500"]
+    files = write_fixture_zips(FIXTURE_DIR, timestamps, rows=rows)
+    aggregations = {
+        "by_theme": GDELTAggregation(["theme"], measures=["gkg_ACTUAL_TONE"], distinct_on=["gkg_GKGRECORDID"]),
+        "by_country": GDELTAggregation(["Export_ActionGeo_CountryCode", "Time Stamp"], measures=["Export_GoldsteinScale", "Export_AvgTone"]),
+    }
+    processor = default_processor(FIXTURE_DIR, aggregations=aggregations)
+
+    def raw_files(ts: str) -> dict:
+        return {
+            df_name: open(files[f"{ts}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb")
+            for df_name in ["gkg_df", "export_df"]
+        }
+
+    # Joined rows and states of each timestamp
+    joined, partials = [], []
+    for ts in timestamps:
+        fileset = GDELTFileSet(timestamp=ts, joincase=DEFAULT_JOINCASE, statistics="none", key_column_dictionary_document=DEFAULT_KEY_COLUMNS)
+        joined_df, outputs = processor.process_fileset(fileset, raw_files=raw_files(ts), return_outputs=True)
+        joined.append(joined_df)
+        partials.append(outputs.aggregations)
+    all_joined = pd.concat(joined, ignore_index=True)
+
+    print(f"{'aggregation':<14}{'groups':>8}{'merge s':>10}{'all rows s':>12}{'state MB':>10}{'rows MB':>10}")
+    rows_mb = all_joined.memory_usage(deep=True).sum() / 1e6
+    for name, aggregation in aggregations.items():
+        states = [partial[name] for partial in partials]
+        merged = aggregation.result(aggregation.merge(states))
+        merge_seconds = _best_of(lambda: aggregation.merge(states), repeat)
+        all_rows_seconds = _best_of(lambda: aggregation.partial(all_joined), repeat)
+        state_mb = aggregation.merge(states).memory_usage(deep=True).sum() / 1e6
+        print(f"{name:<14}{len(merged):>8}{merge_seconds:>10.3f}{all_rows_seconds:>12.3f}{state_mb:>10.2f}{rows_mb:>10.2f}")
+
+        # The merged states give the rollup of all the rows at once
+        at_once = aggregation.result(aggregation.partial(all_joined))
+        assert merged[aggregation.group_by].astype(str).equals(at_once[aggregation.group_by].astype(str)), f"{name}: different groups"
+        numeric = [col for col in merged.columns if col not in aggregation.group_by]
+        assert np.allclose(merged[numeric].to_numpy(dtype=float), at_once[numeric].to_numpy(dtype=float), equal_nan=True), f"{name}: different values"
+
+    # And the same as a pandas group-by of the joined rows (groups with all their values)
+    expected = all_joined.groupby(["Export_ActionGeo_CountryCode", "Time Stamp"])["Export_GoldsteinScale"].agg(["count", "mean", "var"])
+    merged = aggregations["by_country"].result(aggregations["by_country"].merge([partial["by_country"] for partial in partials]))
+    merged = merged.dropna(subset=["Export_ActionGeo_CountryCode"]).set_index(["Export_ActionGeo_CountryCode", "Time Stamp"])
+    merged = merged.loc[expected.index]
+    assert (merged["Export_GoldsteinScale_count"].to_numpy() == expected["count"].to_numpy()).all(), "different counts than pandas"
+    assert np.allclose(merged["Export_GoldsteinScale_mean"], expected["mean"], equal_nan=True), "different means than pandas"
+    assert np.allclose(merged["Export_GoldsteinScale_var"], expected["var"], equal_nan=True), "different variances than pandas"
+    print("Same rollups merged per timestamp, from all the rows and with pandas")
+
+
+def benchmark_theme_series(rows: int, repeat: int) -> None:
+    """Time of a theme prefix query on GDELTThemeTimeSeries vs parsing the theme strings of the joined rows again (and check both count the same)"""
+
+    import shutil
+    import tempfile
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTFileSet, GDELTThemeTimeSeries
+
+    timestamps = ["20251201143000", "20251201144500", "20251201150000", "20251201151500"]
+    files = write_fixture_zips(FIXTURE_DIR, timestamps, rows=rows)
+    series_dir = tempfile.mkdtemp(prefix="ThemeSeries", dir=FIXTURE_DIR)
+    processor = default_processor(FIXTURE_DIR, theme_series=GDELTThemeTimeSeries(series_dir, prefixes=DEFAULT_THEMES_TAGS))
+
+    def raw_files(ts: str) -> dict:
+        return {
+            df_name: open(files[f"{ts}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb")
+            for df_name in ["gkg_df", "export_df"]
+        }
+
+    # The runner writes the counts of each timestamp into the series
+    joined = []
+    for ts in timestamps:
+        fileset = GDELTFileSet(timestamp=ts, joincase=DEFAULT_JOINCASE, statistics="none", key_column_dictionary_document=DEFAULT_KEY_COLUMNS)
+        joined_df, outputs = processor.process_fileset(fileset, raw_files=raw_files(ts), return_outputs=True)
+        joined.append(joined_df)
+        processor.theme_series.add(ts, outputs.theme_counts)
+    all_joined = pd.concat(joined, ignore_index=True)
+    series = processor.theme_series
+
+    def from_strings():
+        # What is done today: the theme strings of the saved joined rows, split again
+        documents = all_joined.drop_duplicates(subset=["gkg_GKGRECORDID"])
+        themes = documents.assign(theme=documents["gkg_V2ENHANCEDTHEMES_list_str"].str.split(",")).explode("theme")
+        themes["theme"] = themes["theme"].str.strip()
+        themes = themes[themes["theme"].str.startswith("EPU", na=False)].drop_duplicates(subset=["gkg_GKGRECORDID", "theme"])
+        return themes.groupby(["Time Stamp", "theme"]).size().unstack(fill_value=0)
+
+    query_seconds = _best_of(lambda: series.query("EPU"), repeat)
+    strings_seconds = _best_of(from_strings, repeat)
+    print(f"{'query':<18}{'seconds':>10}")
+    print(f"{'theme series':<18}{query_seconds:>10.4f}")
+    print(f"{'theme strings':<18}{strings_seconds:>10.4f}")
+    print(f"Series: {series.metadata()}")
+
+    expected = from_strings()
+    got = series.query("EPU")
+    got = got.loc[expected.index, expected.columns]
+    assert (got.to_numpy() == expected.to_numpy()).all(), "the theme series counts other documents than the theme strings"
+
+    # Saved and read again, the series gives the same counts
+    series.save()
+    again = GDELTThemeTimeSeries(series_dir, prefixes=DEFAULT_THEMES_TAGS)
+    assert again.query("EPU").equals(series.query("EPU")), "the saved theme series gives other counts"
+    shutil.rmtree(series_dir)
+    print("Same documents per theme from the series, from the theme strings and after saving")
+
+
+def benchmark_cold_start(rows: int, repeat: int) -> None:
+    """Time from import to the first process_fileset in a new process, reading Dictionaries.xlsx and with the dictionary cache"""
+
+    import subprocess
+
+    cache_path = os.path.splitext(DICT_PATH)[0] + ".schema.json"
+    script = COLD_START_SCRIPT.format(base_dir=BASE_DIR)
+
+    def run(dictionary_cache: bool) -> list:
+        output = subprocess.run(
+            [sys.executable, "-c", script, str(dictionary_cache), str(rows)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        return [float(value) for value in output.split()]
+
+    # The fixture files are written once before, so the runs only differ in the dictionary
+    write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+
+    print(f"{'dictionary':<14}{'import':>10}{'processor':>11}{'1st fileset':>13}{'total':>10}")
+    cases = [("xlsx", False, False), ("cache (new)", True, True), ("cache", True, False)]
+    for name, dictionary_cache, remove_cache in cases:
+        best = None
+        for _ in range(repeat):
+            if remove_cache and os.path.exists(cache_path):
+                os.remove(cache_path)
+            seconds = run(dictionary_cache)
+            best = seconds if best is None or seconds[-1] < best[-1] else best
+        print(f"{name:<14}{best[0]:>10.3f}{best[1]:>11.3f}{best[2]:>13.3f}{best[3]:>10.3f}")
+
+
+def benchmark_country_filter(rows: int, repeat: int) -> None:
+    """Time of the gkg country filter with each engine and the default country_codes (and check both keep the same rows)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTProcessor
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    with open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS['gkg_df']['suffix']}"], "rb") as f:
+        locations = loader.read_zipped_csv(f.read(), "gkg_df", FIXTURE_TIMESTAMP)["V2ENHANCEDLOCATIONS"]
+
+    print(f"{'engine':<10}{'rows':>10}{'kept':>10}{'seconds':>10}{'rows/sec':>14}")
+    masks = {}
+    for engine in GDELTProcessor.COUNTRY_FILTER_ENGINES:
+        processor = default_processor(FIXTURE_DIR, country_filter_engine=engine)
+        masks[engine] = processor._country_filter_mask(locations)
+        seconds = _best_of(lambda: processor._country_filter_mask(locations), repeat)
+        print(f"{engine:<10}{len(locations):>10}{int(masks[engine].sum()):>10}{seconds:>10.3f}{len(locations) / seconds:>14,.0f}")
+
+    first, *others = masks.values()
+    for other in others:
+        assert np.array_equal(first, other), "The country filter engines keep different rows"
+    print("Same rows with all the engines")
+
+
+def benchmark_event_window(rows: int, repeat: int) -> None:
+    """Match rate and time of the mentions + export join by timestamp and with a GDELTEventWindow over a range"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTEventWindow, GDELTJoinKeys, GKGProcessor, DataJoiner
+
+    timestamps = ["20251201143000", "20251201144500", "20251201150000", "20251201151500"]
+    files = write_fixture_zips(FIXTURE_DIR, timestamps, rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    processor = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP)
+
+    def read(ts: str, df_name: str):
+        with open(files[f"{ts}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb") as f:
+            return loader.read_zipped_csv(f.read(), df_name, ts)
+
+    # A third of the mentions are of events first seen one timestamp before, and another third two timestamps before
+    inputs = []
+    for k, ts in enumerate(timestamps):
+        mentions = read(ts, "mentions_df")
+        event_ids = pd.to_numeric(mentions["GlobalEventID"]).astype("int64")
+        back = np.minimum(np.arange(len(mentions)) % 3, k)
+        mentions["GlobalEventID"] = event_ids - back * rows
+        gkg = processor.process(GDELTJoinKeys.add_key_columns(read(ts, "gkg_df"), "gkg"))
+        mentions = GDELTJoinKeys.add_key_columns(mentions, "mentions")
+        inputs.append((ts, gkg, mentions, GDELTJoinKeys.add_key_columns(read(ts, "export_df"), "export")))
+
+    joiner = DataJoiner(DEFAULT_MENTIONS_COLUMNS_TO_MAP, DEFAULT_EXPORT_COLUMNS_TO_MAP)
+    export_columns = joiner._get_export_columns(DEFAULT_EXPORT_COLUMNS_TO_MAP)
+
+    def run(window_hours):
+        window = GDELTEventWindow(window_hours) if window_hours else None
+        joined_rows, matched, matched_exact = 0, 0, 0
+        for ts, gkg, mentions, export in inputs:
+            if window is not None:
+                window.add(ts, export, export_columns)
+            joined = joiner.join(gkg, mentions, export, export_event_window=window)
+            joined_rows += len(joined)
+            matched += int(joined["Export_NumMentions"].notna().sum())
+            if window is not None:
+                matched_exact += window.last_stats["mentions_rows_matched_exact"]
+        return joined_rows, matched, matched_exact, window
+
+    print(f"{'join':<16}{'rows':>10}{'matched':>10}{'seconds':>10}")
+    outputs = {}
+    for name, window_hours in (("same timestamp", None), ("window 24h", 24)):
+        outputs[name] = run(window_hours)
+        seconds = _best_of(lambda: run(window_hours), repeat)
+        print(f"{name:<16}{outputs[name][0]:>10}{outputs[name][1]:>10}{seconds:>10.3f}")
+    print(f"Last timestamp: {outputs['window 24h'][3].last_stats}")
+    same, window = outputs["same timestamp"], outputs["window 24h"]
+    assert window[0] == same[0], "the event window changes the number of joined rows"
+    assert window[2] == same[1], "the same-timestamp matches counted by the event window are not the ones of the join"
+    assert window[1] >= same[1], "the event window matches fewer mentions than the same-timestamp join"
+
+
+def benchmark_import_time(rows: int, repeat: int) -> None:
+    """Wall time of a new python process for each command line step (and check --help and --dry-run do not import pandas)"""
+
+    import subprocess
+
+    cli = os.path.join(BASE_DIR, "GDELT_CLI.py")
+    dry_run = ["--start", FIXTURE_TIMESTAMP, "--end", "20251202143000", "--dry-run"]
+    commands = {
+        "python": ["-c", "pass"],
+        "timestamps": ["-c", "import DataProcessingClasses.GDELT_Timestamps"],
+        "cli --help": [cli, "--help"],
+        "cli --dry-run": [cli, *dry_run],
+        "processing": ["-c", "import DataProcessingClasses.OOP_DirectGDELT_Processing"],
+    }
+
+    print(f"{'command':<16}{'seconds':>10}")
+    for name, arguments in commands.items():
+        seconds = _best_of(
+            lambda: subprocess.run([sys.executable, *arguments], cwd=BASE_DIR, check=True, capture_output=True), repeat
+        )
+        print(f"{name:<16}{seconds:>10.3f}")
+
+    # The heavy modules must not be loaded by the command line before the processing starts
+    check = (
+        "import sys, runpy; sys.argv = [{cli!r}, *{arguments!r}]\n"
+        "try:\n    runpy.run_path({cli!r}, run_name='__main__')\n"
+        "except SystemExit:\n    pass\n"
+        "print(sorted(m for m in ('pandas', 'numpy', 'requests', 'sqlite3') if m in sys.modules))"
+    )
+    for arguments in (["--help"], dry_run):
+        output = subprocess.run(
+            [sys.executable, "-c", check.format(cli=cli, arguments=arguments)],
+            cwd=BASE_DIR, check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        assert output == "[]", f"GDELT_CLI.py {arguments[0]} imported {output}"
+    print("No heavy module imported by --help and --dry-run")
+
+
+def benchmark_join_engines(rows: int, repeat: int) -> None:
+    """Time of the DataJoiner join with each engine for every joincase (and check all engines give the same rows)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GKGProcessor, DataJoiner
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    frames = {}
+    for df_name in ["gkg_df", "mentions_df", "export_df"]:
+        with open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb") as f:
+            frames[df_name] = loader.read_zipped_csv(f.read(), df_name, FIXTURE_TIMESTAMP)
+    gkg = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP).process(frames["gkg_df"])
+
+    joincases = {
+        "gkg_only": (None, None),
+        "gkg_mentions": (frames["mentions_df"], None),
+        "gkg_export": (None, frames["export_df"]),
+        "all": (frames["mentions_df"], frames["export_df"]),
+    }
+
+    print(f"{'joincase':<14}{'engine':<8}{'rows':>10}{'seconds':>10}")
+    for joincase, (mentions, export) in joincases.items():
+        outputs = {}
+        for engine in DataJoiner.JOIN_ENGINES:
+            joiner = DataJoiner(DEFAULT_MENTIONS_COLUMNS_TO_MAP, DEFAULT_EXPORT_COLUMNS_TO_MAP, engine=engine)
+            outputs[engine] = joiner.join(gkg, mentions, export)
+            seconds = _best_of(lambda: joiner.join(gkg, mentions, export), repeat)
+            print(f"{joincase:<14}{engine:<8}{len(outputs[engine]):>10}{seconds:>10.3f}")
+
+        # Same rows, in the same order, with all the engines (the sql engine gives numbers as float64 and the rest as objects)
+        first, *others = outputs.values()
+        for other in others:
+            assert_same_rows(first, other, f"{joincase}: the join engines")
+    print("Same rows with all the engines")
+
+
+def benchmark_join_keys(rows: int, repeat: int) -> None:
+    """Time of the joins with and without the key columns of the loader (GDELTJoinKeys), and check they give the same rows"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTJoinKeys, GKGProcessor, DataJoiner
+
+    files = write_fixture_zips(FIXTURE_DIR, [FIXTURE_TIMESTAMP], rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    frames = {}
+    for df_name in ["gkg_df", "mentions_df", "export_df"]:
+        with open(files[f"{FIXTURE_TIMESTAMP}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb") as f:
+            frames[df_name] = loader.read_zipped_csv(f.read(), df_name, FIXTURE_TIMESTAMP)
+
+    # The same frames with the key columns added by the loader (join_keys=True), and the time to add them
+    keyed = {}
+    for df_name, df in frames.items():
+        file_type = GDELTDataLoader.FILE_CONFIGS[df_name]["dict_key"]
+        keyed[df_name] = GDELTJoinKeys.add_key_columns(df.copy(), file_type)
+        seconds = _best_of(lambda: GDELTJoinKeys.add_key_columns(df.copy(), file_type), repeat)
+        print(f"key columns of {file_type:<10}{seconds:>10.3f} s")
+
+    processor = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP)
+    inputs = {
+        "text keys": (processor.process(frames["gkg_df"]), frames["mentions_df"], frames["export_df"]),
+        "key columns": (processor.process(keyed["gkg_df"]), keyed["mentions_df"], keyed["export_df"]),
+    }
+
+    print(f"{'engine':<8}{'keys':<14}{'rows':>10}{'seconds':>10}")
+    for engine in DataJoiner.JOIN_ENGINES:
+        outputs = {}
+        for name, (gkg, mentions, export) in inputs.items():
+            joiner = DataJoiner(DEFAULT_MENTIONS_COLUMNS_TO_MAP, DEFAULT_EXPORT_COLUMNS_TO_MAP, engine=engine)
+            outputs[name] = GDELTJoinKeys.drop(joiner.join(gkg, mentions, export))
+            seconds = _best_of(lambda: joiner.join(gkg, mentions, export), repeat)
+            print(f"{engine:<8}{name:<14}{len(outputs[name]):>10}{seconds:>10.3f}")
+        assert outputs["text keys"].equals(outputs["key columns"]), f"{engine}: the key columns give different rows"
+    print("Same rows with the key columns and the text keys")
+
+
+def benchmark_url_index(rows: int, repeat: int) -> None:
+    """Match rate and time of the gkg + export join by exact SOURCEURL and by canonical URL (GDELTURLIndex) over a range"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import GDELTDataLoader, GDELTJoinKeys, GDELTURLIndex, GKGProcessor, DataJoiner
+
+    timestamps = ["20251201143000", "20251201144500", "20251201150000", "20251201151500"]
+    files = write_fixture_zips(FIXTURE_DIR, timestamps, rows=rows)
+    loader = GDELTDataLoader(DICT_PATH)
+    processor = GKGProcessor(DEFAULT_GKG_COLUMNS_TO_DROP)
+
+    def read(ts: str, df_name: str):
+        with open(files[f"{ts}{GDELTDataLoader.FILE_CONFIGS[df_name]['suffix']}"], "rb") as f:
+            return loader.read_zipped_csv(f.read(), df_name, ts)
+
+    # The export URLs are variants of the gkg ones: https and a trailing slash, a tracking parameter,
+    # or the article of the next timestamp (the event was first seen one slice before the document)
+    inputs = []
+    for k, ts in enumerate(timestamps):
+        export = read(ts, "export_df")
+        urls = export["SOURCEURL"].astype(str)
+        variant = np.arange(len(export)) % 4
+        next_ts = timestamps[min(k + 1, len(timestamps) - 1)]
+        export.loc[variant == 1, "SOURCEURL"] = urls[variant == 1].str.replace("https://", "http://", regex=False) + "/"
+        export.loc[variant == 2, "SOURCEURL"] = urls[variant == 2] + "?utm_source=rss&utm_medium=feed"
+        export.loc[variant == 3, "SOURCEURL"] = urls[variant == 3].str.replace(ts, next_ts, regex=False)
+        gkg = processor.process(GDELTJoinKeys.add_key_columns(read(ts, "gkg_df"), "gkg"))
+        inputs.append((ts, gkg, GDELTJoinKeys.add_key_columns(export, "export")))
+
+    joiner = DataJoiner(DEFAULT_MENTIONS_COLUMNS_TO_MAP, DEFAULT_EXPORT_COLUMNS_TO_MAP)
+    export_columns = joiner._get_export_columns(DEFAULT_EXPORT_COLUMNS_TO_MAP)
+
+    def run(url_join: str):
+        index = GDELTURLIndex() if url_join == "canonical" else None
+        matched = 0
+        for ts, gkg, export in inputs:
+            if index is not None:
+                index.add(ts, export, export_columns)
+            joined = joiner.join(gkg, None, export, export_url_index=index)
+            matched += joined.loc[joined["Export_NumMentions"].notna(), "gkg_GKGRECORDID"].nunique()
+        return matched, index
+
+    gkg_rows = sum(len(gkg) for _, gkg, _ in inputs)
+    print(f"{'url join':<12}{'matched':>10}{'rate':>8}{'seconds':>10}")
+    matches = {}
+    for url_join in ("exact", "canonical"):
+        matches[url_join], index = run(url_join)
+        seconds = _best_of(lambda: run(url_join), repeat)
+        print(f"{url_join:<12}{matches[url_join]:>10}{matches[url_join] / gkg_rows:>8.1%}{seconds:>10.3f}")
+    print(f"Last timestamp: {index.last_stats}")
+    assert matches["canonical"] >= matches["exact"], "the canonical URLs match fewer documents than the exact join"
+
+
+# Name of each benchmark as given in the command line
+BENCHMARKS = {
+    "aggregations": benchmark_aggregations,
+    "cold_start": benchmark_cold_start,
+    "country_filter": benchmark_country_filter,
+    "event_window": benchmark_event_window,
+    "import_time": benchmark_import_time,
+    "join_engines": benchmark_join_engines,
+    "join_keys": benchmark_join_keys,
+    "key_stats": benchmark_key_stats,
+    "mapping_checkup": benchmark_mapping_checkup,
+    "parity": benchmark_parity,
+    "parse_engines": benchmark_parse_engines,
+    "prefetch": benchmark_prefetch,
+    "projection": benchmark_projection,
+    "pushdown": benchmark_pushdown,
+    "theme_output": benchmark_theme_output,
+    "theme_parsing": benchmark_theme_parsing,
+    "theme_series": benchmark_theme_series,
+    "themes_filter": benchmark_themes_filter,
+    "url_index": benchmark_url_index,
+}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmarks of the GDELT processing on fixture files")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["all"], help="Benchmark to run")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows per fixture gkg/export file")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (the best is shown)")
+    args = parser.parse_args()
+
+    # Keep the console for the results: the failed timestamps of the fixtures are expected and counted in the results
+    # (the pool workers take the same logging.disable)
+    import logging
+    logging.disable(logging.ERROR)
+
+    names = sorted(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    for name in names:
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name](args.rows, args.repeat)
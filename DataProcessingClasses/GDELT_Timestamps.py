@@ -0,0 +1,125 @@
+""" TIMESTAMPS, JOINCASES AND FILE NAMES OF THE GDELT FILES (only the standard library, so it is imported in milliseconds)"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Base URL for GDELT v2 data where the data is stored
+GDELT_BASE_URL = "http://data.gdeltproject.org/gdeltv2/"
+
+# Name of each file after the timestamp on the GDELT site
+GDELT_FILE_SUFFIXES = {
+    'export': '.export.CSV.zip',
+    'mentions': '.mentions.CSV.zip',
+    'gkg': '.gkg.csv.zip',
+}
+
+# Files needed by each joincase (gkg is always included)
+JOINCASE_FILES = {
+    'gkg_only': ['gkg'],
+    'gkg_mentions': ['gkg', 'mentions'],
+    'gkg_export': ['gkg', 'export'],
+    'all': ['gkg', 'mentions', 'export'],
+}
+
+# Format of the timestamps: YYYYMMDDHHMMSS
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# A new set of files is published every 15 minutes
+TIMESTAMP_STEP = timedelta(minutes=15)
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+
+    """Logging format of the scripts (and of the worker processes)"""
+
+    logging.basicConfig(level=level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def parse_ts(ts: str) -> datetime:
+    """
+    Parse YYYYMMDDHHMMSS into datetime.
+    """
+    return datetime.strptime(ts, TIMESTAMP_FORMAT)
+
+
+def format_ts(dt: datetime) -> str:
+    """
+    Format datetime into YYYYMMDDHHMMSS.
+    """
+    return dt.strftime(TIMESTAMP_FORMAT)
+
+
+def validate_ts_rules(ts: str) -> None:
+
+    """
+    RULES:
+    - must be valid timestamp format
+    - seconds must be 00
+    - minutes must be one of {00, 15, 30, 45}
+    """
+
+    dt = parse_ts(ts)
+    if dt.second != 0:
+        raise ValueError(f"Invalid timestamp seconds (must be 00): {ts}")
+    if dt.minute not in (0, 15, 30, 45):
+        raise ValueError(f"Invalid timestamp minutes (must be 00/15/30/45): {ts}")
+
+
+def expand_timestamps(timestamp_start: str, timestamp_end: Optional[str] = None) -> List[str]:
+
+    """
+    Expand [start, end] into a list of timestamps every 15 minutes.
+
+    Rules:
+    - start is mandatory --> in case we just want to process one timestamp
+    - end is optional --> if not given we just process one timestamp
+    - if end is None -> single timestamp list [start]
+    - end must be >= start
+    - only 15-minute aligned timestamps allowed (enforced by validate_ts_rules)
+    """
+
+    # First validate timestamp_start
+    validate_ts_rules(timestamp_start)
+
+    # Check if timestamp_end was given or not
+    if timestamp_end is None or str(timestamp_end).strip() == "":
+        return [timestamp_start]
+
+    # If timestamp_end was given, validate it
+    validate_ts_rules(timestamp_end)
+
+    start_dt = parse_ts(timestamp_start)
+    end_dt = parse_ts(timestamp_end)
+
+    # Check that timestamp_end is higher in value as date as timestamp_start
+    if end_dt < start_dt:
+        raise ValueError(
+            f"timestamp_end must be >= timestamp_start. "
+            f"Got start={timestamp_start}, end={timestamp_end}"
+        )
+
+    out = []
+    current = start_dt
+    while current <= end_dt:
+        out.append(format_ts(current))
+        current += TIMESTAMP_STEP
+    return out
+
+
+def files_for_joincase(joincase: str) -> List[str]:
+
+    """File types needed by a joincase ('gkg_only', 'gkg_mentions', 'gkg_export', 'all')"""
+
+    if joincase not in JOINCASE_FILES:
+        raise ValueError(f"Unknown joincase: {joincase}. Must be one of: {', '.join(JOINCASE_FILES)}")
+    return list(JOINCASE_FILES[joincase])
+
+
+def file_urls(timestamp: str, joincase: str, base_url: str = GDELT_BASE_URL) -> Dict[str, str]:
+
+    """URL of each file of a timestamp needed by a joincase: {file type: url}"""
+
+    if not base_url.endswith("/"):
+        base_url += "/"
+    return {file_type: f"{base_url}{timestamp}{GDELT_FILE_SUFFIXES[file_type]}" for file_type in files_for_joincase(joincase)}
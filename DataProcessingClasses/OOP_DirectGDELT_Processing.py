@@ -8,19 +8,40 @@ import os
 import pickle
 import pandas as pd
 import numpy as np
-import requests
 import zipfile
 import io
-import sqlite3
-from typing import Dict, List, Tuple, Any, Optional, Union, Literal
+import contextlib
+import copy
+import hashlib
+import json
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Tuple, Any, Optional, Union, Literal, Iterator, BinaryIO, Callable, TYPE_CHECKING
 from pathlib import Path
 from datetime import datetime
 import logging
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+# Timestamps, joincases and file names (standard library only, shared with the command line GDELT_CLI.py)
+from DataProcessingClasses.GDELT_Timestamps import (
+    GDELT_BASE_URL,
+    GDELT_FILE_SUFFIXES,
+    TIMESTAMP_STEP,
+    configure_logging,
+    expand_timestamps,
+    files_for_joincase,
+    format_ts,
+    parse_ts,
+    validate_ts_rules,
+)
+
+# requests and sqlite3 are imported where they are used (download, sql join and join store),
+# and the logging is configured by the scripts (configure_logging), not when this module is imported
+if TYPE_CHECKING:
+    import requests
 
 """ These are data classes that will be input for our functions"""
 
@@ -54,6 +75,25 @@ class GDELTMappingQuality:
     checkmapping_cols: list[str]
     identifier_col: str
 
+# This one is for what process_fileset gives of a timestamp besides its result, merged over the range by the runner
+@dataclass
+class GDELTTimestampOutputs:
+    """
+    Outputs of the pipeline for one timestamp (process_fileset with return_outputs=True).
+    
+    Attributes:
+        key_sketches: KeyColumnSketch of each key column per file (statistics="all"), see GDELTTimestampBatchRunner._merge_key_sketches
+        aggregations: State of each aggregation of the processor ({name: GDELTAggregation.partial})
+        theme_counts: Documents and tone per theme for the theme_series of the processor (GDELTThemeTimeSeries.slice_counts)
+        url_index: Matches of the gkg rows by canonical URL (GDELTURLIndex.last_stats, url_join="canonical")
+        event_window: Matches of the mentions by the event window (GDELTEventWindow.last_stats)
+    """
+    key_sketches: Dict[str, Dict[str, "KeyColumnSketch"]] = field(default_factory=dict)
+    aggregations: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    theme_counts: Optional[pd.DataFrame] = None
+    url_index: Optional[Dict[str, int]] = None
+    event_window: Optional[Dict[str, int]] = None
+
 """
 FIRST CLASS: ThemeParser
 NOTICE: THIS CLASS CONTAINS A SERIES OF FUNCTIONS THAT ARE USED FOR THE THEMES COMPARISON IN THE GKG FILE
@@ -92,20 +132,109 @@ class ThemeParser:
             number = None
             
             if len(parts) >= 2 and parts[1] != "":
-                raw_num = parts[1]
-                try:
-                    number = int(raw_num)
-                except ValueError:
-                    try:
-                        number = float(raw_num)
-                    except ValueError:
-                        number = raw_num
+                number = ThemeParser.parse_number(parts[1])
             
             if theme:
                 items.append({'Theme': theme, 'Number': number})
         
         return items
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def parse_number(raw_num: str) -> Union[int, float, str]:
+
+        """Convert the number of a theme (its character offset) to int, else float, else keep the text"""
+
+        try:
+            return int(raw_num)
+        except ValueError:
+            try:
+                return float(raw_num)
+            except ValueError:
+                return raw_num
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def explode_theme_column(series: pd.Series) -> pd.DataFrame:
+
+        """
+        Vectorized parse_theme_cell for a whole column: every cell is split once on ';' and ','
+        into a long table with one row per theme.
+
+        Returns:
+            DataFrame with columns:
+              'Row' (position of the cell in series), 'Theme' (str) and
+              'Number' (the number as text, formatted as str(parse_number(...)), missing if the token has none)
+            in the same order as parse_theme_cell would give them
+        """
+
+        # Positions as index, so the results can be put back per row
+        cells = pd.Series(series.to_numpy(), index=np.arange(len(series)))
+        cells = cells[cells.notna()].astype(str).str.strip()
+
+        # One row per ';' token (empty tokens are skipped as in parse_theme_cell)
+        tokens = cells.str.split(';').explode().str.strip()
+        tokens = tokens[tokens.notna() & (tokens != "")]
+        if tokens.empty:
+            return pd.DataFrame({'Row': pd.Series(dtype="int64"), 'Theme': pd.Series(dtype=object), 'Number': pd.Series(dtype=object)})
+
+        # Theme is the text before the first ',' and Number the text between the first and the second ','
+        parts = tokens.str.split(',', n=2, expand=True)
+        themes = parts[0].str.strip()
+        if 1 in parts.columns:
+            numbers = parts[1].str.strip()
+            numbers = numbers.where(numbers.notna() & (numbers != ""), None)
+        else:
+            numbers = pd.Series(None, index=parts.index, dtype=object)
+
+        # Format each distinct number only once, exactly as str(parse_number(...))
+        distinct = pd.unique(numbers.dropna())
+        numbers = numbers.map({raw: str(ThemeParser.parse_number(raw)) for raw in distinct})
+
+        long = pd.DataFrame({'Row': tokens.index.to_numpy(), 'Theme': themes.to_numpy(), 'Number': numbers.to_numpy()})
+        return long[long['Theme'] != ""].reset_index(drop=True)
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def join_per_row(long: pd.DataFrame, column: str, n_rows: int) -> np.ndarray:
+
+        """
+        Join the values of a long table (see explode_theme_column) per row as ", "-separated strings.
+        The long table must be ordered by 'Row'. Rows without values get "".
+        """
+
+        values = long[column].to_numpy(dtype=object)
+        rows = long['Row'].to_numpy()
+        present = pd.notna(values)
+        values, rows = values[present].tolist(), rows[present]
+
+        joined = np.full(n_rows, "", dtype=object)
+        if len(rows):
+            # Each row is a contiguous block of the long table
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            ends = np.r_[starts[1:], len(rows)]
+            joined[rows[starts]] = [", ".join(values[start:end]) for start, end in zip(starts, ends)]
+        return joined
     
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def list_array(rows: np.ndarray, values: Any, n_rows: int) -> Any:
+
+        """
+        Arrow list array with one list per row (CSR layout: offsets + values) from the values of a long table.
+        rows must be ordered (each row is a contiguous block); rows without values get an empty list.
+        """
+
+        import pyarrow as pa
+
+        offsets = np.zeros(n_rows + 1, dtype=np.int32)
+        np.cumsum(np.bincount(np.asarray(rows, dtype=np.int64), minlength=n_rows), out=offsets[1:])
+        return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
+
     # It is a static method because does not receive an implicit first argument
     # It is just inside this class for organization purposes
     @staticmethod
@@ -171,12 +300,56 @@ class GKGProcessor:
         "V1PERSONS", "V2ENHANCEDPERSONS", "V1ORGANIZATIONS", "V2ENHANCEDORGANIZATIONS"
     ] """
     
-    def __init__(self, columns_to_drop: Optional[List[str]] = None):
+    # Columns that the processing itself needs, so they are always loaded (even if they are in columns_to_drop)
+    REQUIRED_COLUMNS = ["GKGRECORDID", "V2DOCUMENTIDENTIFIER", "V1THEMES", "V2ENHANCEDTHEMES", "V1.5TONE"]
+
+    # Engines for _process_themes: "vectorized" (one split per column) or "python" (per cell, the original one)
+    THEME_ENGINES = ("vectorized", "python")
+
+    # Theme columns: "strings" (*_list_str, ", "-joined text) or "compact" (Arrow lists of theme ids, see _compact_theme_columns)
+    THEME_OUTPUTS = ("strings", "compact")
+
+    def __init__(
+        self,
+        columns_to_drop: Optional[List[str]] = None,
+        theme_engine: str = "vectorized",
+        theme_output: str = "strings",
+        theme_index: Optional["GDELTThemeIndex"] = None
+    ):
         # Call the columns to be dropped
         self.columns_to_drop = columns_to_drop if columns_to_drop is not None else []
+        if theme_engine not in self.THEME_ENGINES:
+            raise ValueError(f"Unknown theme_engine: {theme_engine}. Must be one of: {', '.join(self.THEME_ENGINES)}")
+        self.theme_engine = theme_engine
+        if theme_output not in self.THEME_OUTPUTS:
+            raise ValueError(f"Unknown theme_output: {theme_output}. Must be one of: {', '.join(self.THEME_OUTPUTS)}")
+        if theme_output == "compact" and theme_engine != "vectorized":
+            raise ValueError("theme_output='compact' requires theme_engine='vectorized'")
+        self.theme_output = theme_output
+        # Vocabulary of the compact theme columns (the ids are the indices of the Arrow dictionaries)
+        self.theme_index = theme_index if theme_index is not None else GDELTThemeIndex()
+        # Columns to drop that were never loaded (projection at parse time), see columns_to_load
+        self.columns_not_loaded: set = set()
         self.logger = logging.getLogger(self.__class__.__name__)
         # Call the class theme parser above defined to use its functions
         self.theme_parser = ThemeParser()
+
+    def columns_to_load(self, all_columns: List[str]) -> List[str]:
+
+        """
+        Get the gkg columns that have to be parsed at all: everything except columns_to_drop
+        (the REQUIRED_COLUMNS are always kept). The others are then never materialized.
+
+        Inputs:
+            all_columns: All the gkg columns (headers of the dictionary)
+
+        Returns:
+            List of columns to load, in file order
+        """
+
+        keep = [col for col in all_columns if col not in self.columns_to_drop or col in self.REQUIRED_COLUMNS]
+        self.columns_not_loaded = set(all_columns) - set(keep)
+        return keep
     
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
 
@@ -220,6 +393,10 @@ class GKGProcessor:
         missing = [col for col in required if col not in df.columns]
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
+
+        # Same outputs, computed with one split per column
+        if self.theme_engine == "vectorized":
+            return self._process_themes_vectorized(df)
         
         # Build theme dictionaries using the function "build_theme_dict" inside the class "theme_parser"
         v1_dict = self.theme_parser.build_theme_dict(df, 'V1THEMES')
@@ -268,6 +445,138 @@ class GKGProcessor:
         df.drop(columns=cols_to_drop, inplace=True)
         
         return df
+
+    # 2nd Step Function (vectorized engine) --->
+    def _process_themes_vectorized(self, df: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        Same outputs as _process_themes with the "python" engine, but each theme column is split
+        only once into a long table (ThemeParser.explode_theme_column) and all the columns are built from it
+        """
+
+        # Validate existence of the key columns (as build_theme_dict does)
+        for c in ['GKGRECORDID', 'V2DOCUMENTIDENTIFIER']:
+            if c not in df.columns:
+                raise KeyError(f"Required column missing: {c}")
+
+        n_rows = len(df)
+        v1_long = self.theme_parser.explode_theme_column(df['V1THEMES'])
+        v2_long = self.theme_parser.explode_theme_column(df['V2ENHANCEDTHEMES'])
+
+        # Per row comparison of the sets of themes, and the last row of each key
+        merged = self._compare_themes_long(v1_long, v2_long)
+        last_row = self._last_row_per_key(df)
+
+        # Arrow lists of theme ids instead of strings
+        if self.theme_output == "compact":
+            return self._compact_theme_columns(df, v1_long, v2_long, merged, last_row)
+
+        # Themes and numbers as readable strings
+        df['V1THEMES_list_str'] = self.theme_parser.join_per_row(v1_long, 'Theme', n_rows)
+        df['V1NUMBERS_list_str'] = self.theme_parser.join_per_row(v1_long, 'Number', n_rows)
+        df['V2ENHANCEDTHEMES_list_str'] = self.theme_parser.join_per_row(v2_long, 'Theme', n_rows)
+        df['V2NUMBERS_list_str'] = self.theme_parser.join_per_row(v2_long, 'Number', n_rows)
+
+        compared = {
+            f'{col}_str': self.theme_parser.join_per_row(merged[merged['_merge'] == side], 'Theme', n_rows)
+            for col, side in self.THEME_COMPARISONS.items()
+        }
+
+        # The python engine compares per key (GKGRECORDID, V2DOCUMENTIDENTIFIER): rows sharing a key
+        # all get the comparison of the last of them
+        if last_row is not None:
+            compared = {col: values[last_row] for col, values in compared.items()}
+
+        for col, values in compared.items():
+            df[col] = values
+
+        return df
+
+    # Comparison columns and the side of the outer merge of _compare_themes_long they come from
+    THEME_COMPARISONS = {
+        'Theme_row_common': 'both',
+        'Theme_row_only_in_V1': 'left_only',
+        'Theme_row_only_in_V2': 'right_only',
+    }
+
+    @staticmethod
+    def _compare_themes_long(v1_long: pd.DataFrame, v2_long: pd.DataFrame) -> pd.DataFrame:
+
+        """Outer merge of the distinct (Row, Theme) pairs of V1 and V2, ordered by row and theme ('_merge' gives the side)"""
+
+        return (
+            v1_long[['Row', 'Theme']].drop_duplicates()
+            .merge(v2_long[['Row', 'Theme']].drop_duplicates(), on=['Row', 'Theme'], how='outer', indicator=True)
+            .sort_values(['Row', 'Theme'], kind='stable')
+        )
+
+    @staticmethod
+    def _last_row_per_key(df: pd.DataFrame) -> Optional[np.ndarray]:
+
+        """
+        Position of the last row of each (GKGRECORDID, V2DOCUMENTIDENTIFIER) key, per row
+        (None when every key is unique, so every row keeps its own comparison)
+        """
+
+        keys = df[['GKGRECORDID', 'V2DOCUMENTIDENTIFIER']]
+        if not keys.duplicated(keep=False).any():
+            return None
+        return (
+            pd.Series(np.arange(len(df)))
+            .groupby([keys[c].to_numpy() for c in keys.columns], dropna=False, sort=False)
+            .transform('last')
+            .to_numpy()
+        )
+
+    def _compact_theme_columns(
+        self,
+        df: pd.DataFrame,
+        v1_long: pd.DataFrame,
+        v2_long: pd.DataFrame,
+        merged: pd.DataFrame,
+        last_row: Optional[np.ndarray]
+    ) -> pd.DataFrame:
+
+        """
+        Compact theme columns (theme_output="compact"), one Arrow list per row instead of a joined string:
+        - V1THEMES_list, V2ENHANCEDTHEMES_list, Theme_row_common, Theme_row_only_in_V1, Theme_row_only_in_V2:
+          list<dictionary<int32, string>>, the ids of the themes in theme_index (its vocabulary is the dictionary)
+        - V1NUMBERS_list, V2NUMBERS_list: list<int32> with the character offsets (offsets that are not integers are left out)
+        """
+
+        import pyarrow as pa
+
+        n_rows = len(df)
+        theme_tables = {
+            'V1THEMES_list': v1_long,
+            'V2ENHANCEDTHEMES_list': v2_long,
+            **{col: merged[merged['_merge'] == side] for col, side in self.THEME_COMPARISONS.items()},
+        }
+
+        # Encode first, so the dictionary has all the themes of this file
+        codes = {col: self.theme_index.encode(long['Theme']) for col, long in theme_tables.items()}
+        dictionary = pa.array(self.theme_index.themes, type=pa.string())
+
+        arrays = {}
+        for col, long in theme_tables.items():
+            values = pa.DictionaryArray.from_arrays(pa.array(codes[col], type=pa.int32()), dictionary)
+            arrays[col] = self.theme_parser.list_array(long['Row'].to_numpy(), values, n_rows)
+        for col, long in (('V1NUMBERS_list', v1_long), ('V2NUMBERS_list', v2_long)):
+            numbers = pd.to_numeric(long['Number'], errors='coerce')
+            integers = numbers.notna() & (numbers % 1 == 0)
+            arrays[col] = self.theme_parser.list_array(
+                long['Row'].to_numpy()[integers.to_numpy()], pa.array(numbers[integers].to_numpy(dtype=np.int32), type=pa.int32()), n_rows
+            )
+
+        # Rows sharing a key get the comparison of the last of them (as in the strings output)
+        if last_row is not None:
+            for col in self.THEME_COMPARISONS:
+                arrays[col] = arrays[col].take(pa.array(last_row))
+
+        order = ['V1THEMES_list', 'V1NUMBERS_list', 'V2ENHANCEDTHEMES_list', 'V2NUMBERS_list', *self.THEME_COMPARISONS]
+        for col in order:
+            df[col] = pd.Series(pd.arrays.ArrowExtensionArray(arrays[col]), index=df.index)
+        return df
     
     # 3rd Step Function --->
     def _drop_columns(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -276,7 +585,10 @@ class GKGProcessor:
 
         # Check if there are any columns in our list of columns that are not in our data frame
         valid_columns = [col for col in self.columns_to_drop if col in df.columns]
-        missing_columns = [col for col in self.columns_to_drop if col not in df.columns]
+        missing_columns = [
+            col for col in self.columns_to_drop
+            if col not in df.columns and col not in self.columns_not_loaded
+        ]
         
         # In case some of our input missing columns are not there, please displayed which were not to be found inside annerror message
         if missing_columns:
@@ -305,8 +617,32 @@ class KeyColumnsCheckUp:
     # - gkg_export: {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "export": "GlobalEventID"}
     # - all: {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "mentions": ["MentionIdentifier", "GlobalEventID"], "export": "GlobalEventID"}
 
-    def __init__(self, key_column_dictionary_document: Optional[Dict[str, Union[str, List[str]]]] = None):
+    # Engines of key_cols_mapping_checkup: "counts" (value_counts of the keys, mapped with a hash lookup)
+    # or "lists" (the original list of the mapped values per row, then its length)
+    MAPPING_ENGINES = ("counts", "lists")
+
+    # Engines of check_key_columns: "exact" and "hll" (one pass over the native values with a KeyColumnSketch,
+    # the sketches can be merged across timestamps) or "strings" (the original unique list of the values as str)
+    KEY_STATS_ENGINES = ("exact", "hll", "strings")
+
+    def __init__(
+        self,
+        key_column_dictionary_document: Optional[Dict[str, Union[str, List[str]]]] = None,
+        mapping_engine: str = "counts",
+        mapped_values: bool = False,
+        key_stats_engine: str = "exact"
+    ):
         self.key_column_dictionary_document = key_column_dictionary_document or {}
+        if key_stats_engine not in self.KEY_STATS_ENGINES:
+            raise ValueError(f"Unknown key_stats_engine: {key_stats_engine}. Must be one of: {', '.join(self.KEY_STATS_ENGINES)}")
+        self.key_stats_engine = key_stats_engine
+        # Sketches of the last check_key_columns: {file key: {statistics prefix: KeyColumnSketch}} (not with "strings")
+        self.sketches: Dict[str, Dict[str, "KeyColumnSketch"]] = {}
+        if mapping_engine not in self.MAPPING_ENGINES:
+            raise ValueError(f"Unknown mapping_engine: {mapping_engine}. Must be one of: {', '.join(self.MAPPING_ENGINES)}")
+        self.mapping_engine = mapping_engine
+        # With the "counts" engine, the lists of mapped values are only built if asked for (they are the key repeated count times)
+        self.mapped_values = mapped_values
         self.logger = logging.getLogger(self.__class__.__name__)
 
     """ This one is to check differences in the values of each columns respectively to each unique values, to if the columns contain only unique values or not """
@@ -330,6 +666,9 @@ class KeyColumnsCheckUp:
             Dictionary with statistics about key columns (length, unique values, differences)
         """
 
+        # Sketches of this call only
+        self.sketches = {}
+
         # If no dictionary is provided, return empty results
         if not self.key_column_dictionary_document:
             self.logger.info("No key column dictionary provided, skipping checks")
@@ -342,15 +681,6 @@ class KeyColumnsCheckUp:
             "export": export_df
         }
 
-        # Dictionary to save the key columns as per the keys in our key_column_dictionary_document
-        # This will store a key and 5 assigned values
-        # 1. The column itself
-        # 2. The amount of items in 1
-        # 3. The unique values in 1
-        # 4. The amount of items in 3
-        # 5. Difference between 2 and 4
-        key_mapping_column: Dict[str, Dict[str, Any]] = {key: {} for key in self.key_column_dictionary_document.keys()}
-
         # Define dictionary for results
         results = {}
 
@@ -389,52 +719,31 @@ class KeyColumnsCheckUp:
                     f"Missing columns: {invalid_columns}. The process will not continue..."
                 )
 
-            # Now we need to differentiate because mentions have a list of two keys
-            # If it already passed the check, then let's save the columns here
-            # TO BE DISPLAYED LATER ON: column_length, column_uniques_length, length_diff_ori_minus_unique
-            
+            # Statistics of each key column: the prefix of their names differs if the file has one key or two (mentions)
+            # TO BE DISPLAYED LATER ON: length, uniquevalues_length and length_difference
             if len(key_list) == 1:  # single key (just one string)
+                prefixes = {key_list[0]: f"key_column_{key_dictionary}"}
+            else:  # Multiple keys (mentions has two keys)
+                prefixes = {col: f"key_column_{e}_{col}" for e, col in enumerate(key_list, start=1)}
 
-                # Defining the column, its values and its unique values
-                col = key_list[0]
+            results[key] = {}
+            for col, prefix in prefixes.items():
                 series = df_name[col]
-                uniques_list = series.dropna().astype(str).unique().tolist()
-
-                # Filling our the elements of our dictionary
-                key_mapping_column[key]["column"] = series
-                key_mapping_column[key]["column_length"] = int(series.shape[0])
-                key_mapping_column[key]["column_uniques"] = uniques_list
-                key_mapping_column[key]["column_uniques_length"] = int(len(uniques_list))
-                key_mapping_column[key]["length_diff_ori_minus_unique"] = int(series.shape[0]) - int(len(uniques_list))
-
-                # Save then into our previously defined dictionary
-                results[key] = {
-                    f"key_column_{key_dictionary}_length":int(series.shape[0]),
-                    f"key_column_{key_dictionary}_uniquevalues_length": int(len(uniques_list)),
-                    f"key_column_{key_dictionary}_length_difference": int(series.shape[0]) - int(len(uniques_list))
-                }
-            
-            else:
-                # Multiple keys (mentions has two keys)
-                results[key] ={}
-
-                for e, col in enumerate(key_list, start=1):  # For the elements in key_dictionary
-                    # Defining the column, its values and its unique values
-                    series = df_name[col]
-                    uniques_list = series.dropna().astype(str).unique().tolist()
-
-                    # If it already passed the check, then let's save the columns here
-                    # TO BE DISPLAYED LATER ON: column_length, column_uniques_length, length_diff_ori_minus_unique in an organized way
-                    key_mapping_column[key][f"column{e}"] = series
-                    key_mapping_column[key][f"column_length{e}"] = int(series.shape[0])
-                    key_mapping_column[key][f"column_uniques{e}"] = uniques_list
-                    key_mapping_column[key][f"column_uniques_length{e}"] = int(len(uniques_list))
-                    key_mapping_column[key][f"length_diff_ori_minus_unique{e}"] = int(series.shape[0]) - int(len(uniques_list))
-
-                    # Save then into our previously defined dictionary
-                    results[key][f"key_column_{e}_{col}_length"] = int(series.shape[0]) # key_dictionary
-                    results[key][f"key_column_{e}_{col}_uniquevalues_length"] = int(len(uniques_list))
-                    results[key][f"key_column_{e}_{col}_length_difference"] = int(series.shape[0]) - int(len(uniques_list))
+                if self.key_stats_engine == "strings":
+                    # Unique values as str, counted from a list (the original way)
+                    uniques_length = len(series.dropna().astype(str).unique().tolist())
+                    results[key].update({
+                        f"{prefix}_length": int(series.shape[0]),
+                        f"{prefix}_uniquevalues_length": int(uniques_length),
+                        f"{prefix}_length_difference": int(series.shape[0]) - int(uniques_length)
+                    })
+                else:
+                    # One pass over the native values (the integer keys of the loader if there are, see GDELTJoinKeys),
+                    # kept as a sketch so the runner can merge the timestamps
+                    keys = GDELTJoinKeys.keys_of(df_name, col)
+                    sketch = KeyColumnSketch(self.key_stats_engine).add(keys if keys is not None else series)
+                    self.sketches.setdefault(key, {})[prefix] = sketch
+                    results[key].update(sketch.metrics(prefix))
     
         # Return the results to be printed
         return results
@@ -489,34 +798,9 @@ class KeyColumnsCheckUp:
 
             # Create our data frame columns
             out_col_names = [gkg_column_name, "mapped mentions values", "mapped count"]
-            
-            # Group mentions by gkg key into lists (only valid mentions)
-            valid_mentions_mask = mentions_column1.notna() & mentions_column1.astype(str).str.strip().ne("")
-            mentions_by_key = (
-                mentions_df.loc[valid_mentions_mask]
-                           .groupby(mentions_column1_name, sort=False)[mentions_column1_name]
-                           .apply(list)  # keep duplicates
-            )
-
-            # Map the grouped lists back to each row's gkg key; fill missing with empty list
-            mapped_lists = (
-                gkg_column
-                .map(mentions_by_key)
-                .apply(lambda v: v if isinstance(v, list) else [])
-            )
-            
-            # Count per row
-            mapped_counts = mapped_lists.str.len()
-
-            # Build output (same length as df)
-            out = pd.DataFrame({
-                out_col_names[0]: gkg_column.values,
-                out_col_names[1]: mapped_lists,
-                out_col_names[2]: mapped_counts
-            })
 
             # Save it into the dictionary
-            df_dict["gkg_vs_mentions"] = out
+            df_dict["gkg_vs_mentions"] = self._mapping_table(gkg_column, mentions_column1, out_col_names, GDELTJoinKeys.pair(gkg_df, gkg_column_name, mentions_df, mentions_column1_name))
         
         # CASE 2: gkg vs export (if both are provided, if on top also export is provided) ----------------------->
         if gkg_df is not None and export_df is not None and "gkg" in self.key_column_dictionary_document and "export" in self.key_column_dictionary_document:
@@ -537,34 +821,9 @@ class KeyColumnsCheckUp:
 
             # Create our data frame columns
             out_col_names = [gkg_column_name, "mapped export values", "mapped count"]
-            
-            # Group mentions by gkg key into lists (only valid mentions)
-            valid_export_mask = export_column1.notna() & export_column1.astype(str).str.strip().ne("")
-            export_by_key = (
-                export_df.loc[valid_export_mask]
-                           .groupby(export_column1_name, sort=False)[export_column1_name]
-                           .apply(list)  # keep duplicates
-            )
-
-            # Map the grouped lists back to each row's gkg key; fill missing with empty list
-            mapped_lists = (
-                gkg_column
-                .map(export_by_key)
-                .apply(lambda v: v if isinstance(v, list) else [])
-            )
-            
-            # Count per row
-            mapped_counts = mapped_lists.str.len()
-
-            # Build output (same length as df)
-            out = pd.DataFrame({
-                out_col_names[0]: gkg_column.values,
-                out_col_names[1]: mapped_lists,
-                out_col_names[2]: mapped_counts
-            })
 
             # Save it into the dictionary
-            df_dict["gkg_vs_export"] = out
+            df_dict["gkg_vs_export"] = self._mapping_table(gkg_column, export_column1, out_col_names, GDELTJoinKeys.pair(gkg_df, gkg_column_name, export_df, export_column1_name))
 
         # CASE 3: mentions vs export (if both are provided, if on top also export is provided) ----------------------->
         if mentions_df is not None and export_df is not None and "mentions" in self.key_column_dictionary_document and "export" in self.key_column_dictionary_document:
@@ -585,37 +844,89 @@ class KeyColumnsCheckUp:
 
             # Create our data frame columns
             out_col_names = [mentions_column2_name, "mapped export values", "mapped count"]
-            
-            # Group mentions by gkg key into lists (only valid mentions)
-            valid_export_mask = export_column.notna() & export_column.astype(str).str.strip().ne("")
-            exports_by_key = (
-                export_df.loc[valid_export_mask]
-                         .groupby(export_column_name, sort=False)[export_column_name]
-                         .apply(list)  # keep duplicates
-            )
-
-            # Map the grouped lists back to each row's gkg key; fill missing with empty list
-            mapped_lists = (
-                mentions_column2
-                .map(exports_by_key)
-                .apply(lambda v: v if isinstance(v, list) else [])
-            )
-            
-            # Count per row
-            mapped_counts = mapped_lists.str.len()
-
-            # Build output (same length as df)
-            out = pd.DataFrame({
-                out_col_names[0]: mentions_column2.values,
-                out_col_names[1]: mapped_lists,
-                out_col_names[2]: mapped_counts
-            })
 
             # Save it into the dictionary
-            df_dict["mentions_vs_exports"] = out
+            df_dict["mentions_vs_exports"] = self._mapping_table(mentions_column2, export_column, out_col_names, GDELTJoinKeys.pair(mentions_df, mentions_column2_name, export_df, export_column_name))
 
         return df_dict
 
+    def _mapping_table(
+        self,
+        left_column: pd.Series,
+        right_column: pd.Series,
+        out_col_names: List[str],
+        keys: Optional[Tuple[pd.Series, pd.Series]] = None
+    ) -> pd.DataFrame:
+
+        """
+        Mapping checkup of one file pair: per row of left_column, how many rows of right_column have the same key.
+
+        Inputs:
+            left_column: Key column of the file the others are mapped to (one output row per row)
+            right_column: Key column of the mapped file (missing and blank keys are never mapped)
+            out_col_names: [key column, mapped values column, count column]
+            keys: Optional (left keys, right keys) integer key columns of the loader (see GDELTJoinKeys.pair).
+                  With the "counts" engine they are counted and looked up instead of the values themselves,
+                  so the keys match as in the join (without the surrounding spaces)
+
+        Returns:
+            DataFrame with the key, the mapped values (the "lists" engine, or the "counts" engine with mapped_values)
+            and the mapped count per row
+        """
+
+        if self.mapping_engine == "lists":
+            return self._mapping_table_lists(left_column, right_column, out_col_names)
+
+        # Count of each valid key of the mapped file, then a hash lookup per row (no list per key)
+        if keys is not None:
+            left_keys, right_keys = keys
+            valid_mask = GDELTJoinKeys.filled_mask(right_keys)
+        else:
+            left_keys, right_keys = left_column, right_column
+            valid_mask = right_column.notna() & right_column.astype(str).str.strip().ne("")
+        counts = right_keys[valid_mask].value_counts(sort=False)
+        counts = counts[counts > 0]  # unused categories of a categorical key
+        mapped_counts = left_keys.map(counts).fillna(0).astype("int64").to_numpy()
+
+        out = {out_col_names[0]: left_column.values}
+        if self.mapped_values:
+            # The same lists as the "lists" engine: the key of the row repeated count times (empty if not mapped)
+            out[out_col_names[1]] = [[key] * int(n) for key, n in zip(left_column.to_numpy(dtype=object), mapped_counts)]
+        out[out_col_names[2]] = mapped_counts
+        return pd.DataFrame(out, index=left_column.index)
+
+    @staticmethod
+    def _mapping_table_lists(left_column: pd.Series, right_column: pd.Series, out_col_names: List[str]) -> pd.DataFrame:
+
+        """The original mapping checkup: the mapped values of each key are grouped into lists, mapped to each row and counted"""
+
+        right_name = right_column.name
+
+        # Group the mapped file by key into lists (only valid keys)
+        valid_mask = right_column.notna() & right_column.astype(str).str.strip().ne("")
+        right_by_key = (
+            right_column[valid_mask].to_frame()
+                                    .groupby(right_name, sort=False)[right_name]
+                                    .apply(list)  # keep duplicates
+        )
+
+        # Map the grouped lists back to each row's key; fill missing with empty list
+        mapped_lists = (
+            left_column
+            .map(right_by_key)
+            .apply(lambda v: v if isinstance(v, list) else [])
+        )
+
+        # Count per row
+        mapped_counts = mapped_lists.str.len()
+
+        # Build output (same length as df)
+        return pd.DataFrame({
+            out_col_names[0]: left_column.values,
+            out_col_names[1]: mapped_lists,
+            out_col_names[2]: mapped_counts
+        })
+
 """
 FOURTH CLASS: DataJoiner
 NOTICE: THIS CLASS CONTAINS A SERIES OF FUNCTIONS THAT ARE USED TO MERGE A DEFINED
@@ -630,11 +941,17 @@ EXPORT: GlobalEventID
 
 class DataJoiner:
     """Joins GKG, Mentions, and Export data"""
+
+    # Join engines: "hash" (in memory with pandas, default) or "sql" (through a sqlite database)
+    JOIN_ENGINES = ("hash", "sql")
     
-    def __init__(self, mentions_columns: list[str], export_columns: list[str], temp_db_path: str = ":memory:"):
+    def __init__(self, mentions_columns: list[str], export_columns: list[str], temp_db_path: str = ":memory:", engine: str = "hash"):
         self.mentions_columns = mentions_columns # List of columns from mentions that we would like to map
         self.export_columns = export_columns  # List of columns from export that we would like to map
         self.temp_db_path = temp_db_path
+        if engine not in self.JOIN_ENGINES:
+            raise ValueError(f"Unknown join engine: {engine}. Must be one of: {', '.join(self.JOIN_ENGINES)}")
+        self.engine = engine
         self.logger = logging.getLogger(self.__class__.__name__)
     
     def join(
@@ -642,6 +959,8 @@ class DataJoiner:
         gkg_df: pd.DataFrame,
         mentions_df: Optional[pd.DataFrame] = None, # Can be given or not
         export_df: Optional[pd.DataFrame] = None, # Can be given or not
+        export_url_index: Optional["GDELTURLIndex"] = None, # Can be given or not (gkg + export, "hash" engine)
+        export_event_window: Optional["GDELTEventWindow"] = None # Can be given or not (gkg + mentions + export, "hash" engine)
     ) -> pd.DataFrame:
         
         """
@@ -651,9 +970,17 @@ class DataJoiner:
             gkg_df: GKG dataframe (required)
             mentions_df: Mentions dataframe (optional)
             export_df: Export dataframe (optional)
+            export_url_index: Optional GDELTURLIndex already holding the rows of export_df (gkg + export only).
+                              gkg is then joined with the indexed export rows by canonical URL, instead of the exact
+                              SOURCEURL of export_df
+            export_event_window: Optional GDELTEventWindow already holding the rows of export_df (gkg + mentions + export).
+                                 The mentions are then joined with the events of the whole window by GlobalEventID,
+                                 instead of the events of export_df only
         
         Returns:
             Joined dataframe with selected columns from mentions and/or export
+            (the key columns of gkg added by the loader, see GDELTJoinKeys, are part of g.* and are kept;
+            GDELTProcessor drops them once the statistics are done)
         """
         # Check if dataframes are provided
         has_mentions = mentions_df is not None
@@ -664,7 +991,24 @@ class DataJoiner:
             self.logger.info(f"Returning gkg only: {len(gkg_df)} rows")
             return gkg_df
         
-        # For all other cases (gkg + mentions, gkg + export, gkg + mentions + export) SQL joins are used
+        if export_url_index is not None and (self.engine != "hash" or has_mentions):
+            raise ValueError("export_url_index is only used to join gkg + export with the 'hash' engine")
+        if export_event_window is not None and (self.engine != "hash" or not has_mentions or not has_export):
+            raise ValueError("export_event_window is only used to join gkg + mentions + export with the 'hash' engine")
+
+        # For all other cases (gkg + mentions, gkg + export, gkg + mentions + export) LEFT JOINs are used
+        # Both engines give the same rows, in the same order
+        if self.engine == "hash":
+            return self._perform_hash_join(
+                gkg_df=gkg_df,
+                mentions_df=mentions_df,
+                export_df=export_df,
+                mentions_columns=self.mentions_columns,
+                export_columns=self.export_columns,
+                export_url_index=export_url_index,
+                export_event_window=export_event_window
+            )
+
         # We call the function to create a virtual sqlite query
         df = self._perform_sql_join(
             gkg_df=gkg_df,
@@ -687,6 +1031,8 @@ class DataJoiner:
 
         """Perform SQL-based join operations opening a virtual sqlite database"""
         
+        import sqlite3
+
         # Connect to the sqlite3 server
         with sqlite3.connect(self.temp_db_path) as conn:
             
@@ -725,25 +1071,25 @@ class DataJoiner:
             # In case mentions df is given then join gkg + mentions
             if mentions_df is not None:
                 # Join mentions to gkg
-                query += """
+                query += f"""
 LEFT JOIN mentions AS m
-    ON TRIM(CAST(g.gkg_V2DOCUMENTIDENTIFIER AS TEXT)) = TRIM(CAST(m.MentionIdentifier AS TEXT))"""
+    ON {self._on_clause(gkg_df, "g", "gkg_V2DOCUMENTIDENTIFIER", mentions_df, "m", "MentionIdentifier")}"""
             
              # In case export df is given then
             if export_df is not None:
                 # An also mentions df is given
                 if mentions_df is not None:
                     # Join export through mentions
-                    query += """
+                    query += f"""
 LEFT JOIN export AS e
-    ON TRIM(CAST(m.GlobalEventID AS TEXT)) = TRIM(CAST(e.GlobalEventID AS TEXT))"""
+    ON {self._on_clause(mentions_df, "m", "GlobalEventID", export_df, "e", "GlobalEventID")}"""
 
             # If only export df is given then
                 else:
                     # Join export to gkg
-                    query += """
+                    query += f"""
 LEFT JOIN export AS e
-    ON TRIM(CAST(g.gkg_V2DOCUMENTIDENTIFIER AS TEXT)) = TRIM(CAST(e.SOURCEURL AS TEXT))"""
+    ON {self._on_clause(gkg_df, "g", "gkg_V2DOCUMENTIDENTIFIER", export_df, "e", "SOURCEURL")}"""
             
             # Execute query and save it
             result = pd.read_sql_query(query, conn)
@@ -753,6 +1099,160 @@ LEFT JOIN export AS e
 
         return result
 
+    # SUPPORT FUNCTION ---> condition of a LEFT JOIN of the sql join
+    @staticmethod
+    def _on_clause(left_df: pd.DataFrame, left_alias: str, left_column: str, right_df: pd.DataFrame, right_alias: str, right_column: str) -> str:
+
+        """
+        ON condition of a join: the integer key columns of the loader when both tables have them (see GDELTJoinKeys),
+        otherwise the columns compared as TRIM(CAST(... AS TEXT))
+        """
+
+        if GDELTJoinKeys.pair(left_df, left_column, right_df, right_column) is not None:
+            return (
+                f'{left_alias}."{GDELTJoinKeys.key_name(left_column)}" = {right_alias}."{GDELTJoinKeys.key_name(right_column)}"'
+            )
+        return f"TRIM(CAST({left_alias}.{left_column} AS TEXT)) = TRIM(CAST({right_alias}.{right_column} AS TEXT))"
+
+    def _perform_hash_join(
+        self,
+        gkg_df: pd.DataFrame,
+        mentions_df: Optional[pd.DataFrame],
+        export_df: Optional[pd.DataFrame],
+        mentions_columns: Optional[List[str]],
+        export_columns: Optional[List[str]],
+        export_url_index: Optional["GDELTURLIndex"] = None,
+        export_event_window: Optional["GDELTEventWindow"] = None
+    ) -> pd.DataFrame:
+
+        """
+        Same LEFT JOINs as _perform_sql_join, done in memory as hash joins on normalized keys
+        (see _join_keys), without copying the data frames to a database and back.
+        The rows come in the same order: gkg order and, per gkg row, the matches in file order.
+        """
+
+        gkg_df.columns = [c.strip() for c in gkg_df.columns]
+
+        # Position of the gkg row (and of the mentions/export row, -1 if none) of each joined row
+        g_pos = np.arange(len(gkg_df))
+        m_pos = None
+        e_pos = None
+
+        # gkg + mentions: gkg_V2DOCUMENTIDENTIFIER = MentionIdentifier
+        if mentions_df is not None:
+            mentions_df.columns = [c.strip() for c in mentions_df.columns]
+            left, right = self._join_keys(gkg_df, "gkg_V2DOCUMENTIDENTIFIER", mentions_df, "MentionIdentifier")
+            g_pos, m_pos = self._left_join_positions(left, right)
+
+        if export_df is not None:
+            export_df.columns = [c.strip() for c in export_df.columns]
+
+            # Export through mentions: m.GlobalEventID = e.GlobalEventID
+            # (or the events of the last hours in export_event_window)
+            if mentions_df is not None:
+                if export_event_window is not None:
+                    event_ids = GDELTJoinKeys.keys_of(mentions_df, "GlobalEventID")
+                    if event_ids is None:
+                        event_ids = mentions_df["GlobalEventID"]
+                    rows, e_pos = export_event_window.left_join(self._take(event_ids.to_frame(), m_pos).iloc[:, 0])
+                    export_df = export_event_window.rows
+                else:
+                    left, right = self._join_keys(mentions_df, "GlobalEventID", export_df, "GlobalEventID")
+                    rows, e_pos = self._left_join_positions(self._take(left.to_frame(), m_pos).iloc[:, 0], right)
+                g_pos, m_pos = g_pos[rows], m_pos[rows]
+
+            # Export to gkg: gkg_V2DOCUMENTIDENTIFIER = SOURCEURL
+            # (or the canonical URLs of the export rows of the last timestamps in export_url_index)
+            else:
+                positions = None
+                if export_url_index is not None:
+                    positions = export_url_index.left_join(
+                        gkg_df["gkg_V2DOCUMENTIDENTIFIER"], GDELTJoinKeys.keys_of(gkg_df, "gkg_V2DOCUMENTIDENTIFIER")
+                    )
+                if positions is not None:
+                    g_pos, e_pos = positions
+                    export_df = export_url_index.rows
+                else:
+                    left, right = self._join_keys(gkg_df, "gkg_V2DOCUMENTIDENTIFIER", export_df, "SOURCEURL")
+                    g_pos, e_pos = self._left_join_positions(left, right)
+
+        # SELECT g.*, m.<col> AS Mentions_<col>, e.<col> AS Export_<col>
+        parts = [gkg_df.iloc[g_pos].reset_index(drop=True)]
+        if mentions_df is not None:
+            m_cols = self._get_mentions_columns(mentions_columns)
+            parts.append(self._take(mentions_df[m_cols], m_pos).set_axis(self._get_column_aliases(m_cols, "Mentions"), axis=1))
+        if export_df is not None:
+            e_cols = self._get_export_columns(export_columns)
+            parts.append(self._take(export_df[e_cols], e_pos).set_axis(self._get_column_aliases(e_cols, "Export"), axis=1))
+        result = pd.concat(parts, axis=1)
+
+        # Print the result
+        self.logger.info(f"Joined data: {len(result)} rows, {len(result.columns)} columns")
+
+        return result
+
+    # SUPPORT FUNCTION ---> keys of a join: the key columns of the loader if both files have them, else normalized here
+    def _join_keys(self, left_df: pd.DataFrame, left_column: str, right_df: pd.DataFrame, right_column: str) -> Tuple[pd.Series, pd.Series]:
+
+        """
+        Keys of the hash join of left_column with right_column: the integer key columns added by the loader
+        (see GDELTJoinKeys) when both data frames have them, otherwise the columns normalized by _normalize_join_keys.
+        """
+
+        keys = GDELTJoinKeys.pair(left_df, left_column, right_df, right_column)
+        if keys is not None:
+            return keys
+        return self._normalize_join_keys(left_df[left_column], right_df[right_column])
+
+    # SUPPORT FUNCTION ---> keys of the hash join, compared as in the SQL join: TRIM(CAST(key AS TEXT))
+    @staticmethod
+    def _normalize_join_keys(left: pd.Series, right: pd.Series) -> Tuple[pd.Series, pd.Series]:
+
+        """
+        Normalize the two key columns of a join so they compare as TRIM(CAST(... AS TEXT)) does:
+        if both are integers they are kept as integers (same text means same number),
+        otherwise both become text without the surrounding spaces. Missing keys never match.
+        """
+
+        if pd.api.types.is_integer_dtype(left.dtype) and pd.api.types.is_integer_dtype(right.dtype):
+            return left.astype("Int64"), right.astype("Int64")
+
+        def as_text(series: pd.Series) -> pd.Series:
+            values = series.astype(object)
+            missing = values.isna()
+            return values.astype(str).str.strip(" ").astype(object).mask(missing)
+
+        return as_text(left), as_text(right)
+
+    # SUPPORT FUNCTION ---> positions of the rows of a LEFT JOIN
+    @staticmethod
+    def _left_join_positions(left: pd.Series, right: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Hash LEFT JOIN of two normalized key columns.
+
+        Returns:
+            (left positions, right positions) of each joined row, the right position being -1 when there is no match.
+            Left rows keep their order and their matches come in the order of the right rows.
+        """
+
+        # .array keeps the nullable integer keys as integers (to_numpy would give objects when a key is missing)
+        left_frame = pd.DataFrame({"key": left.array, "left": np.arange(len(left))})
+        right_frame = pd.DataFrame({"key": right.array, "right": np.arange(len(right))})
+        # Missing keys never match (NULL = NULL is not true in SQL)
+        right_frame = right_frame[right_frame["key"].notna()]
+
+        joined = left_frame.merge(right_frame, on="key", how="left", sort=False)
+        return joined["left"].to_numpy(), joined["right"].fillna(-1).to_numpy(dtype=np.int64)
+
+    # SUPPORT FUNCTION ---> rows of a data frame by position, -1 giving an empty row
+    @staticmethod
+    def _take(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+
+        """Rows of df at positions (missing values where the position is -1), with a new index"""
+
+        return df.reset_index(drop=True).reindex(positions).reset_index(drop=True)
+
     # SUPPORT FUNCTION ---> with predefined columns to map from mentions
     def _get_mentions_columns(self, custom_columns: Optional[List[str]] = None) -> List[str]:
         
@@ -809,16 +1309,24 @@ LEFT JOIN export AS e
         """
 
         selections = []
+        for col, alias in zip(columns, self._get_column_aliases(columns, prefix)):
+            selections.append(f"{table_alias}.{col} AS {alias}")
+        
+        return ",\n    ".join(selections)
+
+    # SUPPORT FUNCTION ---> names of the mapped columns in the joined df (prefix_column)
+    def _get_column_aliases(self, columns: List[str], prefix: str) -> List[str]:
+
+        """Names of the mapped columns in the joined df: prefix_column (GlobalEventID of export as ExportANDMentions_GlobalEventID)"""
+
+        aliases = []
         for col in columns:
             # Special handling for GlobalEventID to avoid confusion
             if col == "GlobalEventID" and prefix == "Export":
-                alias = "ExportANDMentions_GlobalEventID"
+                aliases.append("ExportANDMentions_GlobalEventID")
             else:
-                alias = f"{prefix}_{col}"
-            
-            selections.append(f"{table_alias}.{col} AS {alias}")
-        
-        return ",\n    ".join(selections)
+                aliases.append(f"{prefix}_{col}")
+        return aliases
 
 
 """
@@ -860,8 +1368,13 @@ class MappingAnalyzer:
             raise ValueError(f"Identifier column '{identifier_column}' not found")
         
         # Build mask of rows where the identifier column is filled for non blanks and non NAs
-        id_series = df[identifier_column]
-        id_filled_mask = id_series.notna() & (id_series.astype(str).str.strip() != "")
+        # (from the integer keys of the loader if the joined df still has them, see GDELTJoinKeys)
+        id_keys = GDELTJoinKeys.keys_of(df, identifier_column)
+        if id_keys is not None:
+            id_filled_mask = GDELTJoinKeys.filled_mask(id_keys)
+        else:
+            id_series = df[identifier_column]
+            id_filled_mask = id_series.notna() & (id_series.astype(str).str.strip() != "")
 
         # This will get us the row indexes for which a value is to find in the identifier column
         filled_indexes = df.index[id_filled_mask]
@@ -893,7 +1406,11 @@ class MappingAnalyzer:
             series = df.loc[filled_indexes, col]
 
             # Define another mask but this time for the column in question: NaN OR blank string after stripping
-            empty_mask = series.isna() | (series.astype(str).str.strip() == "")
+            # (a numeric column, e.g. the tones, cannot hold a blank string)
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                empty_mask = series.isna()
+            else:
+                empty_mask = series.isna() | (series.astype(str).str.strip() == "")
             
             # Count the number of empty rows found
             empty_count = int(empty_mask.sum())
@@ -927,37 +1444,202 @@ PLEASE NOTICE THAT THIS FUNCTION ASSUMES.
 class GDELTDataLoader:
 
     """Loads GDELT data files with proper headers from dictionary"""
-    
-    def __init__(self, dictionary_path: str):
+
+    # Base URL for GDELT v2 data where the data is stored
+    DEFAULT_BASE_URL = GDELT_BASE_URL
+
+    # Size of the blocks in which the downloads are streamed
+    DOWNLOAD_BLOCK_SIZE = 1024**2
+
+    # Size of the blocks parsed at once by the pyarrow engine
+    ARROW_BLOCK_SIZE = 16 * 1024**2
+
+    # Parse engines: "python" (slowest, most tolerant), "c" and "pyarrow"
+    PARSE_ENGINES = ("python", "c", "pyarrow")
+
+    # Types added to the column names of Dictionaries.xlsx (the other columns are inferred by the parser)
+    COLUMN_DTYPES = {
+        "gkg": {
+            "V2.1DATE": "int64"
+        },
+        "mentions": {
+            "GlobalEventID": "int64",
+            "EventTimeDate": "int64",
+            "MentionTimeDate": "int64",
+            "MentionDocTone": "float32"
+        },
+        "export": {
+            "GlobalEventID": "int64",
+            "NumMentions": "int64",
+            "NumSources": "int64",
+            "NumArticles": "int64",
+            "GoldsteinScale": "float32",
+            "AvgTone": "float32",
+            "Actor1CountryCode": "category",
+            "Actor2CountryCode": "category",
+            "Actor1Geo_CountryCode": "category",
+            "Actor2Geo_CountryCode": "category",
+            "ActionGeo_CountryCode": "category"
+        }
+    }
+
+    # Define file types and their corresponding dictionary keys
+    FILE_CONFIGS = {
+        'export_df': { # this is how the data frame will be saved in the end
+            'suffix': GDELT_FILE_SUFFIXES['export'], # name and extension of the file as per on the GDELT site
+            'dict_key': 'export', # key to save in the dictionary of data frames
+            'csv_name_pattern': '.export.CSV' # csv patter after being unzipped
+        },
+        'mentions_df': {
+            'suffix': GDELT_FILE_SUFFIXES['mentions'],
+            'dict_key': 'mentions',
+            'csv_name_pattern': '.mentions.CSV'
+        },
+        'gkg_df': {
+            'suffix': GDELT_FILE_SUFFIXES['gkg'],
+            'dict_key': 'gkg',
+            'csv_name_pattern': '.gkg.csv'
+        }
+    }
+
+    def __init__(
+        self,
+        dictionary_path: str,
+        base_url: Optional[str] = None,
+        request_timeout: float = 30,
+        raw_cache: Optional["GDELTRawFileCache"] = None,
+        parse_chunksize: Optional[int] = 20000,
+        max_memory_bytes: Optional[int] = None,
+        spool_max_memory_bytes: int = 16 * 1024**2,
+        parse_engine: str = "c",
+        dictionary_cache: bool = True,
+        join_keys: bool = True
+    ):
         self.dictionary_path = Path(dictionary_path)
+        # If True, the key columns of each file are normalized once when it is loaded (see GDELTJoinKeys)
+        self.join_keys = join_keys
+        # If True, the headers of Dictionaries.xlsx are kept in a JSON file next to it (see _load_dictionaries)
+        self.dictionary_cache = dictionary_cache
+        # Parser used for the CSVs ("c", "pyarrow" or "python"), see _read_csv
+        if parse_engine not in self.PARSE_ENGINES:
+            raise ValueError(f"Unknown parse_engine: {parse_engine}. Must be one of: {', '.join(self.PARSE_ENGINES)}")
+        if parse_engine == "pyarrow":
+            try:
+                import pyarrow.csv  # noqa: F401
+            except ImportError as e:
+                raise ImportError("parse_engine='pyarrow' requires the pyarrow package") from e
+        self.parse_engine = parse_engine
+        # Optional on-disk cache of the downloaded zip files (see GDELTRawFileCache)
+        self.raw_cache = raw_cache
+        # Streaming ingest: rows parsed per chunk, memory limit per timestamp (None = no limit)
+        # and how much of a download is kept in memory before it is spooled to a temporary file
+        self.parse_chunksize = parse_chunksize
+        self.max_memory_bytes = max_memory_bytes
+        self.spool_max_memory_bytes = spool_max_memory_bytes
+        # Memory of the ingest per timestamp: {timestamp: {"peak_memory_bytes": int, "memory_bytes_by_file": {...}}}
+        # (high-water mark of the memory in use while the files are read, and the memory of each data frame read)
+        self.ingest_stats: Dict[Optional[str], Dict[str, Any]] = {}
+        # The site can be swapped (e.g. a local mirror or a local test server serving the same zip names)
+        self.base_url = base_url or self.DEFAULT_BASE_URL
+        if not self.base_url.endswith("/"):
+            self.base_url += "/"
+        self.request_timeout = request_timeout
         self.logger = logging.getLogger(self.__class__.__name__)
         self._load_dictionaries()
     
+    # Headers already loaded in this process: {(dictionary path, mtime_ns, size): {sheet: [headers]}}
+    _DICTIONARY_MEMO: Dict[Tuple[str, int, int], Dict[str, List[str]]] = {}
+
+    # Sheets of Dictionaries.xlsx with the headers of each file type
+    DICTIONARY_SHEETS = ["mentions", "export", "gkg"]
+
     def _load_dictionaries(self):
 
-        """Load column dictionaries from Excel file"""
+        """
+        Load column dictionaries from Excel file.
+
+        Reading the xlsx is slow (openpyxl), so the headers are cached:
+        - in memory, for the other loaders of this process
+        - with dictionary_cache, in <dictionary>.schema.json next to the xlsx (headers and COLUMN_DTYPES),
+          for the next processes (workers, follow mode, the next run)
+        Both are only used while the modification time and size of the xlsx (and COLUMN_DTYPES) are the same.
+        """
+
+        stat = self.dictionary_path.stat()
+        memo_key = (str(self.dictionary_path.resolve()), stat.st_mtime_ns, stat.st_size)
+        if memo_key in self._DICTIONARY_MEMO:
+            self.dictionaries = self._DICTIONARY_MEMO[memo_key]
+            return
+
+        source = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "column_dtypes": self.COLUMN_DTYPES}
+        cache_path = self.dictionary_path.with_suffix(".schema.json")
+        self.dictionaries = self._read_dictionary_cache(cache_path, source) if self.dictionary_cache else None
+
+        if self.dictionaries is None:
+            self.dictionaries = self._read_dictionary_xlsx()
+            if self.dictionary_cache:
+                self._write_dictionary_cache(cache_path, source)
+        self._DICTIONARY_MEMO[memo_key] = self.dictionaries
+
+    def _read_dictionary_xlsx(self) -> Dict[str, List[str]]:
+
+        """Headers of each file type from Dictionaries.xlsx (column A of its sheet)"""
 
         # Import the dictionary database that we already saved
         # The dictionary is in a format of Sheet Name which cohtains the
-        # Dictionary for that specific data
-        self.dict_excel = pd.ExcelFile(self.dictionary_path)
-        self.dictionaries = {}
-        
-        # For this list of sheets in my dictionary, they are already fixed
-        for sheet_name in ["mentions", "export", "gkg"]:
-            # Read the corresponding sheet from the dictionary Excel
-            dict_df = pd.read_excel(self.dict_excel, sheet_name=sheet_name)
-            # Take column A starting from row 2 (index 1) as headers, remember that the dictionaries also have headers
-            headers = dict_df.iloc[0:, 0].dropna().tolist()
-            self.dictionaries[sheet_name] = headers
+        # Dictionary for that specific data (openpyxl is only imported here, when the xlsx is actually read)
+        dictionaries = {}
+        with pd.ExcelFile(self.dictionary_path, engine="openpyxl") as dict_excel:
+            # For this list of sheets in my dictionary, they are already fixed
+            for sheet_name in self.DICTIONARY_SHEETS:
+                # Read the corresponding sheet from the dictionary Excel
+                dict_df = pd.read_excel(dict_excel, sheet_name=sheet_name)
+                # Take column A starting from row 2 (index 1) as headers, remember that the dictionaries also have headers
+                dictionaries[sheet_name] = dict_df.iloc[0:, 0].dropna().tolist()
+        return dictionaries
+
+    def _read_dictionary_cache(self, cache_path: Path, source: Dict[str, Any]) -> Optional[Dict[str, List[str]]]:
+
+        """Headers of the JSON cache, or None if there is none or it was written for another xlsx or COLUMN_DTYPES"""
+
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read the dictionary cache {cache_path}, reading the xlsx: {e}")
+            return None
+
+        if cached.get("source") != source or set(cached.get("dictionaries", {})) != set(self.DICTIONARY_SHEETS):
+            self.logger.info(f"The dictionary cache {cache_path} is out of date, reading the xlsx")
+            return None
+        return cached["dictionaries"]
+
+    def _write_dictionary_cache(self, cache_path: Path, source: Dict[str, Any]) -> None:
+
+        """Write the JSON cache of the headers (atomically; a folder that cannot be written only gives a warning)"""
+
+        schema = {
+            sheet_name: [[name, dtype] for name, dtype in self.get_schema(sheet_name)]
+            for sheet_name in self.DICTIONARY_SHEETS
+        }
+        tmp_path = cache_path.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"source": source, "dictionaries": self.dictionaries, "schema": schema}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            self.logger.warning(f"Could not write the dictionary cache {cache_path}: {e}")
     
-    def load_file(self, file_path: str, file_type: str) -> pd.DataFrame:
+    def load_file(self, file_path: str, file_type: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
 
         """
         Load a single GDELT file with appropriate headers
 
         Args:
             path: location in the computer of the file to be loaded
+            usecols: Optional list of columns to parse (the others are never materialized)
         
         Returns:
             A data frame
@@ -969,20 +1651,9 @@ class GDELTDataLoader:
         if file_type not in self.dictionaries:
             raise ValueError(f"Unknown file type: {file_type}")
         
-        # Save the data frames
-        df = pd.read_csv(file_path, delimiter="\t", quoting=3, engine="python")
-        headers = self.dictionaries[file_type]
-        
-        # Apply new headers to the DataFrame only if they have the same length
-        if len(headers) != df.shape[1]:
-            # Show the mismatch
-            self.logger.warning(
-                f"Header mismatch for {file_type}: CSV has {df.shape[1]} columns, "
-                f"dictionary has {len(headers)} headers"
-            )
-        # In case no mismatch of length was found, map the dictionaries as new headers
-        else:
-            df.columns = headers
+        # Save the data frames (with the selected parse engine and the typed schema)
+        self.ingest_stats[None] = {"peak_memory_bytes": 0, "memory_bytes_by_file": {}}
+        df = self._read_csv(lambda: open(file_path, "rb"), file_type, file_type, None, usecols)
         
         # Display info
         self.logger.info(f"Loaded {file_type}: {len(df)} rows")
@@ -990,7 +1661,434 @@ class GDELTDataLoader:
         # Return the df
         return df
     
-    def download_gdelt_files(self, timestamp_key: str, files_to_download: List[str] = None) -> Dict[str, pd.DataFrame]:
+    def get_file_configs(self, files_to_download: Optional[List[str]] = None) -> Dict[str, Dict[str, str]]:
+        """
+        Get the file configurations (suffix, dictionary key, csv name) for the requested file types.
+
+        Inputs:
+            files_to_download: List of file types (e.g., ['gkg', 'mentions', 'export']). If None, all three files
+
+        Returns:
+            Dictionary {df_name: config} following FILE_CONFIGS
+        """
+
+        # If files_to_download is specified, filter the configurations
+        if files_to_download is None:
+            # Download all files if not specified
+            return dict(self.FILE_CONFIGS)
+
+        file_configs = {} # Create a dictionary
+        for file_type in files_to_download: # Save a name for the dictionary to be used as key for the df
+            df_name = f"{file_type}_df"
+            if df_name in self.FILE_CONFIGS:
+                file_configs[df_name] = self.FILE_CONFIGS[df_name] # Save each in the dictionary
+            else: # File types can only be gkg, mentions, export
+                raise ValueError(f"Unknown file type: {file_type}. Must be one of: gkg, mentions, export")
+        return file_configs
+
+    def build_file_url(self, timestamp_key: str, df_name: str) -> str:
+        """
+        Build the full URL of one GDELT file, e.g. <base_url>20251201143000.gkg.csv.zip
+        """
+        return f"{self.base_url}{timestamp_key}{self.FILE_CONFIGS[df_name]['suffix']}"
+
+    def fetch_raw_file(self, timestamp_key: str, df_name: str, session: Optional["requests.Session"] = None) -> BinaryIO:
+        """
+        Download one zipped GDELT file and return it as an open binary file (no parsing is done here).
+
+        The response is streamed in blocks into a spooled temporary file: small files stay in memory,
+        bigger ones (more than spool_max_memory_bytes) go to a temporary file on disk.
+        So the whole response is never held in memory as one bytes object.
+
+        Inputs:
+            timestamp_key: Timestamp in format YYYYMMDDHHMMSS
+            df_name: One of 'gkg_df', 'mentions_df', 'export_df'
+            session: Optional requests.Session to reuse connections (used by the concurrent downloads)
+
+        Returns:
+            The zip file, opened in binary mode and positioned at its beginning (the caller closes it)
+        """
+
+        # Construct the full URL
+        file_url = self.build_file_url(timestamp_key, df_name)
+        file_name = f"{timestamp_key}{self.FILE_CONFIGS[df_name]['suffix']}"
+
+        # Look first in the raw cache (if there is one)
+        if self.raw_cache is not None:
+            cached_file = self.raw_cache.open(file_name)
+            if cached_file is not None:
+                self.logger.info(f"Loaded {df_name} from cache ({file_name})")
+                return cached_file
+            if self.raw_cache.offline:
+                raise FileNotFoundError(f"{file_name} is not in the raw cache and offline mode is on")
+
+        # Display what is being downloaded
+        self.logger.info(f"Downloading {df_name} from {file_url}")
+
+        import requests
+
+        # Download the zip file block by block into the spool
+        http = session if session is not None else requests
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_max_memory_bytes)
+        try:
+            with http.get(file_url, timeout=self.request_timeout, stream=True) as response:
+                response.raise_for_status()  # Raise exception for bad status codes
+                for block in response.iter_content(chunk_size=self.DOWNLOAD_BLOCK_SIZE):
+                    spool.write(block)
+            spool.seek(0)
+
+            # Save it for the next runs
+            if self.raw_cache is not None:
+                self.raw_cache.put(file_name, spool)
+                spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+
+        return spool
+
+    def read_zipped_csv(
+        self,
+        source: Union[bytes, BinaryIO],
+        df_name: str,
+        timestamp_key: Optional[str] = None,
+        usecols: Optional[List[str]] = None,
+        row_filter: Optional[Callable[[pd.DataFrame], np.ndarray]] = None
+    ) -> pd.DataFrame:
+        """
+        Extract the CSV inside a downloaded GDELT zip and read it with the dictionary headers.
+
+        The CSV is decompressed incrementally from the zip and parsed in chunks of parse_chunksize rows,
+        so neither the whole decompressed file nor the parser buffers are in memory at once.
+        The memory in use is tracked while the file is read (see _account_memory) and, if max_memory_bytes is set,
+        a MemoryError is raised as soon as it is exceeded.
+
+        Inputs:
+            source: The zip file (open binary file or bytes)
+            df_name: One of 'gkg_df', 'mentions_df', 'export_df'
+            timestamp_key: Timestamp to which the memory is accounted (optional)
+            usecols: Optional list of columns to parse (the others are never materialized)
+            row_filter: Optional function (chunk with the dictionary headers -> boolean mask) applied to each
+                        parsed chunk, so the rows it drops are never kept (see _filter_chunk)
+
+        Returns:
+            A data frame
+        """
+
+        config = self.FILE_CONFIGS[df_name]
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        # The zip itself is in memory while the file is read, unless it is a file on disk (or a spool rolled over to one)
+        source_bytes = self._in_memory_bytes(source)
+
+        # Extract and read the CSV from the zip file
+        with zipfile.ZipFile(source) as zip_file:
+            # Get the CSV filename (only one file in the zip)
+            csv_filename = [name for name in zip_file.namelist()
+                        if config['csv_name_pattern'] in name][0]
+            
+            # Read the CSV file (the zip member is decompressed while it is read)
+            df = self._read_csv(
+                lambda: zip_file.open(csv_filename), config['dict_key'], df_name, timestamp_key, usecols, row_filter, source_bytes
+            )
+                
+            # Displayed the name of the df that was loaded and how many rows does it have
+            self.logger.info(f"Loaded {df_name}: {len(df)} rows")
+
+        return df
+
+    def get_schema(self, file_type: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        Get the typed schema of a file: the column names of Dictionaries.xlsx with the types of COLUMN_DTYPES.
+
+        Inputs:
+            file_type: One of 'gkg', 'mentions', 'export'
+
+        Returns:
+            List of (column name, dtype) in file order. dtype None means the parser infers it
+        """
+
+        if file_type not in self.dictionaries:
+            raise ValueError(f"Unknown file type: {file_type}")
+        dtypes = self.COLUMN_DTYPES.get(file_type, {})
+        return [(name, dtypes.get(name)) for name in self.dictionaries[file_type]]
+
+    def _read_csv(
+        self,
+        open_source: Callable[[], BinaryIO],
+        file_type: str,
+        df_name: str,
+        timestamp_key: Optional[str],
+        usecols: Optional[List[str]] = None,
+        row_filter: Optional[Callable[[pd.DataFrame], np.ndarray]] = None,
+        source_bytes: int = 0
+    ) -> pd.DataFrame:
+
+        """
+        Read one GDELT CSV with the selected parse engine.
+
+        If usecols is given, only those columns are parsed (projection at parse time).
+
+        If the fast engine ("c" or "pyarrow") cannot parse the file (a malformed line, a missing value
+        in an integer column, ...), only this file is read again with the python engine and the types
+        are then coerced. open_source is called again for that, so it must return a new stream each time.
+        """
+
+        # Positions of the projected columns (None = all columns)
+        positions = None
+        if usecols is not None:
+            headers = self.dictionaries[file_type]
+            unknown = [col for col in usecols if col not in headers]
+            if unknown:
+                raise ValueError(f"Unknown {file_type} columns in usecols: {unknown}")
+            positions = [i for i, col in enumerate(headers) if col in set(usecols)]
+
+        if self.parse_engine != "python":
+            try:
+                with open_source() as source:
+                    return self._parse_csv(
+                        source, file_type, df_name, timestamp_key, self.parse_engine, positions, row_filter, source_bytes
+                    )
+            except ValueError as e:  # includes pandas ParserError and pyarrow ArrowInvalid
+                self.logger.warning(
+                    f"The {self.parse_engine} engine could not parse {df_name} ({e}); "
+                    f"falling back to the python engine for this file"
+                )
+                # The chunks parsed so far are thrown away
+                stats = self.ingest_stats.get(timestamp_key)
+                if stats is not None:
+                    stats["memory_bytes_by_file"][df_name] = 0
+                    stats.get("pushdown_by_file", {}).pop(df_name, None)
+
+        with open_source() as source:
+            return self._parse_csv(source, file_type, df_name, timestamp_key, "python", positions, row_filter, source_bytes)
+
+    def _parse_csv(
+        self,
+        source: BinaryIO,
+        file_type: str,
+        df_name: str,
+        timestamp_key: Optional[str],
+        engine: str,
+        positions: Optional[List[int]] = None,
+        row_filter: Optional[Callable[[pd.DataFrame], np.ndarray]] = None,
+        source_bytes: int = 0
+    ) -> pd.DataFrame:
+
+        """
+        Parse a GDELT CSV (tab-delimited, no header row, no quoting) in chunks with the given engine,
+        then apply the dictionary headers and the typed schema.
+        positions are the column positions to parse (None = all).
+        row_filter drops rows of each chunk as soon as it is parsed (the kept rows keep their row number as index).
+        source_bytes is the memory of the zip being read (counted in the memory in use until the data frame is done).
+        """
+
+        full_schema = self.get_schema(file_type)
+        schema = full_schema if positions is None else [full_schema[i] for i in positions]
+
+        # The types are given by column position, as the CSV has no header row
+        # Categories are parsed as strings and converted at the end (the categories of chunks differ)
+        typed_positions = {
+            i: dtype for i, (_, dtype) in enumerate(full_schema)
+            if dtype is not None and dtype != "category" and (positions is None or i in positions)
+        }
+
+        chunks = []
+        # Memory of the parsed chunks kept so far
+        chunks_bytes = 0
+        # These are the headers in the dictionaries to be applied
+        headers = [name for name, _ in schema]
+        # Row number in the file of the first row of the next chunk
+        first_row = 0
+
+        if engine == "pyarrow":
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+
+            arrow_types = {"int64": pa.int64(), "float32": pa.float32(), "float64": pa.float64()}
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(autogenerate_column_names=True, block_size=self.ARROW_BLOCK_SIZE),
+                parse_options=pa_csv.ParseOptions(delimiter="\t", quote_char=False),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={f"f{i}": arrow_types[dtype] for i, dtype in typed_positions.items()},
+                    include_columns=None if positions is None else [f"f{i}" for i in positions],
+                    strings_can_be_null=True
+                )
+            )
+            for batch in reader:
+                chunk = batch.to_pandas()
+                chunk.columns = range(chunk.shape[1])
+                if row_filter is not None:
+                    chunk, first_row = self._filter_chunk(chunk, headers, row_filter, first_row, timestamp_key, df_name)
+                chunks.append(chunk)
+                chunks_bytes += int(chunk.memory_usage(deep=True).sum())
+                self._account_memory(timestamp_key, df_name, source_bytes + chunks_bytes)
+
+        else:
+            read_kwargs = {"delimiter": "\t", "quoting": 3, "header": None, "engine": engine, "usecols": positions}
+            if engine == "python":
+                # The python engine uses the csv module, which has a limit on the field size (V2GCAM is huge)
+                self._raise_csv_field_size_limit()
+            else:
+                read_kwargs["dtype"] = typed_positions
+
+            # parse_chunksize=None reads the whole CSV at once (a single chunk)
+            reader = pd.read_csv(source, chunksize=self.parse_chunksize, **read_kwargs)
+            for chunk in (reader if self.parse_chunksize else [reader]):
+                if row_filter is not None:
+                    chunk, first_row = self._filter_chunk(chunk, headers, row_filter, first_row, timestamp_key, df_name)
+                chunks.append(chunk)
+                chunks_bytes += int(chunk.memory_usage(deep=True).sum())
+                self._account_memory(timestamp_key, df_name, source_bytes + chunks_bytes)
+
+        if not chunks:
+            raise pd.errors.EmptyDataError(f"No rows found in {df_name}")
+        if row_filter is not None:
+            # The index is the row number in the file, as if the whole file was filtered at once
+            df = pd.concat(chunks) if len(chunks) != 1 else chunks[0]
+        else:
+            df = pd.concat(chunks, ignore_index=True) if len(chunks) != 1 else chunks[0]
+        # The concatenation is a copy: the chunks and their copy are in memory together until the chunks are dropped
+        if len(chunks) != 1:
+            self._account_memory(timestamp_key, df_name, source_bytes + 2 * chunks_bytes)
+        chunks = None
+        
+        # Apply headers (and types) if they match
+        if len(headers) != df.shape[1]:
+            self.logger.warning(
+                f"Header mismatch for {file_type}: CSV has {df.shape[1]} columns, "
+                f"dictionary has {len(headers)} headers"
+            )
+            self._account_memory(timestamp_key, df_name, source_bytes + chunks_bytes, chunks_bytes)
+            return df
+
+        df.columns = headers
+        df = self._apply_schema(df, schema)
+        # The casts replace one column at a time, so they add at most the largest column to the data frame
+        columns_bytes = df.memory_usage(index=False, deep=True)
+        df_bytes = int(columns_bytes.sum())
+        largest_column = int(columns_bytes.max()) if len(columns_bytes) else 0
+        self._account_memory(timestamp_key, df_name, source_bytes + max(chunks_bytes, df_bytes) + largest_column, df_bytes)
+        return df
+
+    def _filter_chunk(
+        self,
+        chunk: pd.DataFrame,
+        headers: List[str],
+        row_filter: Callable[[pd.DataFrame], np.ndarray],
+        first_row: int,
+        timestamp_key: Optional[str],
+        df_name: str
+    ) -> Tuple[pd.DataFrame, int]:
+
+        """
+        Keep the rows of a parsed chunk for which row_filter is True (filter pushdown).
+        The row_filter sees the chunk with the dictionary headers; the rows parsed and kept are counted
+        in ingest_stats[timestamp_key]["pushdown_by_file"]. Returns the chunk and the row number of the next one.
+        """
+
+        chunk.index = pd.RangeIndex(first_row, first_row + len(chunk))
+        next_row = first_row + len(chunk)
+
+        # Without the dictionary headers the filter cannot find its columns (see the header mismatch warning)
+        if chunk.shape[1] != len(headers):
+            return chunk, next_row
+
+        mask = np.asarray(row_filter(chunk.set_axis(headers, axis=1)), dtype=bool)
+        stats = self.ingest_stats.setdefault(timestamp_key, {"peak_memory_bytes": 0, "memory_bytes_by_file": {}})
+        counts = stats.setdefault("pushdown_by_file", {}).setdefault(df_name, {"rows_parsed": 0, "rows_kept": 0})
+        counts["rows_parsed"] += len(chunk)
+        counts["rows_kept"] += int(mask.sum())
+        return chunk[mask], next_row
+
+    @staticmethod
+    def _apply_schema(df: pd.DataFrame, schema: List[Tuple[str, Optional[str]]]) -> pd.DataFrame:
+
+        """
+        Cast the columns to their schema types (only the ones that are not already right).
+        Values that cannot be converted become missing (integer columns with missing values become Int64).
+        """
+
+        for col, dtype in schema:
+            if dtype is None or col not in df.columns or str(df[col].dtype) == dtype:
+                continue
+            if dtype == "category":
+                df[col] = df[col].astype("category")
+            elif dtype == "int64":
+                values = pd.to_numeric(df[col], errors="coerce")
+                df[col] = values.astype("Int64" if values.isna().any() else "int64")
+            else:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+        return df
+
+    @staticmethod
+    def _raise_csv_field_size_limit() -> None:
+
+        """Increase CSV field size limit to handle large GDELT fields (python engine only)"""
+
+        maxInt = sys.maxsize
+        while True:
+            try: 
+                csv.field_size_limit(maxInt)
+                break
+            except OverflowError:
+                maxInt = int(maxInt/10)
+
+    def _in_memory_bytes(self, source: BinaryIO) -> int:
+
+        """Bytes of a zip source held in memory: a BytesIO or a spool not rolled over to disk (0 for a file on disk)"""
+
+        if isinstance(source, io.BytesIO):
+            return source.getbuffer().nbytes
+        if isinstance(source, tempfile.SpooledTemporaryFile):
+            # The spools of fetch_raw_file stay in memory up to spool_max_memory_bytes (0: never rolled over to disk)
+            position = source.tell()
+            size = source.seek(0, io.SEEK_END)
+            source.seek(position)
+            if not self.spool_max_memory_bytes or size <= self.spool_max_memory_bytes:
+                return size
+        return 0
+
+    def _account_memory(
+        self,
+        timestamp_key: Optional[str],
+        df_name: str,
+        live_bytes: int,
+        kept_bytes: Optional[int] = None
+    ) -> None:
+
+        """
+        Update the high-water mark of the ingest memory of a timestamp (peak_memory_bytes)
+        and stop the ingest if max_memory_bytes is exceeded.
+
+        The memory in use is the data frames of the files already read (memory_bytes_by_file) plus live_bytes,
+        what reading df_name takes at this point: the parsed chunks, their concatenated copy, the schema casts
+        and the zip if it is in memory. kept_bytes is the memory of the df_name data frame once it is read.
+        The sizes come from memory_usage(deep=True), so the peak is close to (not exactly) the process memory.
+        """
+
+        stats = self.ingest_stats.setdefault(timestamp_key, {"peak_memory_bytes": 0, "memory_bytes_by_file": {}})
+        by_file = stats["memory_bytes_by_file"]
+        in_use = live_bytes + sum(nbytes for name, nbytes in by_file.items() if name != df_name)
+        stats["peak_memory_bytes"] = max(stats["peak_memory_bytes"], in_use)
+        if kept_bytes is not None:
+            by_file[df_name] = kept_bytes
+
+        if self.max_memory_bytes is not None and in_use > self.max_memory_bytes:
+            raise MemoryError(
+                f"Ingest of timestamp {timestamp_key} needs more than max_memory_bytes={self.max_memory_bytes} "
+                f"(reached {in_use} bytes while reading {df_name})"
+            )
+
+    def download_gdelt_files(
+        self,
+        timestamp_key: str,
+        files_to_download: List[str] = None,
+        raw_files: Optional[Dict[str, BinaryIO]] = None,
+        usecols: Optional[Dict[str, List[str]]] = None,
+        row_filters: Optional[Dict[str, Callable[[pd.DataFrame], np.ndarray]]] = None
+    ) -> Dict[str, pd.DataFrame]:
         """
         Download GDELT files for a specific timestamp from the GDELT website.
         
@@ -998,9 +2096,15 @@ class GDELTDataLoader:
             timestamp_key: Timestamp in format YYYYMMDDHHMMSS (e.g., '20160218230000')
             files_to_download: List of file types to download (e.g., ['gkg', 'mentions', 'export'])
                              If None, downloads all three files
+            raw_files: Optional {df_name: zip file} already fetched (e.g. by GDELTDownloadPrefetcher).
+                       Files found here are not downloaded again (they are closed after being read)
+            usecols: Optional {file_type: columns} projection (e.g. {'gkg': [...], 'export': [...]}).
+                     Only these columns are parsed; file types not given are parsed completely
+            row_filters: Optional {file_type: row filter} applied to each parsed chunk (see read_zipped_csv)
         
         Returns:
             Dictionary with keys 'export_df', 'mentions_df', 'gkg_df' containing the DataFrames
+            (the peak memory of the ingest is kept in self.ingest_stats[timestamp_key])
         
         Example:
             # Download only GKG
@@ -1014,100 +2118,42 @@ class GDELTDataLoader:
             data = gdelt.download_gdelt_files('20160218230000')
         """
 
-        # Increase CSV field size limit to handle large GDELT fields
-        #import csv
-        #import sys
-        maxInt = sys.maxsize
-        while True:
-            try: 
-                csv.field_size_limit(maxInt)
-                break
-            except OverflowError:
-                maxInt = int(maxInt/10)
+        import requests
 
-        # Base URL for GDELT v2 data where the data is stored
-        base_url = "http://data.gdeltproject.org/gdeltv2/"
-        
-        # Define file types and their corresponding dictionary keys
-        all_file_configs = {
-            'export_df': { # this is how the data frame will be saved in the end
-                'suffix': '.export.CSV.zip', # name and extension of the file as per on the GDELT site
-                'dict_key': 'export', # key to save in the dictionary of data frames
-                'csv_name_pattern': '.export.CSV' # csv patter after being unzipped
-            },
-            'mentions_df': {
-                'suffix': '.mentions.CSV.zip',
-                'dict_key': 'mentions',
-                'csv_name_pattern': '.mentions.CSV'
-            },
-            'gkg_df': {
-                'suffix': '.gkg.csv.zip',
-                'dict_key': 'gkg',
-                'csv_name_pattern': '.gkg.csv'
-            }
-        }
-        
-        # If files_to_download is specified, filter the configurations
-        if files_to_download is not None: # If not empty
-            file_configs = {} # Create a dictionary
-            for file_type in files_to_download: # Save a name for the dictionary to be used as key for the df
-                df_name = f"{file_type}_df"
-                if df_name in all_file_configs:
-                    file_configs[df_name] = all_file_configs[df_name] # Save each in the dictionary
-                else: # File types can only be gkg, mentions, export
-                    raise ValueError(f"Unknown file type: {file_type}. Must be one of: gkg, mentions, export")
-        else:
-            # Download all files if not specified
-            file_configs = all_file_configs
+        # Only the requested file types
+        file_configs = self.get_file_configs(files_to_download)
+        raw_files = raw_files or {}
+
+        # Start the memory accounting of this timestamp from zero
+        self.ingest_stats[timestamp_key] = {"peak_memory_bytes": 0, "memory_bytes_by_file": {}}
         
         # To save the data frames in a dictionary
         result = {}
         
         # Download and process each file type
-        for df_name, config in file_configs.items():
+        for df_name in file_configs:
             try:
-                # Construct the full URL
-                file_url = f"{base_url}{timestamp_key}{config['suffix']}"
+                # Download the zip file (unless it was already fetched)
+                zip_source = raw_files.get(df_name)
+                if zip_source is None:
+                    zip_source = self.fetch_raw_file(timestamp_key, df_name)
                 
-                # Display what is being downloaded
-                self.logger.info(f"Downloading {df_name} from {file_url}")
-                
-                # Download the zip file
-                response = requests.get(file_url, timeout=30)
-                response.raise_for_status()  # Raise exception for bad status codes
-                
-                # Extract and read the CSV from the zip file
-                with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
-                    # Get the CSV filename (only one file in the zip)
-                    csv_filename = [name for name in zip_file.namelist()
-                                if config['csv_name_pattern'] in name][0]
-                    
-                    # Read the CSV file
-                    with zip_file.open(csv_filename) as csv_file:
-                        df = pd.read_csv(csv_file, delimiter="\t", quoting=3, engine="python")
-                        
-                        # Get the appropriate headers from dictionaries
-                        file_type = config['dict_key']
-                        if file_type not in self.dictionaries:
-                            raise ValueError(f"Unknown file type: {file_type}")
-                        
-                        # These are the headers in the dictionaries to be applied
-                        headers = self.dictionaries[file_type]
-                        
-                        # Apply headers if they match
-                        if len(headers) != df.shape[1]:
-                            self.logger.warning(
-                                f"Header mismatch for {file_type}: CSV has {df.shape[1]} columns, "
-                                f"dictionary has {len(headers)} headers"
-                            )
-                        else:
-                            df.columns = headers
-                        
-                        # Displayed the name of the df that was loaded and how many rows does it have
-                        self.logger.info(f"Loaded {df_name}: {len(df)} rows")
-                        
-                        # Store in result dictionary
-                        result[df_name] = df
+                # Store in result dictionary
+                with zip_source:
+                    file_type = self.FILE_CONFIGS[df_name]['dict_key']
+                    result[df_name] = self.read_zipped_csv(
+                        zip_source, df_name, timestamp_key, (usecols or {}).get(file_type), (row_filters or {}).get(file_type)
+                    )
+
+                # Canonical join keys of the file (integers), computed once here for the joins and the key checks
+                if self.join_keys:
+                    n_columns = result[df_name].shape[1]
+                    GDELTJoinKeys.add_key_columns(result[df_name], file_type)
+                    key_columns = result[df_name].iloc[:, n_columns:]
+                    if key_columns.shape[1]:
+                        kept_bytes = self.ingest_stats[timestamp_key]["memory_bytes_by_file"].get(df_name, 0)
+                        kept_bytes += int(key_columns.memory_usage(index=False).sum())
+                        self._account_memory(timestamp_key, df_name, kept_bytes, kept_bytes)
 
             # If the timestamp_key is not found            
             except requests.exceptions.RequestException as e:
@@ -1123,7 +2169,10 @@ class GDELTDataLoader:
                 raise
         
         # Show that all files where downloaded
-        self.logger.info(f"Successfully downloaded {len(result)} file(s) for timestamp {timestamp_key}")
+        self.logger.info(
+            f"Successfully downloaded {len(result)} file(s) for timestamp {timestamp_key} "
+            f"(peak ingest memory: {self.ingest_stats[timestamp_key]['peak_memory_bytes'] / 1024**2:.1f} MB)"
+        )
         return result
 
     
@@ -1136,6 +2185,18 @@ This is the main class using the variables from all other classes to process the
 class GDELTProcessor:
     
     """Main function for GDELT data processing"""
+
+    # Engines of the gkg country filter on V2ENHANCEDLOCATIONS:
+    # "index" (CountryCode of the parsed locations, see LocationParser) or "regex" (the original lookaround regex)
+    COUNTRY_FILTER_ENGINES = ("index", "regex")
+
+    # Engines of the themes_tags filter on gkg_V2ENHANCEDTHEMES_list_str:
+    # "index" (theme ids and prefix ranges of GDELTThemeIndex) or "python" (the original startswith per token)
+    THEMES_FILTER_ENGINES = ("index", "python")
+
+    # Joins of gkg_V2DOCUMENTIDENTIFIER with SOURCEURL (gkg_export joincase):
+    # "exact" (same URL text, same timestamp) or "canonical" (canonical URLs of the last timestamps, see GDELTURLIndex)
+    URL_JOINS = ("exact", "canonical")
     
     # This defines the inputs required for this function
     def __init__(
@@ -1146,19 +2207,114 @@ class GDELTProcessor:
         themes_tags: Optional[List[str]] = None,
         gkg_columns_to_drop: Optional[List[str]] = None,
         mentions_columns_to_map: Optional[List[str]] = None,
-        export_columns_to_map: Optional[List[str]] = None
+        export_columns_to_map: Optional[List[str]] = None,
+        raw_cache: Optional["GDELTRawFileCache"] = None,
+        parse_chunksize: Optional[int] = 20000,
+        max_ingest_memory_bytes: Optional[int] = None,
+        parse_engine: str = "c",
+        project_columns: bool = True,
+        theme_engine: str = "vectorized",
+        join_engine: str = "hash",
+        country_filter_engine: str = "index",
+        filter_pushdown: bool = True,
+        themes_filter_engine: str = "index",
+        theme_index: Optional["GDELTThemeIndex"] = None,
+        theme_output: str = "strings",
+        dictionary_cache: bool = True,
+        mapping_engine: str = "counts",
+        mapped_values: bool = False,
+        key_stats_engine: str = "exact",
+        join_keys: bool = True,
+        url_join: str = "exact",
+        url_index: Optional["GDELTURLIndex"] = None,
+        aggregations: Optional[Dict[str, "GDELTAggregation"]] = None,
+        keep_joined: bool = True,
+        theme_series: Optional["GDELTThemeTimeSeries"] = None
     ):  
 
+        # The inputs of the processor, so the same processor can be built again in worker processes (see worker_config)
+        self.init_kwargs = {name: value for name, value in locals().items() if name != "self"}
+
         # This part is to define functions and variables from classes that will be used here
         # Some of the function with inputs will be defined later
-        self.loader = GDELTDataLoader(dictionary_path)
-        self.gkg_processor = GKGProcessor(gkg_columns_to_drop)
+        self.loader = GDELTDataLoader(
+            dictionary_path,
+            raw_cache=raw_cache,
+            parse_chunksize=parse_chunksize,
+            max_memory_bytes=max_ingest_memory_bytes,
+            parse_engine=parse_engine,
+            dictionary_cache=dictionary_cache,
+            join_keys=join_keys
+        )
+        # Vocabulary of the themes shared by all the timestamps (persisted if it has a path)
+        # It is also the vocabulary of the compact theme columns (theme_output="compact")
+        self.theme_index = theme_index if theme_index is not None else GDELTThemeIndex()
+        self.gkg_processor = GKGProcessor(
+            gkg_columns_to_drop, theme_engine=theme_engine, theme_output=theme_output, theme_index=self.theme_index
+        )
+        if join_engine not in DataJoiner.JOIN_ENGINES:
+            raise ValueError(f"Unknown join_engine: {join_engine}. Must be one of: {', '.join(DataJoiner.JOIN_ENGINES)}")
+        # The compact theme columns are Arrow lists, which sqlite cannot store
+        if theme_output == "compact" and join_engine == "sql":
+            raise ValueError("theme_output='compact' cannot be combined with join_engine='sql'")
+        self.join_engine = join_engine
+        self.theme_output = theme_output
+        # gkg_export joincase: exact SOURCEURL of the same timestamp, or canonical URL over the last timestamps
+        if url_join not in self.URL_JOINS:
+            raise ValueError(f"Unknown url_join: {url_join}. Must be one of: {', '.join(self.URL_JOINS)}")
+        if url_join == "canonical" and join_engine != "hash":
+            raise ValueError("url_join='canonical' requires join_engine='hash'")
+        self.url_join = url_join
+        # The export rows of the earlier timestamps are kept in this index between the filesets
+        self.url_index = (url_index if url_index is not None else GDELTURLIndex()) if url_join == "canonical" else None
+        # Rollups of the joined rows of each timestamp ({name: GDELTAggregation}), merged over the range by the runner
+        for name, aggregation in (aggregations or {}).items():
+            if not isinstance(aggregation, GDELTAggregation):
+                raise ValueError(f"Aggregation {name} must be a GDELTAggregation, got {type(aggregation).__name__}")
+        self.aggregations = dict(aggregations or {})
+        # If False, the joined df is not returned (None, as with a join store): only the statistics and the rollups are kept
+        self.keep_joined = keep_joined
+        # Documents and tone per theme of each timestamp, written into this series by the runner (see GDELTThemeTimeSeries)
+        self.theme_series = theme_series
         # Note: keycolumn_checkup and joiner classes will be initialized per fileset with appropriate key_column_dictionary
         self.analyzer = MappingAnalyzer()
+        # Engine of the mapping checkup of the key columns (and if the lists of mapped values are kept), see KeyColumnsCheckUp
+        if mapping_engine not in KeyColumnsCheckUp.MAPPING_ENGINES:
+            raise ValueError(
+                f"Unknown mapping_engine: {mapping_engine}. Must be one of: {', '.join(KeyColumnsCheckUp.MAPPING_ENGINES)}"
+            )
+        self.mapping_engine = mapping_engine
+        self.mapped_values = mapped_values
+        # Engine of the key columns statistics of statistics="all" ("exact", "hll" or "strings"), see KeyColumnsCheckUp
+        if key_stats_engine not in KeyColumnsCheckUp.KEY_STATS_ENGINES:
+            raise ValueError(
+                f"Unknown key_stats_engine: {key_stats_engine}. Must be one of: {', '.join(KeyColumnsCheckUp.KEY_STATS_ENGINES)}"
+            )
+        self.key_stats_engine = key_stats_engine
         self.country_codes = country_codes
+        # The country filter is built once here: the set of codes (LocationParser.country_mask) or the compiled regex
+        if country_filter_engine not in self.COUNTRY_FILTER_ENGINES:
+            raise ValueError(
+                f"Unknown country_filter_engine: {country_filter_engine}. Must be one of: {', '.join(self.COUNTRY_FILTER_ENGINES)}"
+            )
+        self.country_filter_engine = country_filter_engine
+        codes = [str(c) for c in (country_codes or [])]  # ensure strings
+        self._country_code_set = frozenset(codes)
+        # Regex of the form: (?<=#)(?:US|MX|CA)(?=#) --> anything between #...# (no group, str.contains only needs the match)
+        self._country_pattern = re.compile(r'(?<=#)(?:' + '|'.join(map(re.escape, codes)) + r')(?=#)') if codes else None
         self.themes_tags = themes_tags
+        # The themes_tags filter: "index" (theme ids of GDELTThemeIndex) or "python" (startswith on every token)
+        if themes_filter_engine not in self.THEMES_FILTER_ENGINES:
+            raise ValueError(
+                f"Unknown themes_filter_engine: {themes_filter_engine}. Must be one of: {', '.join(self.THEMES_FILTER_ENGINES)}"
+            )
+        self.themes_filter_engine = themes_filter_engine
         self.mentions_columns_to_map = mentions_columns_to_map
         self.export_columns_to_map = export_columns_to_map
+        # If True, only the columns used by the processing are parsed (see _get_usecols_for_fileset)
+        self.project_columns = project_columns
+        # If True, the filters are applied while the files are parsed and before the theme processing (see _get_row_filters_for_fileset)
+        self.filter_pushdown = filter_pushdown
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -1170,7 +2326,11 @@ class GDELTProcessor:
     def process_fileset(
         self,
         fileset: GDELTFileSet,
-        mapping_columns: Optional[GDELTMappingQuality] = None
+        mapping_columns: Optional[GDELTMappingQuality] = None,
+        raw_files: Optional[Dict[str, BinaryIO]] = None,
+        join_store: Optional["GDELTSQLiteJoinStore"] = None,
+        event_window: Optional["GDELTEventWindow"] = None,
+        return_outputs: bool = False
     ) -> Union[pd.DataFrame, Tuple]:
         """
         Process a complete set of GDELT files (gkg, mentions, export) based on joincase.
@@ -1182,41 +2342,80 @@ class GDELTProcessor:
                 - statistics: str ('all', 'key_columns_stats', 'none')
                 - key_column_dictionary_document: Dict specifying key columns for each file
             mapping_columns: GDELTMappingQuality object (required if statistics != 'none')
+            raw_files: Optional {df_name: zip file} already downloaded for this timestamp
+                       (given by GDELTTimestampBatchRunner when concurrent downloads are used)
+            join_store: Optional GDELTSQLiteJoinStore. If given, the rows are added to the store instead of
+                        being joined here (GDELTTimestampBatchRunner joins the whole range at the end),
+                        and joined_df and mapping_stats are returned as None
+            event_window: Optional GDELTEventWindow (joincase "all", join_engine "hash"). The export events of this
+                          timestamp are added to it and the mentions are joined with all the events of the window
+                          (given by GDELTTimestampBatchRunner, which keeps it between the timestamps)
+            return_outputs: If True, (result, GDELTTimestampOutputs) is returned: the key column sketches, the states of
+                            the aggregations, the documents per theme of the theme_series and the matches of the URL index
+                            and of the event window of this timestamp (what GDELTTimestampBatchRunner merges over the range)
         
         Returns:
             Depending on statistics parameter:
             - 'none': joined_df
             - 'key_columns_stats': (df_key_columns_stats, joined_df)
             - 'all': (key_columns_stats, df_key_columns_stats, joined_df, mapping_stats)
+            With keep_joined=False joined_df is None. With return_outputs=True: (result above, GDELTTimestampOutputs)
         """
 
         self.logger.info(f"Processing fileset for timestamp: {fileset.timestamp}")
 
+        # What this timestamp gives besides its result (only returned with return_outputs=True)
+        outputs = GDELTTimestampOutputs()
+
+        if join_store is not None and self.theme_output == "compact":
+            raise ValueError("theme_output='compact' cannot be combined with a join_store")
+        if join_store is not None and self.url_index is not None:
+            raise ValueError("url_join='canonical' cannot be combined with a join_store")
+        if event_window is not None and (join_store is not None or self.join_engine != "hash"):
+            raise ValueError("event_window requires join_engine='hash' and cannot be combined with a join_store")
+        if join_store is not None and self.aggregations:
+            raise ValueError("aggregations cannot be combined with a join_store (the rows are only joined at the end)")
+
         # Initialize key column checkup and joiner with fileset's key column dictionary
         # These are initialized here because the key columns depend on the joincase
-        keycolumn_checkup = KeyColumnsCheckUp(fileset.key_column_dictionary_document)
-        joiner = DataJoiner(self.mentions_columns_to_map, self.export_columns_to_map)
+        keycolumn_checkup = KeyColumnsCheckUp(
+            fileset.key_column_dictionary_document,
+            mapping_engine=self.mapping_engine,
+            mapped_values=self.mapped_values,
+            key_stats_engine=self.key_stats_engine
+        )
+        joiner = DataJoiner(self.mentions_columns_to_map, self.export_columns_to_map, engine=self.join_engine)
 
         # STEP 0: Determine which files to download based on joincase ------------------
         files_to_download = self._get_files_for_joincase(fileset.joincase)
         
+        # Columns that will actually be used (the others are never parsed)
+        usecols = self._get_usecols_for_fileset(fileset) if self.project_columns else None
+
+        # Filters applied to each chunk as soon as it is parsed (the rows they drop are never kept)
+        row_filters = self._get_row_filters_for_fileset(fileset) if self.filter_pushdown else None
+
         # Download only the required files from GDELT site
-        data = self.loader.download_gdelt_files(fileset.timestamp, files_to_download=files_to_download)
+        data = self.loader.download_gdelt_files(
+            fileset.timestamp,
+            files_to_download=files_to_download,
+            raw_files=raw_files,
+            usecols=usecols,
+            row_filters=row_filters
+        )
 
         # STEP 1: Process gkg (this file is always to be included) ------------------
         gkg_raw = data['gkg_df']
 
         # Now if country code is different to none check filter out column V2ENHANCEDLOCATIONS
-        if self.country_codes: # If they were given
+        # (with filter_pushdown it was already done while parsing)
+        if self.country_codes and not self.filter_pushdown: # If they were given
             if 'V2ENHANCEDLOCATIONS' in gkg_raw.columns: # If the column exists
-            
-                # Build a safe regex pattern of the form: (?<=#)(US|MX|CA)(?=#)
-                codes = [str(c) for c in self.country_codes]  # ensure strings
-                pattern = r'(?<=#)(' + '|'.join(map(re.escape, codes)) + r')(?=#)' # Anything between #...#
+                gkg_raw = gkg_raw[self._country_filter_mask(gkg_raw['V2ENHANCEDLOCATIONS'])]
 
-                # Filter rows where any of the desired codes appears between #...#
-                mask = gkg_raw['V2ENHANCEDLOCATIONS'].str.contains(pattern, regex=True, na=False) # This is the filter
-                gkg_raw = gkg_raw[mask]
+        # Rows that cannot pass the themes_tags filter are dropped before the theme processing
+        if self.themes_tags and self.filter_pushdown:
+            gkg_raw = self._theme_prefilter(gkg_raw, fileset.timestamp)
         
         # Process GKG
         gkg_processed = self.gkg_processor.process(gkg_raw)
@@ -1240,39 +2439,83 @@ class GDELTProcessor:
                 tags = tuple(str(tag).strip() for tag in self.themes_tags)
 
                 # Build a boolean mask: True if any token starts with any given tag
-                mask = (
-                    gkg_processed['gkg_V2ENHANCEDTHEMES_list_str']
-                    .fillna('')
-                    .str.split(',')
-                    .apply(lambda toks: any(t.strip().startswith(tags) for t in toks))
-                )
+                mask = self._themes_tags_mask(gkg_processed['gkg_V2ENHANCEDTHEMES_list_str'], tags)
+
+                gkg_processed = gkg_processed[mask]
 
+            elif 'gkg_V2ENHANCEDTHEMES_list' in gkg_processed.columns: # Compact theme columns (theme_output="compact")
+                tags = tuple(str(tag).strip() for tag in self.themes_tags)
+                mask = self.theme_index.list_row_mask(gkg_processed['gkg_V2ENHANCEDTHEMES_list'], list(tags))
                 gkg_processed = gkg_processed[mask]
         
+        # Documents and tone per theme of this timestamp (after the filters), written into the theme series by the runner
+        if self.theme_series is not None:
+            outputs.theme_counts = self.theme_series.slice_counts(gkg_processed)
+
         # STEP 2: Get the required dataframes based on joincase -----------------------
         mentions_raw = data.get('mentions_df', None)
         export_raw = data.get('export_df', None)
 
         # Filter out if country_codes were given as an input and if column 'Actor1Geo_CountryCode' is to be found
-        if self.country_codes: # If they were given
+        # (with filter_pushdown it was already done while parsing)
+        if self.country_codes and not self.filter_pushdown and export_raw is not None: # If they were given
             if 'Actor1Geo_CountryCode' in export_raw.columns: # If the column exists
                 export_raw = export_raw[export_raw['Actor1Geo_CountryCode'].isin(self.country_codes)]
         
         # STEP 3: Join data ------------------------------------------------------------
-        joined_df = joiner.join(
-            gkg_df=gkg_processed,
-            mentions_df=mentions_raw,
-            export_df=export_raw
-        )
-        
-        # Add time stamp as the first column
-        joined_df.insert(0, 'Time Stamp', fileset.timestamp)
+        if join_store is not None:
+            # The rows are kept in the store and joined together with the other timestamps at the end of the batch
+            # (the store normalizes its own keys, so the key columns of the loader are left out)
+            join_store.add(
+                fileset.timestamp,
+                GDELTJoinKeys.drop(gkg_processed, inplace=False),
+                GDELTJoinKeys.drop(mentions_raw, inplace=False),
+                GDELTJoinKeys.drop(export_raw, inplace=False)
+            )
+            joined_df = None
+        else:
+            # gkg + export with url_join="canonical": the export rows are added to the URL index
+            # and gkg is matched with the ones of the last timestamps by canonical URL
+            url_index = None
+            if self.url_index is not None and mentions_raw is None and export_raw is not None:
+                url_index = self.url_index
+                url_index.add(fileset.timestamp, export_raw, joiner._get_export_columns(self.export_columns_to_map))
+
+            # gkg + mentions + export with an event window: the export events are added to the window
+            # and the mentions are matched with the events of the last hours
+            window = None
+            if event_window is not None and mentions_raw is not None and export_raw is not None:
+                window = event_window
+                window.add(fileset.timestamp, export_raw, joiner._get_export_columns(self.export_columns_to_map))
+
+            joined_df = joiner.join(
+                gkg_df=gkg_processed,
+                mentions_df=mentions_raw,
+                export_df=export_raw,
+                export_url_index=url_index,
+                export_event_window=window
+            )
+
+            # Matches by canonical URL (and by the exact URL) of this timestamp
+            if url_index is not None:
+                outputs.url_index = dict(url_index.last_stats)
+            # Matches of the mentions by the event window (and by the export file of this timestamp alone)
+            if window is not None:
+                outputs.event_window = dict(window.last_stats)
+            
+            # Add time stamp as the first column
+            # (the key columns of gkg are kept until the statistics are done, they are dropped before it is returned)
+            joined_df.insert(0, 'Time Stamp', fileset.timestamp)
+
+            # The rollups of this timestamp, merged over the whole range by GDELTTimestampBatchRunner (see _merge_aggregations)
+            if self.aggregations:
+                outputs.aggregations = {name: aggregation.partial(joined_df) for name, aggregation in self.aggregations.items()}
         
         # STEP 4: Handle statistics based on statistics parameter ---------------------
         if fileset.statistics == "none":
             # Return only the joined dataframe
             self.logger.info(f"Completed processing for {fileset.timestamp} (no statistics)")
-            return joined_df
+            return self._returned_result(self._returned_joined(joined_df), outputs, return_outputs)
             
         elif fileset.statistics == "key_columns_stats":
             # Generate key column statistics only
@@ -1287,7 +2530,7 @@ class GDELTProcessor:
                 df.insert(0, 'Time Stamp', fileset.timestamp)
             
             self.logger.info(f"Completed processing for {fileset.timestamp} (key columns stats only)")
-            return df_key_columns_stats, joined_df
+            return self._returned_result((df_key_columns_stats, self._returned_joined(joined_df)), outputs, return_outputs)
             
         elif fileset.statistics == "all":
             # Validate that mapping_columns is provided
@@ -1301,13 +2544,19 @@ class GDELTProcessor:
                 mentions_df=mentions_raw,
                 export_df=export_raw
             )
+
+            # The sketches of the key columns, merged over the whole range by GDELTTimestampBatchRunner (see _merge_key_sketches)
+            outputs.key_sketches = keycolumn_checkup.sketches
             
             # Analyze mapping quality: Define the tone columns to be used to count their empty mapped values
-            mapping_stats = self.analyzer.analyze_unmapped_tones(
-                joined_df,
-                mapping_columns.checkmapping_cols,
-                mapping_columns.identifier_col
-            )
+            # (with a join store there is no joined df yet, the runner analyzes it after the final join)
+            mapping_stats = None
+            if joined_df is not None:
+                mapping_stats = self.analyzer.analyze_unmapped_tones(
+                    joined_df,
+                    mapping_columns.checkmapping_cols,
+                    mapping_columns.identifier_col
+                )
             
             # -> Statistics saved in a df ----------------
             df_key_columns_stats = keycolumn_checkup.key_cols_mapping_checkup(
@@ -1321,11 +2570,131 @@ class GDELTProcessor:
                 df.insert(0, 'Time Stamp', fileset.timestamp)
             
             self.logger.info(f"Completed processing for {fileset.timestamp} (all statistics)")
-            return key_columns_stats, df_key_columns_stats, joined_df, mapping_stats
+            return self._returned_result(
+                (key_columns_stats, df_key_columns_stats, self._returned_joined(joined_df), mapping_stats), outputs, return_outputs
+            )
         
         else:
             raise ValueError(f"Invalid statistics parameter: {fileset.statistics}. Must be 'all', 'key_columns_stats', or 'none'")
     
+    # Joined df returned by process_fileset: without the key columns, or None if it is not kept
+    def _returned_joined(self, joined_df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """The joined df without the key columns of the loader (None with keep_joined=False: only the statistics and rollups are kept)"""
+        if not self.keep_joined:
+            return None
+        return GDELTJoinKeys.drop(joined_df)
+
+    # Result of process_fileset: with the outputs of the timestamp if they are asked for
+    @staticmethod
+    def _returned_result(result: Any, outputs: GDELTTimestampOutputs, return_outputs: bool) -> Any:
+        """result, or (result, outputs) with return_outputs=True"""
+        return (result, outputs) if return_outputs else result
+
+    # Country filter of STEP 1: rows with a location in one of the country_codes
+    def _country_filter_mask(self, locations: pd.Series) -> np.ndarray:
+        """
+        Boolean mask of the gkg rows with at least one location in country_codes.
+        - "index": the CountryCode of each location is extracted and looked up in the set (LocationParser.country_mask)
+        - "regex": any of the codes appears between #...# (pre-compiled in __init__)
+        """
+        if self.country_filter_engine == "index":
+            return LocationParser.country_mask(locations, self._country_code_set)
+        return locations.str.contains(self._country_pattern, regex=True, na=False).to_numpy(dtype=bool)
+
+    # themes_tags filter of STEP 1: rows with a theme that begins with one of the tags
+    def _themes_tags_mask(self, themes_list_str: pd.Series, tags: Tuple[str, ...]) -> np.ndarray:
+        """
+        Boolean mask of the rows of gkg_V2ENHANCEDTHEMES_list_str with a theme that begins with one of the tags.
+        - "index": the cells are split in Arrow, only the distinct themes are encoded and their ids are checked against
+          the ids of the tags (GDELTThemeIndex.str_row_mask); new themes are added to the index, saved by the batch runner
+        - "python": every token is checked with startswith
+        """
+        if self.themes_filter_engine == "python":
+            return (
+                themes_list_str
+                .fillna('')
+                .str.split(',')
+                .apply(lambda toks: any(t.strip().startswith(tags) for t in toks))
+                .to_numpy(dtype=bool)
+            )
+
+        return self.theme_index.str_row_mask(themes_list_str, list(tags))
+
+    # Filter pushdown: the country filters, applied by the loader to each parsed chunk
+    def _get_row_filters_for_fileset(self, fileset: GDELTFileSet) -> Dict[str, Callable[[pd.DataFrame], np.ndarray]]:
+        """
+        Row filters per file type for GDELTDataLoader.download_gdelt_files (same rows as the filters of process_fileset):
+        - gkg: at least one location of V2ENHANCEDLOCATIONS in country_codes
+        - export: Actor1Geo_CountryCode in country_codes
+        A file without the column is not filtered, as in process_fileset.
+        """
+        if not self.country_codes:
+            return {}
+
+        def gkg_filter(chunk: pd.DataFrame) -> np.ndarray:
+            if 'V2ENHANCEDLOCATIONS' not in chunk.columns:
+                return np.ones(len(chunk), dtype=bool)
+            return self._country_filter_mask(chunk['V2ENHANCEDLOCATIONS'])
+
+        def export_filter(chunk: pd.DataFrame) -> np.ndarray:
+            if 'Actor1Geo_CountryCode' not in chunk.columns:
+                return np.ones(len(chunk), dtype=bool)
+            return chunk['Actor1Geo_CountryCode'].isin(self.country_codes).to_numpy()
+
+        row_filters = {"gkg": gkg_filter}
+        if "export" in self._get_files_for_joincase(fileset.joincase):
+            row_filters["export"] = export_filter
+        return row_filters
+
+    # Filter pushdown: the themes_tags filter, before the theme processing
+    def _theme_prefilter(self, gkg_raw: pd.DataFrame, timestamp: str) -> pd.DataFrame:
+        """
+        Drop the gkg rows that cannot pass the themes_tags filter, before GKGProcessor parses their themes.
+
+        - a row is kept if its raw V2ENHANCEDTHEMES text contains one of the tags (a theme starting with a tag
+          is in the text, so no row of the final result is dropped; the exact filter still runs after the processing)
+        - the rows sharing (GKGRECORDID, V2DOCUMENTIDENTIFIER) with a kept row are kept too, since the theme
+          comparison of GKGProcessor is done per key (the last row of the key)
+        The rows skipped are counted in loader.ingest_stats[timestamp]["pushdown_by_file"]["gkg_themes"].
+        """
+        tags = [str(tag).strip() for tag in self.themes_tags]
+        # An empty tag keeps every row
+        if "" in tags or 'V2ENHANCEDTHEMES' not in gkg_raw.columns:
+            return gkg_raw
+
+        themes = gkg_raw['V2ENHANCEDTHEMES']
+        mask = np.zeros(len(gkg_raw), dtype=bool)
+        for tag in tags:
+            mask |= themes.str.contains(tag, regex=False, na=False).to_numpy(dtype=bool)
+
+        key_cols = ['GKGRECORDID', 'V2DOCUMENTIDENTIFIER']
+        if all(col in gkg_raw.columns for col in key_cols):
+            keys = gkg_raw[key_cols]
+            duplicated = keys.duplicated(keep=False).to_numpy()
+            if duplicated.any():
+                kept_keys = pd.MultiIndex.from_frame(keys[mask & duplicated])
+                mask |= duplicated & pd.MultiIndex.from_frame(keys).isin(kept_keys)
+
+        stats = self.loader.ingest_stats.setdefault(timestamp, {"peak_memory_bytes": 0, "memory_bytes_by_file": {}})
+        stats.setdefault("pushdown_by_file", {})["gkg_themes"] = {"rows_parsed": len(gkg_raw), "rows_kept": int(mask.sum())}
+        self.logger.info(f"Theme prefilter: {int(mask.sum())} of {len(gkg_raw)} gkg rows go through the theme processing")
+        return gkg_raw[mask]
+
+    # Inputs to build the same processor in a worker process (GDELTProcessPool)
+    def worker_config(self) -> Dict[str, Any]:
+        """
+        Inputs of this processor for a worker process.
+        The raw_cache is left out: with worker processes the files are downloaded by the main process.
+        The theme_index is left out too: each worker keeps its own vocabulary in memory (only this process saves it).
+        The url_index is left out as well (url_join="canonical" runs in this process only, see GDELTTimestampBatchRunner.run).
+        The theme_series is replaced by an empty one with the same prefixes: the workers only count the themes of each
+        timestamp, the series itself is filled by this process.
+        """
+        config = {name: value for name, value in self.init_kwargs.items() if name not in ("raw_cache", "theme_index", "url_index")}
+        if self.theme_series is not None:
+            config["theme_series"] = GDELTThemeTimeSeries(prefixes=self.theme_series.prefixes)
+        return config
+
     # This is a suport function for the STEP 0 in the above function
     # Depending on the joincase input, do we retrieve the corresponding df(s)
     def _get_files_for_joincase(self, joincase: str) -> List[str]:
@@ -1338,17 +2707,57 @@ class GDELTProcessor:
         Returns:
             List of file types to download (e.g., ['gkg'], ['gkg', 'mentions'], etc.)
         """
-        if joincase == "gkg_only":
-            return ['gkg']
-        elif joincase == "gkg_mentions":
-            return ['gkg', 'mentions']
-        elif joincase == "gkg_export":
-            return ['gkg', 'export']
-        elif joincase == "all":
-            return ['gkg', 'mentions', 'export']
-        else:
-            raise ValueError(f"Unknown joincase: {joincase}. Must be one of: gkg_only, gkg_mentions, gkg_export, all")
+        return files_for_joincase(joincase)
     
+    # This is a suport function for the STEP 0 in process_fileset
+    # It computes up front which columns of each file will be used, so the loader parses only those
+    def _get_usecols_for_fileset(self, fileset: GDELTFileSet) -> Dict[str, List[str]]:
+        """
+        Determine the columns of each file that the processing of this fileset uses.
+
+        - gkg: everything except gkg_columns_to_drop (the columns needed by GKGProcessor are always kept)
+        - mentions: mentions_columns_to_map + the join keys + the key columns of the statistics
+        - export: export_columns_to_map + the join keys + the key columns of the statistics
+          (+ Actor1Geo_CountryCode when country_codes are given)
+
+        Inputs:
+            fileset: GDELTFileSet (joincase and key_column_dictionary_document are used)
+
+        Returns:
+            Dictionary {file_type: columns} in file order, to be given to GDELTDataLoader as usecols
+        """
+
+        key_columns = fileset.key_column_dictionary_document or {}
+
+        # Key columns of the statistics for a file as a list (they can be a string or a list of strings)
+        def stats_keys(file_type: str) -> List[str]:
+            value = key_columns.get(file_type) or []
+            return [value] if isinstance(value, str) else list(value)
+
+        # To get the default columns to map when none were given
+        joiner = DataJoiner(self.mentions_columns_to_map, self.export_columns_to_map)
+
+        needed = {
+            "gkg": set(self.gkg_processor.columns_to_load(self.loader.dictionaries["gkg"])),
+            "mentions": {"MentionIdentifier", "GlobalEventID"} | set(joiner._get_mentions_columns(self.mentions_columns_to_map)),
+            "export": {"GlobalEventID", "SOURCEURL"} | set(joiner._get_export_columns(self.export_columns_to_map)),
+        }
+        # The gkg key column is given after GKGProcessor added the prefix "gkg_"
+        needed["gkg"] |= {col[len("gkg_"):] for col in stats_keys("gkg") if col.startswith("gkg_")}
+        needed["mentions"] |= set(stats_keys("mentions"))
+        needed["export"] |= set(stats_keys("export"))
+
+        # Columns used by the country filters
+        if self.country_codes:
+            needed["gkg"].add("V2ENHANCEDLOCATIONS")
+            needed["export"].add("Actor1Geo_CountryCode")
+
+        # Keep the file order and only columns that exist in the dictionary
+        return {
+            file_type: [col for col in self.loader.dictionaries[file_type] if col in needed[file_type]]
+            for file_type in self._get_files_for_joincase(fileset.joincase)
+        }
+
     # To save the df with the mapping logic, what was mapped and what is the mapping logic sequence 1:TOHOWMANY
     def save_key_columns_analysis(self, df_dic: Dict[str, pd.DataFrame], timestamp: str, format: str = "xlsx"):
         
@@ -1474,31 +2883,24 @@ class GDELTTimestampBatchRunner:
         """
         Parse YYYYMMDDHHMMSS into datetime.
         """
-        return datetime.strptime(ts, "%Y%m%d%H%M%S")
+        return parse_ts(ts)
 
     @staticmethod
     def _format_ts(dt: datetime) -> str:
         """
         Format datetime into YYYYMMDDHHMMSS.
         """
-        return dt.strftime("%Y%m%d%H%M%S")
+        return format_ts(dt)
 
     @staticmethod
     def _validate_ts_rules(ts: str) -> None:
-
         """
-        RULES:
-        - must be valid timestamp format (delegate to your validate_timestamp)
+        RULES (see GDELT_Timestamps.validate_ts_rules):
+        - must be valid timestamp format
         - seconds must be 00
         - minutes must be one of {00, 15, 30, 45}
         """
-
-        # More check ups to validate minutes and seconds right formatting
-        dt = datetime.strptime(ts, "%Y%m%d%H%M%S")
-        if dt.second != 0:
-            raise ValueError(f"Invalid timestamp seconds (must be 00): {ts}")
-        if dt.minute not in (0, 15, 30, 45):
-            raise ValueError(f"Invalid timestamp minutes (must be 00/15/30/45): {ts}")
+        validate_ts_rules(ts)
 
     def _expand_timestamps(
         self,
@@ -1507,7 +2909,7 @@ class GDELTTimestampBatchRunner:
     ) -> List[str]:
 
         """
-        Expand [start, end] into a list of timestamps every 15 minutes.
+        Expand [start, end] into a list of timestamps every 15 minutes (see GDELT_Timestamps.expand_timestamps).
 
         Rules:
         - start is mandatory --> in case we just want to process one timestamp
@@ -1517,36 +2919,7 @@ class GDELTTimestampBatchRunner:
         - only 15-minute aligned timestamps allowed (enforced by _validate_ts_rules)
         """
 
-        # First validate timestamp_start
-        self._validate_ts_rules(timestamp_start)
-
-        # Check if timestamp_end was given or not
-        if timestamp_end is None or str(timestamp_end).strip() == "":
-            return [timestamp_start]
-
-        # If timestamp_end was given, validate it
-        self._validate_ts_rules(timestamp_end)
-
-        # After validation, define the timestamps formally
-        start_dt = self._parse_ts(timestamp_start)
-        end_dt = self._parse_ts(timestamp_end)
-
-        # Check that timestamp_end is higher in value as date as timestamp_start
-        if end_dt < start_dt:
-            raise ValueError(
-                f"timestamp_end must be >= timestamp_start. "
-                f"Got start={timestamp_start}, end={timestamp_end}"
-            )
-
-        out = []
-        current = start_dt
-        step = timedelta(minutes=15)
-
-        while current <= end_dt:
-            out.append(self._format_ts(current))
-            current += step
-
-        return out
+        return expand_timestamps(timestamp_start, timestamp_end)
 
     # ---------------------------------------------------------------------------
     # Aggregation helpers: These ones will help us to join the data frames
@@ -1583,17 +2956,36 @@ class GDELTTimestampBatchRunner:
         return acc
 
     @staticmethod
-    def _merge_key_columns_stats_dicts(
+    def _merge_ingest_stats_dicts(
         acc: Dict[str, Any],
         ts: str,
-        key_columns_stats: Dict[str, Dict[str, Any]]
+        ingest_stats: Dict[str, Any]
     ) -> Dict[str, Any]:
 
         """
-        Store key_columns_stats per timestamp.
+        Store the ingest memory statistics (high-water mark of the ingest memory, memory of each file) per timestamp.
 
         Output structure:
-            acc[timestamp][file_key] = metrics_dict
+            acc[timestamp] = {"peak_memory_bytes": int, "memory_bytes_by_file": {df_name: int}}
+        """
+
+        if "ingest_stats_by_timestamp" not in acc:
+            acc["ingest_stats_by_timestamp"] = {}
+        acc["ingest_stats_by_timestamp"][ts] = ingest_stats
+        return acc
+
+    @staticmethod
+    def _merge_key_columns_stats_dicts(
+        acc: Dict[str, Any],
+        ts: str,
+        key_columns_stats: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+
+        """
+        Store key_columns_stats per timestamp.
+
+        Output structure:
+            acc[timestamp][file_key] = metrics_dict
         """
         
         if "key_columns_stats_by_timestamp" not in acc:
@@ -1601,6 +2993,95 @@ class GDELTTimestampBatchRunner:
         acc["key_columns_stats_by_timestamp"][ts] = key_columns_stats
         return acc
 
+    @staticmethod
+    def _merge_key_sketches(
+        acc: Dict[str, Any],
+        key_sketches: Dict[str, Dict[str, "KeyColumnSketch"]]
+    ) -> Dict[str, Any]:
+
+        """
+        Merge the KeyColumnSketch of each key column of one timestamp into the ones of the range,
+        and update the statistics of the whole range (same names as key_columns_stats of one timestamp).
+
+        Output structure:
+            acc["key_column_sketches"][file_key][prefix] = KeyColumnSketch (can be merged with the ones of another run)
+            acc["key_columns_stats_range"][file_key] = metrics_dict
+        """
+
+        range_sketches = acc.setdefault("key_column_sketches", {})
+        for file_key, sketches in key_sketches.items():
+            for prefix, sketch in sketches.items():
+                if prefix in range_sketches.setdefault(file_key, {}):
+                    range_sketches[file_key][prefix].merge(sketch)
+                else:
+                    range_sketches[file_key][prefix] = copy.deepcopy(sketch)
+        acc["key_columns_stats_range"] = {
+            file_key: {name: value for prefix, sketch in sketches.items() for name, value in sketch.metrics(prefix).items()}
+            for file_key, sketches in range_sketches.items()
+        }
+        return acc
+
+    def _merge_aggregations(self, acc: Dict[str, Any], partials: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+
+        """
+        Add the states of the aggregations of one timestamp (GDELTAggregation.partial) to the ones of the range.
+        The states wait in a list and are merged when they are as many rows as the merged one,
+        so each group of the range is only merged again a few times (not once per timestamp).
+
+        Output structure:
+            acc["aggregation_pending"][name] = [merged state, states of the next timestamps...]
+            (replaced by "aggregation_states" and "aggregations" at the end of the run, see _finish_aggregations)
+        """
+
+        pending = acc.setdefault("aggregation_pending", {})
+        for name, partial in partials.items():
+            states = pending.setdefault(name, [])
+            states.append(partial)
+            if len(states) > 1 and sum(len(state) for state in states[1:]) >= len(states[0]):
+                pending[name] = [self.processor.aggregations[name].merge(states)]
+        return acc
+
+    def _finish_aggregations(self, acc: Dict[str, Any]) -> Dict[str, Any]:
+
+        """
+        Merge the states of each aggregation of the range and give its rollup.
+
+        Output structure:
+            acc["aggregation_states"][name] = state (can be merged with the ones of another run, GDELTAggregation.merge)
+            acc["aggregations"][name] = DataFrame of the rollup (GDELTAggregation.result)
+        """
+
+        pending = acc.pop("aggregation_pending", {})
+        if not pending:
+            return acc
+        states = {name: self.processor.aggregations[name].merge(parts) for name, parts in pending.items()}
+        acc["aggregation_states"] = states
+        acc["aggregations"] = {name: self.processor.aggregations[name].result(state) for name, state in states.items()}
+        return acc
+
+    @staticmethod
+    def _merge_match_stats(acc: Dict[str, Any], name: str, match_stats: Dict[str, int], rows: str) -> Dict[str, Any]:
+
+        """
+        Add the matches of one timestamp by a GDELTURLIndex (url_join="canonical", rows="gkg_rows")
+        or a GDELTEventWindow (event_window, rows="mentions_rows") to the ones of the range.
+
+        Output structure:
+            acc[name] = {rows: int, <rows>_matched: int, <rows>_matched_earlier_timestamps: int,
+                         <rows>_matched_exact: int, "match_rate": float, "match_rate_exact": float}
+            (the exact matches are the ones of the exact join of each timestamp on its own)
+        """
+
+        totals = acc.setdefault(name, {})
+        for count in (rows, f"{rows}_matched", f"{rows}_matched_earlier_timestamps", f"{rows}_matched_exact"):
+            if count in match_stats:
+                totals[count] = totals.get(count, 0) + match_stats[count]
+        n_rows = totals.get(rows, 0)
+        totals["match_rate"] = totals.get(f"{rows}_matched", 0) / n_rows if n_rows else 0.0
+        if f"{rows}_matched_exact" in totals:
+            totals["match_rate_exact"] = totals[f"{rows}_matched_exact"] / n_rows if n_rows else 0.0
+        return acc
+
     @staticmethod
     def _merge_df_key_columns_stats_dicts(
         acc: Dict[str, Any],
@@ -1661,6 +3142,267 @@ class GDELTTimestampBatchRunner:
         
         return out
 
+    @staticmethod
+    def _keep_joined(
+        ts: str,
+        joined_df: Optional[pd.DataFrame],
+        joined_frames: List[pd.DataFrame],
+        sink: Optional["GDELTOutputSink"]
+    ) -> None:
+
+        """
+        Keep the joined df of a timestamp: written to the sink if one is given, else kept for the final concatenation.
+        (None when a join store is used: the range is joined at the end)
+        """
+
+        if joined_df is None:
+            return
+        if sink is not None:
+            sink.write(ts, joined_df)
+        else:
+            joined_frames.append(joined_df)
+
+    def _accumulate_result(
+        self,
+        ts: str,
+        result: Any,
+        outputs: Optional[GDELTTimestampOutputs],
+        ingest_stats: Optional[Dict[str, Any]],
+        statistics: str,
+        stats_acc: Dict[str, Any],
+        joined_frames: List[pd.DataFrame],
+        sink: Optional["GDELTOutputSink"]
+    ) -> Tuple[Dict[str, Any], Optional[pd.DataFrame]]:
+
+        """
+        Merge the result of process_fileset of one timestamp, its outputs (GDELTTimestampOutputs)
+        and its ingest statistics into the accumulators.
+        Returns the updated stats_acc and the joined df of the timestamp (None with a join store).
+
+        The joined df is written to the sink (or kept) first and the accumulators are only merged after it,
+        so a timestamp whose write fails (and that follow tries again) is never merged twice.
+        """
+
+        # Cases depending whether I want statistics or not
+        # statistics == "none": just the joined data frame
+        if statistics == "none":
+            joined_df = result
+        # statistics == "key_columns_stats": the joined data frame and the df_key_cols_stats
+        elif statistics == "key_columns_stats":
+            df_key_cols_stats, joined_df = result
+        # statistics == "all": both dfs plus the statistics
+        elif statistics == "all":
+            key_columns_stats, df_key_cols_stats, joined_df, mapping_stats = result
+        # In case the value of statistiscs was not valid, raise an error
+        else:
+            raise ValueError(f"Unknown statistics value: {statistics}")
+        self._keep_joined(ts, joined_df, joined_frames, sink)
+
+        # The outputs of the pipeline for this timestamp, merged over the range
+        if outputs is not None:
+            # Sketches of the key columns (statistics="all")
+            if outputs.key_sketches:
+                stats_acc = self._merge_key_sketches(stats_acc, outputs.key_sketches)
+            # The rollups are only kept merged over the range (not per timestamp)
+            if outputs.aggregations:
+                stats_acc = self._merge_aggregations(stats_acc, outputs.aggregations)
+            # The themes of the timestamp go into the column of the timestamp of the theme series
+            if outputs.theme_counts is not None and self.processor.theme_series is not None:
+                self.processor.theme_series.add(ts, outputs.theme_counts)
+                stats_acc["theme_series"] = self.processor.theme_series.metadata()
+            if outputs.url_index:
+                stats_acc = self._merge_match_stats(stats_acc, "url_index_range", outputs.url_index, "gkg_rows")
+            if outputs.event_window:
+                stats_acc = self._merge_match_stats(stats_acc, "event_window_range", outputs.event_window, "mentions_rows")
+
+        # Peak memory of the ingest of this timestamp (reported by the loader)
+        if ingest_stats is not None:
+            stats_acc = self._merge_ingest_stats_dicts(stats_acc, ts, ingest_stats)
+
+        if statistics == "key_columns_stats":
+            stats_acc = self._merge_df_key_columns_stats_dicts(stats_acc, ts, df_key_cols_stats)
+        elif statistics == "all":
+            stats_acc = self._merge_key_columns_stats_dicts(stats_acc, ts, key_columns_stats)
+            stats_acc = self._merge_df_key_columns_stats_dicts(stats_acc, ts, df_key_cols_stats)
+            if mapping_stats is not None:
+                stats_acc = self._merge_mapping_stats_dicts(stats_acc, ts, mapping_stats)
+
+        return stats_acc, joined_df
+
+    @staticmethod
+    def _result_without_joined(result: Any, statistics: str) -> Any:
+
+        """The result of process_fileset with None instead of the joined df (what the checkpoint keeps with a sink)"""
+
+        if statistics == "none":
+            return None
+        if statistics == "key_columns_stats":
+            return result[0], None
+        return result[0], result[1], None, result[3]
+
+    @staticmethod
+    def _keep_last_timestamps(by_timestamp: Dict[str, Any], keep_last: int) -> None:
+
+        """Drop the oldest timestamps of a per-timestamp dict, so only the last keep_last are left"""
+
+        for ts in sorted(by_timestamp)[:max(len(by_timestamp) - keep_last, 0)]:
+            del by_timestamp[ts]
+
+    # ---------------------------------------------------------------------------
+    # Download helper: sequential or concurrent (GDELTDownloadPrefetcher)
+    # ---------------------------------------------------------------------------
+
+    def _iter_downloads(
+        self,
+        timestamps: List[str],
+        joincase: str,
+        download_workers: int,
+        max_connections_per_host: int,
+        max_pending_timestamps: int
+    ) -> Iterator[Tuple[str, Optional[Dict[str, BinaryIO]], Optional[Exception]]]:
+
+        """
+        Yield (timestamp, raw_files, download_error) in timestamp order.
+
+        - download_workers <= 1: raw_files is None, so process_fileset downloads the files itself
+        - download_workers > 1: raw_files are downloaded concurrently ahead of the processing
+        """
+
+        if download_workers <= 1:
+            for ts in timestamps:
+                yield ts, None, None
+            return
+
+        files_to_download = self.processor._get_files_for_joincase(joincase)
+
+        with GDELTDownloadPrefetcher(
+            self.processor.loader,
+            max_workers=download_workers,
+            max_connections_per_host=max_connections_per_host,
+            max_pending_timestamps=max_pending_timestamps
+        ) as prefetcher:
+            yield from prefetcher.iter_downloads(timestamps, files_to_download)
+
+    # ---------------------------------------------------------------------------
+    # Processing helper: in this process or in worker processes (GDELTProcessPool)
+    # ---------------------------------------------------------------------------
+
+    def _iter_results(
+        self,
+        timestamps: List[str],
+        base_fileset: "GDELTFileSet",
+        mapping_columns: Optional["GDELTMappingQuality"],
+        download_workers: int,
+        max_connections_per_host: int,
+        max_pending_timestamps: int,
+        process_workers: int,
+        join_store: Optional["GDELTSQLiteJoinStore"],
+        event_window: Optional["GDELTEventWindow"] = None
+    ) -> Iterator[Tuple[str, Any, Optional[GDELTTimestampOutputs], Optional[Dict[str, Any]], Optional[Exception]]]:
+
+        """
+        Yield (timestamp, result of process_fileset, outputs, ingest_stats, error) in timestamp order.
+
+        - process_workers <= 1: process_fileset runs here, one timestamp after the other
+        - process_workers > 1: process_fileset runs in worker processes; the files are still downloaded
+          here (with at least one download thread, so the downloads overlap with the processing)
+        """
+
+        # Create a new fileset per timestamp (do not mutate caller)
+        def fileset_for(ts: str) -> "GDELTFileSet":
+            return GDELTFileSet(
+                timestamp=ts,
+                joincase=base_fileset.joincase,
+                statistics=base_fileset.statistics,
+                key_column_dictionary_document=base_fileset.key_column_dictionary_document
+            )
+
+        if process_workers > 1:
+            downloads = self._iter_downloads(
+                timestamps, base_fileset.joincase, max(download_workers, 2), max_connections_per_host, max_pending_timestamps
+            )
+            with contextlib.closing(downloads), GDELTProcessPool(
+                self.processor, max_workers=process_workers, max_pending_timestamps=max_pending_timestamps
+            ) as pool:
+                yield from pool.iter_results(downloads, fileset_for, mapping_columns)
+            return
+
+        downloads = self._iter_downloads(
+            timestamps, base_fileset.joincase, download_workers, max_connections_per_host, max_pending_timestamps
+        )
+        with contextlib.closing(downloads):
+            for ts, raw_files, download_error in downloads:
+                # A failed concurrent download is handled as any other failure of this timestamp
+                if download_error is not None:
+                    yield ts, None, None, None, download_error
+                    continue
+                try:
+                    result, outputs = self.processor.process_fileset(
+                        fileset_for(ts), mapping_columns, raw_files=raw_files, join_store=join_store, event_window=event_window,
+                        return_outputs=True
+                    )
+                except Exception as e:
+                    yield ts, None, None, None, e
+                    continue
+                # Peak memory of the ingest of this timestamp (reported by the loader)
+                yield ts, result, outputs, self.processor.loader.ingest_stats.pop(ts, None), None
+
+    # ---------------------------------------------------------------------------
+    # Checkpoint helpers: finished timestamps are read back from GDELTBatchCheckpoint
+    # ---------------------------------------------------------------------------
+
+    def _checkpoint_signature(
+        self,
+        base_fileset: "GDELTFileSet",
+        mapping_columns: Optional["GDELTMappingQuality"],
+        join_store: Optional["GDELTSQLiteJoinStore"],
+        event_window: Optional["GDELTEventWindow"] = None
+    ) -> Dict[str, Any]:
+
+        """
+        Configuration a checkpoint belongs to: everything that changes the result of a timestamp.
+        (With a join store the rows of the finished timestamps are in its database, so its path is part of it)
+        """
+
+        return {
+            "joincase": base_fileset.joincase,
+            "statistics": base_fileset.statistics,
+            "key_column_dictionary_document": base_fileset.key_column_dictionary_document,
+            "mapping_columns": None if mapping_columns is None else {
+                "checkmapping_cols": mapping_columns.checkmapping_cols,
+                "identifier_col": mapping_columns.identifier_col,
+            },
+            "processor": self.processor.worker_config(),
+            "join_store": None if join_store is None else str(join_store.db_path.resolve()),
+            "event_window_hours": None if event_window is None else event_window.window_hours,
+            "shard_format": GDELTBatchCheckpoint.SHARD_FORMAT,
+        }
+
+    @staticmethod
+    def _iter_with_checkpoint(
+        timestamps: List[str],
+        resumed: set,
+        results: Iterator[Tuple[str, Any, Optional[GDELTTimestampOutputs], Optional[Dict[str, Any]], Optional[Exception]]],
+        checkpoint: "GDELTBatchCheckpoint"
+    ) -> Iterator[Tuple[str, Any, Optional[GDELTTimestampOutputs], Optional[Dict[str, Any]], Optional[Exception]]]:
+
+        """
+        Yield (timestamp, result, outputs, ingest_stats, error) in timestamp order:
+        the resumed timestamps from their shard (one at a time), the other ones from results.
+        """
+
+        with contextlib.closing(results):
+            for ts in timestamps:
+                if ts not in resumed:
+                    yield next(results)
+                    continue
+                try:
+                    result, outputs, ingest_stats = checkpoint.load(ts)
+                except Exception as e:
+                    yield ts, None, None, None, e
+                    continue
+                yield ts, result, outputs, ingest_stats, None
+
     # -------------------------------------------
     # MAIN FUNCTION THAT WRAPS the GDELTProcessor
     # -------------------------------------------
@@ -1673,7 +3415,16 @@ class GDELTTimestampBatchRunner:
         timestamp_end: Optional[str] = None,
         on_error: Literal["raise", "skip"] = "raise",
         return_mode: Literal["match_processor", "always_dict"] = "always_dict",
-        flatten_df_key_columns_stats: bool = True
+        flatten_df_key_columns_stats: bool = True,
+        download_workers: int = 1,
+        max_connections_per_host: int = 4,
+        max_pending_timestamps: int = 8,
+        join_store: Optional["GDELTSQLiteJoinStore"] = None,
+        process_workers: int = 1,
+        sink: Optional["GDELTOutputSink"] = None,
+        checkpoint: bool = False,
+        resume: bool = False,
+        event_window: Optional["GDELTEventWindow"] = None
     ) -> Any:
 
         """
@@ -1698,6 +3449,47 @@ class GDELTTimestampBatchRunner:
             flatten_df_key_columns_stats:
                 If True and you later want to save all stats in one Excel,
                 flatten per-timestamp sheet dict into one sheet dict.
+            download_workers:
+                - 1: download the files of each timestamp right before processing it (sequential)
+                - >1: download the files of the next timestamps concurrently (GDELTDownloadPrefetcher)
+                  while the earlier ones are being processed. Results still come out in timestamp order
+            max_connections_per_host:
+                Maximum number of simultaneous connections to the same host (only when download_workers > 1)
+            max_pending_timestamps:
+                How many timestamps ahead can be downloaded and kept in memory (only when download_workers > 1)
+            join_store:
+                - None: each timestamp is joined on its own and the joined dfs are concatenated
+                - GDELTSQLiteJoinStore: the rows of each timestamp are added to the store and the whole range
+                  is joined with a single query at the end (same rows). The store can still be queried after the run.
+                  Not used for joincase="gkg_only" (nothing to join). It must map the same columns as the processor
+                  (mentions_columns_to_map and export_columns_to_map), else a ValueError is raised
+            process_workers:
+                - 1: process_fileset runs in this process
+                - >1: process_fileset of several timestamps runs at the same time in worker processes
+                  (GDELTProcessPool). The files are downloaded in this process, and the results, statistics
+                  and failures are the same as with 1. It cannot be combined with a join_store
+            sink:
+                - None: the joined dfs are concatenated and returned as joined_df
+                - GDELTOutputSink (GDELTParquetDatasetSink, GDELTParquetFileSink, GDELTCSVAppendSink): the joined df
+                  of each timestamp is written as soon as it is processed, joined_df is None and
+                  "output" has the metadata of what was written. The runner closes the sink at the end
+            checkpoint:
+                - False: nothing is kept on disk until the results are saved
+                - True: each finished timestamp is recorded in <output_dir>/Checkpoint (GDELTBatchCheckpoint):
+                  manifest.json plus one shard with its result and statistics. An earlier checkpoint is cleared
+            resume:
+                - True: the timestamps already in the checkpoint (same configuration) are read from their shards
+                  instead of being downloaded and processed again, the other ones are processed and recorded.
+                  The results are the same as a run of the whole range. Implies checkpoint=True. With a join_store,
+                  the same database file must be given, since the rows of the finished timestamps are in it.
+                  With a GDELTParquetDatasetSink the shards keep only the statistics (the joined rows are in the
+                  sink), and the resumed timestamps still in the same sink folder are not written again
+            event_window:
+                - None: the mentions of each timestamp are joined with the export events of the same timestamp
+                - GDELTEventWindow (joincase="all" only): sliding window join. The export events of each timestamp
+                  are kept for window_hours, so the mentions of the later timestamps also find the events first
+                  seen in an earlier one. The memory is bounded by the window. The timestamps are processed here
+                  in order, so it cannot be combined with process_workers > 1, a join_store or resume
 
         Returns:
             If return_mode="always_dict", returns:
@@ -1705,12 +3497,20 @@ class GDELTTimestampBatchRunner:
                   "timestamps_requested": [...],
                   "timestamps_processed": [...],
                   "timestamps_failed": {ts: "error message", ...},
-                  "joined_df": <pd.DataFrame>,
+                  "joined_df": <pd.DataFrame>,                        # None when a sink is given or with keep_joined=False
+                  "output": {...},                                    # metadata of the sink (only when a sink is given)
+                  "checkpoint": {...},                                # path, timestamps done and resumed (only with checkpoint/resume)
                   "stats": {
                       "key_columns_stats_by_timestamp": {...},        # only when statistics="all"
                       "mapping_stats_by_timestamp": {...},            # only when statistics="all"
                       "df_key_columns_stats_by_timestamp": {...},     # when statistics="all" or "key_columns_stats"
-                      "df_key_columns_stats_flat": {...}              # optional flattened workbook dict
+                      "df_key_columns_stats_flat": {...},             # optional flattened workbook dict
+                      "ingest_stats_by_timestamp": {...},             # peak memory of the parsed files per timestamp
+                      "url_index_range": {...},                       # matches by canonical URL (only with url_join="canonical")
+                      "event_window_range": {...},                    # matches of the mentions by the event window (only with event_window)
+                      "aggregation_states": {name: state},            # mergeable states of the processor aggregations (only with aggregations)
+                      "aggregations": {name: rollup df},              # rollups of the whole range (GDELTAggregation.result)
+                      "theme_series": {...}                           # size of the processor theme_series (only with theme_series)
                   }
                 }
 
@@ -1742,60 +3542,140 @@ class GDELTTimestampBatchRunner:
         # A dictionary of the failures to be processed
         failed: Dict[str, str] = {}
 
-        # Now our loop for each time stamp comprised in our interval
-        for ts in timestamps:
-            try:
-                # Create a new fileset per timestamp (do not mutate caller)
-                fs = GDELTFileSet(
-                    timestamp=ts,
-                    joincase=base_fileset.joincase,
-                    statistics=base_fileset.statistics,
-                    key_column_dictionary_document=base_fileset.key_column_dictionary_document
-                )
-
-                # This saves the result of the mapping_columns
-                result = self.processor.process_fileset(fs, mapping_columns)
-
-                # Cases depending whether I want statistics or not
-
-                # In case statistics == "none", just return the joined data frames
-                if fs.statistics == "none":
-                    joined_df = result
-                    joined_frames.append(joined_df)
-
-                # In case statistics == "key_columns_stats", just return the joined data frames and the df_key_cols_stats
-                elif fs.statistics == "key_columns_stats":
-                    df_key_cols_stats, joined_df = result
-                    joined_frames.append(joined_df)
-                    stats_acc = self._merge_df_key_columns_stats_dicts(stats_acc, ts, df_key_cols_stats)
-
-                # In case statistics == "all", then return both dfs plus the statistics
-                elif fs.statistics == "all":
-                    key_columns_stats, df_key_cols_stats, joined_df, mapping_stats = result
-                    joined_frames.append(joined_df)
+        # gkg_only has nothing to join (DataJoiner returns gkg as it is), so the store is not used
+        if base_fileset.joincase == "gkg_only":
+            join_store = None
+        # The store is a single sqlite connection of this process
+        if join_store is not None and process_workers > 1:
+            raise ValueError("join_store cannot be combined with process_workers > 1")
+        # The store maps the columns it was created with, they must be the ones of the processor
+        if join_store is not None:
+            join_store.check_columns(self.processor.mentions_columns_to_map, self.processor.export_columns_to_map)
+        # The URL index keeps the export rows of the earlier timestamps, so they have to be processed here and all of them
+        if self.processor.url_index is not None and (process_workers > 1 or resume):
+            raise ValueError("url_join='canonical' cannot be combined with process_workers > 1 or resume")
+        # The event window keeps the export events of the earlier timestamps in this process
+        if event_window is not None:
+            if base_fileset.joincase != "all":
+                raise ValueError("event_window is only used with joincase='all'")
+            if process_workers > 1 or join_store is not None or resume:
+                raise ValueError("event_window cannot be combined with process_workers > 1, a join_store or resume")
+
+        # Checkpoint of the finished timestamps, read back on resume
+        batch_checkpoint: Optional[GDELTBatchCheckpoint] = None
+        resumed: List[str] = []
+        if checkpoint or resume:
+            batch_checkpoint = GDELTBatchCheckpoint(
+                self.processor.output_dir / "Checkpoint",
+                self._checkpoint_signature(base_fileset, mapping_columns, join_store, event_window)
+            )
+            if resume:
+                done = set(batch_checkpoint.resume())
+                # A timestamp recorded without its joined rows (they were written to a sink) is only resumed
+                # if this sink still holds them, else it is processed again
+                for ts in sorted(done):
+                    output = batch_checkpoint.output(ts)
+                    if output is not None and (sink is None or not sink.holds(ts, output)):
+                        self.logger.warning(f"The joined rows of {ts} are not in this sink, it will be processed again")
+                        done.discard(ts)
+                resumed = [ts for ts in timestamps if ts in done]
+                self.logger.info(f"Resuming: {len(resumed)} of {len(timestamps)} timestamps are already done")
+            else:
+                batch_checkpoint.reset()
+
+        # Downloads (sequential or concurrent) and processing (here or in worker processes)
+        results = self._iter_results(
+            [ts for ts in timestamps if ts not in resumed],
+            base_fileset,
+            mapping_columns,
+            download_workers,
+            max_connections_per_host,
+            max_pending_timestamps,
+            process_workers,
+            join_store,
+            event_window
+        )
+        if batch_checkpoint is not None:
+            results = self._iter_with_checkpoint(timestamps, set(resumed), results, batch_checkpoint)
 
-                    stats_acc = self._merge_key_columns_stats_dicts(stats_acc, ts, key_columns_stats)
-                    stats_acc = self._merge_df_key_columns_stats_dicts(stats_acc, ts, df_key_cols_stats)
-                    stats_acc = self._merge_mapping_stats_dicts(stats_acc, ts, mapping_stats)
+        # The sink is closed at the end, also if the run stops on an error (what was written stays readable)
+        with (sink if sink is not None else contextlib.nullcontext()):
 
-                # In case the value of statistiscs was not valid, raise an error
+            # Now our loop for each time stamp comprised in our interval
+            with contextlib.closing(results):
+                for ts, result, outputs, ingest_stats, error in results:
+                    try:
+                        # A failed download or process_fileset is handled as any other failure of this timestamp
+                        if error is not None:
+                            raise error
+
+                        # Statistics and joined df of this timestamp
+                        # (with a join store joined_df is None: the range is joined at the end)
+                        # (with a sink the joined data frames are written instead of kept)
+                        stats_acc, joined_df = self._accumulate_result(
+                            ts, result, outputs, ingest_stats, base_fileset.statistics, stats_acc, joined_frames, sink
+                        )
+
+                        processed.append(ts)
+
+                        # Record the finished timestamp (the resumed ones are already in the checkpoint)
+                        # With a sink that keeps its output across runs, the shard only has the statistics
+                        if batch_checkpoint is not None and ts not in resumed:
+                            rows = None if joined_df is None else len(joined_df)
+                            if joined_df is not None and sink is not None and sink.holds(ts, sink.output(ts)):
+                                batch_checkpoint.record(
+                                    ts, self._result_without_joined(result, base_fileset.statistics), outputs, ingest_stats, rows,
+                                    sink.output(ts)
+                                )
+                            else:
+                                batch_checkpoint.record(ts, result, outputs, ingest_stats, rows)
+                        # A resumed timestamp already in the sink is not written again, only counted
+                        elif batch_checkpoint is not None and sink is not None and batch_checkpoint.output(ts) is not None:
+                            sink.adopt(ts, batch_checkpoint.output(ts))
+
+                    # When a file for a timestamp could not be processed, then show which one failed
+                    except Exception as e:
+                        msg = f"{type(e).__name__}: {e}"
+                        failed[ts] = msg
+                        self.logger.error(f"Failed timestamp {ts}: {msg}")
+
+                        if on_error == "raise":
+                            raise
+                        # if "skip": continue
+
+            # Final joined data frame
+            if join_store is not None:
+                files = self.processor._get_files_for_joincase(base_fileset.joincase)
+                if sink is not None:
+                    # With a sink, each timestamp is read from the store on its own (the range is never in memory)
+                    joined_by_ts = ((ts, join_store.join([ts], files)) for ts in processed)
+                    final_joined = None
                 else:
-                    raise ValueError(f"Unknown statistics value: {fs.statistics}")
-
-                processed.append(ts)
-
-            # When a file for a timestamp could not be processed, then show which one failed
-            except Exception as e:
-                msg = f"{type(e).__name__}: {e}"
-                failed[ts] = msg
-                self.logger.error(f"Failed timestamp {ts}: {msg}")
-
-                if on_error == "raise":
-                    raise
-                # if "skip": continue
+                    # A single query for the whole range
+                    final_joined = join_store.join(processed, files)
+                    joined_by_ts = ((ts, final_joined[final_joined["Time Stamp"] == ts]) for ts in processed)
+
+                for ts, joined_df in joined_by_ts:
+                    # The mapping quality is analyzed per timestamp on the joined rows
+                    if base_fileset.statistics == "all" and mapping_columns is not None:
+                        mapping_stats = self.processor.analyzer.analyze_unmapped_tones(
+                            joined_df,
+                            mapping_columns.checkmapping_cols,
+                            mapping_columns.identifier_col
+                        )
+                        stats_acc = self._merge_mapping_stats_dicts(stats_acc, ts, mapping_stats)
+                    if sink is not None:
+                        sink.write(ts, joined_df)
+            else:
+                final_joined = None if sink is not None or not self.processor.keep_joined else self._concat_or_empty(joined_frames)
 
-        # Final joined data frame
-        final_joined = self._concat_or_empty(joined_frames)
+        # Rollups of the aggregations over the whole range, the theme vocabulary and the theme series written to disk
+        stats_acc = self._finish_aggregations(stats_acc)
+        self.processor.theme_index.save()
+        if self.processor.theme_series is not None:
+            self.processor.theme_series.save()
+        if self.processor.loader.raw_cache is not None:
+            self.processor.loader.raw_cache.flush()
 
         # Flattening for Excel saving (single workbook) for the df_key_columns_stats_by_timestamp
         if flatten_df_key_columns_stats and "df_key_columns_stats_by_timestamp" in stats_acc:
@@ -1814,14 +3694,19 @@ class GDELTTimestampBatchRunner:
 
         # If we want that wat is return is everything then use this
         if return_mode == "always_dict":
-            return {
+            batch_result = {
                 "timestamps_requested": timestamps, # Timestamps within the given range
                 "timestamps_processed": processed, # Timestamps that were actually processed
                 "timestamps_failed": failed, # Time stamps that failed to be processed
-                "joined_df": final_joined, # The joined df
+                "joined_df": final_joined, # The joined df (None when it was written to a sink)
                 "stats": stats_acc, # The statistics of the key mapping for each df
                 "processing_time_seconds": elapsed_time # To show how much time it took to process everything
             }
+            if sink is not None:
+                batch_result["output"] = sink.metadata() # What was written by the sink
+            if batch_checkpoint is not None:
+                batch_result["checkpoint"] = {**batch_checkpoint.metadata(), "timestamps_resumed": resumed}
+            return batch_result
 
         # If we just need the return everything but not as a dictionary and do not show the timestamps_requested, timestamps_processed and timestamps_failed
         if return_mode == "match_processor":
@@ -1845,5 +3730,3263 @@ class GDELTTimestampBatchRunner:
 
             raise ValueError(f"Unknown statistics value: {base_fileset.statistics}")
 
+    # ---------------------------------------------------------------------------
+    # FOLLOW MODE: process each new timestamp of lastupdate.txt as it is published
+    # ---------------------------------------------------------------------------
+
+    def follow(
+        self,
+        base_fileset: "GDELTFileSet",
+        sink: "GDELTOutputSink",
+        mapping_columns: Optional["GDELTMappingQuality"] = None,
+        watcher: Optional["GDELTLastUpdateWatcher"] = None,
+        start_after: Optional[str] = None,
+        poll_interval_seconds: float = 60,
+        max_backoff_seconds: float = 900,
+        max_retries: int = 3,
+        max_timestamps: Optional[int] = None,
+        stop_event: Optional[threading.Event] = None,
+        checkpoint: bool = True,
+        download_workers: int = 1,
+        max_connections_per_host: int = 4,
+        max_pending_timestamps: int = 8,
+        event_window: Optional["GDELTEventWindow"] = None,
+        keep_last: int = 96
+    ) -> Dict[str, Any]:
+
+        """
+        Long-running mode: poll lastupdate.txt and process each new timestamp once, writing it to the sink.
+
+        - when several timestamps are pending (the run started late, a poll was missed, a timestamp failed),
+          they are all processed in timestamp order before waiting again (catch-up)
+        - a timestamp that fails is tried again after a backoff (doubled each time, up to max_backoff_seconds);
+          after max_retries failures it is recorded in timestamps_failed and skipped
+        - an error reading lastupdate.txt is also retried with the backoff
+        - with checkpoint=True the finished timestamps are recorded in <output_dir>/FollowCheckpoint
+          (GDELTBatchCheckpoint, without the joined rows, which are in the sink), so a restarted follow
+          continues after the last finished timestamp. Use a GDELTParquetDatasetSink then: the single file
+          sinks start a new file when they are opened again
+        - the memory does not grow with the time followed: only the last keep_last timestamps are kept in the
+          per-timestamp statistics, the latency and the checkpoint (the range statistics, rollups and the latency
+          mean and max are merged as the timestamps come)
+
+        Args:
+            base_fileset: joincase, statistics and key_column_dictionary_document of the run (the timestamp is ignored)
+            sink: Where the joined df of each timestamp is written (GDELTOutputSink), closed when follow returns
+            mapping_columns: Only needed if statistics="all"
+            watcher: GDELTLastUpdateWatcher of the site (default: lastupdate.txt of the loader base_url)
+            start_after: Process the timestamps after this one (YYYYMMDDHHMMSS). If None, continue after
+                the checkpoint or, without one, start with the latest published timestamp
+            poll_interval_seconds: Time between two polls when nothing new was published
+            max_backoff_seconds: Maximum waiting time after an error
+            max_retries: Failures of a timestamp before it is skipped
+            max_timestamps: Stop after this many timestamps (processed or failed). None runs until stop_event is set
+                (or the process is interrupted)
+            stop_event: threading.Event to stop following from another thread
+            checkpoint: Record the finished timestamps (see above)
+            download_workers, max_connections_per_host, max_pending_timestamps: as in run (used in catch-up)
+            event_window: GDELTEventWindow, as in run (joincase="all" only). It is kept between the polls, but it
+                starts empty after a restart, so the first window_hours after it only match the events seen since
+            keep_last: Timestamps kept in the *_by_timestamp statistics, latency["by_timestamp"] and the
+                checkpoint (default 96, one day)
+
+        Returns:
+            {
+              "timestamps_processed": [...],
+              "timestamps_failed": {ts: "error message", ...},
+              "stats": {...},                                     # as in run
+              "latency": {
+                  "by_timestamp": {ts: {"detected_at": iso, "written_at": iso,      # the last keep_last timestamps
+                                        "publication_to_written_seconds": float,
+                                        "detection_to_written_seconds": float}},
+                  "mean_publication_to_written_seconds": float,                 # over all the timestamps
+                  "max_publication_to_written_seconds": float
+              },
+              "output": {...},                                    # metadata of the sink
+              "checkpoint": {...},                                # only with checkpoint=True
+              "processing_time_seconds": float
+            }
+        """
+
+        if sink is None:
+            raise ValueError("follow needs a sink: the joined dfs are written as they come and never kept")
+        if event_window is not None and base_fileset.joincase != "all":
+            raise ValueError("event_window is only used with joincase='all'")
+        if keep_last < 1:
+            raise ValueError(f"keep_last must be at least 1, got {keep_last}")
+
+        start_time = time.time()
+        stop_event = stop_event if stop_event is not None else threading.Event()
+        watcher = watcher if watcher is not None else GDELTLastUpdateWatcher(
+            self.processor.loader.base_url + "lastupdate.txt", request_timeout=self.processor.loader.request_timeout
+        )
+        files = self.processor._get_files_for_joincase(base_fileset.joincase)
+
+        stats_acc: Dict[str, Any] = {}
+        processed: List[str] = []
+        failed: Dict[str, str] = {}
+        attempts: Dict[str, int] = {}
+        detected_at: Dict[str, datetime] = {}
+        latency_by_ts: Dict[str, Dict[str, Any]] = {}
+        # Running count, sum and max of publication_to_written_seconds (latency_by_ts only keeps the last timestamps)
+        latency_count, latency_sum, latency_max = 0, 0.0, None
+
+        # Continue after the last timestamp finished by an earlier follow (same configuration)
+        follow_checkpoint: Optional[GDELTBatchCheckpoint] = None
+        last_done = start_after
+        if start_after is not None:
+            self._validate_ts_rules(start_after)
+        if checkpoint:
+            follow_checkpoint = GDELTBatchCheckpoint(
+                self.processor.output_dir / "FollowCheckpoint",
+                self._checkpoint_signature(base_fileset, mapping_columns, None, event_window),
+                keep_last=keep_last
+            )
+            done = follow_checkpoint.resume()
+            if done and start_after is None:
+                last_done = done[-1]
+                self.logger.info(f"Following after the checkpoint (last finished timestamp: {last_done})")
+                if not isinstance(sink, GDELTParquetDatasetSink):
+                    self.logger.warning(f"{sink.KIND} sink starts a new file: the earlier timestamps are not in it")
+
+        def finished() -> bool:
+            return stop_event.is_set() or (max_timestamps is not None and len(processed) + len(failed) >= max_timestamps)
+
+        backoff = poll_interval_seconds
+        with sink:
+            try:
+                while not finished():
+
+                    # Latest timestamp with all the files of the joincase
+                    try:
+                        latest = watcher.latest_timestamp(files)
+                    except Exception as e:
+                        self.logger.warning(f"Could not read {watcher.source}: {type(e).__name__}: {e} (retry in {backoff:.0f}s)")
+                        stop_event.wait(backoff)
+                        backoff = min(backoff * 2, max_backoff_seconds)
+                        continue
+
+                    if latest is None or (last_done is not None and latest <= last_done):
+                        backoff = poll_interval_seconds
+                        stop_event.wait(poll_interval_seconds)
+                        continue
+
+                    # Everything published after the last finished timestamp
+                    if last_done is None:
+                        pending = [latest]
+                    else:
+                        next_ts = self._format_ts(self._parse_ts(last_done) + timedelta(minutes=15))
+                        pending = self._expand_timestamps(next_ts, latest)
+                    if max_timestamps is not None:
+                        pending = pending[:max_timestamps - len(processed) - len(failed)]
+                    now = datetime.now(timezone.utc)
+                    for ts in pending:
+                        detected_at.setdefault(ts, now)
+                    if len(pending) > 1:
+                        self.logger.info(f"Catching up {len(pending)} timestamps ({pending[0]} to {pending[-1]})")
+
+                    retry = False
+                    results = self._iter_results(
+                        pending,
+                        base_fileset,
+                        mapping_columns,
+                        download_workers,
+                        max_connections_per_host,
+                        max_pending_timestamps,
+                        1,
+                        None,
+                        event_window
+                    )
+                    with contextlib.closing(results):
+                        for ts, result, outputs, ingest_stats, error in results:
+                            try:
+                                if error is not None:
+                                    raise error
+                                stats_acc, joined_df = self._accumulate_result(
+                                    ts, result, outputs, ingest_stats, base_fileset.statistics, stats_acc, [], sink
+                                )
+                            except Exception as e:
+                                msg = f"{type(e).__name__}: {e}"
+                                attempts[ts] = attempts.get(ts, 0) + 1
+                                if attempts[ts] < max_retries:
+                                    # Try this timestamp (and the next ones) again after the backoff
+                                    self.logger.warning(f"Timestamp {ts} failed ({attempts[ts]}/{max_retries}): {msg}")
+                                    retry = True
+                                    break
+                                failed[ts] = msg
+                                last_done = ts
+                                attempts.pop(ts, None)
+                                detected_at.pop(ts, None)
+                                self.logger.error(f"Failed timestamp {ts}, skipped after {max_retries} attempts: {msg}")
+                                continue
+
+                            # Latency from publication (the timestamp of the slice) to the output written
+                            written_at = datetime.now(timezone.utc)
+                            published_at = self._parse_ts(ts).replace(tzinfo=timezone.utc)
+                            detected = detected_at.pop(ts)
+                            latency_by_ts[ts] = {
+                                "detected_at": detected.isoformat(timespec="seconds"),
+                                "written_at": written_at.isoformat(timespec="seconds"),
+                                "publication_to_written_seconds": (written_at - published_at).total_seconds(),
+                                "detection_to_written_seconds": (written_at - detected).total_seconds(),
+                            }
+                            latency = latency_by_ts[ts]["publication_to_written_seconds"]
+                            latency_count, latency_sum = latency_count + 1, latency_sum + latency
+                            latency_max = latency if latency_max is None else max(latency_max, latency)
+
+                            processed.append(ts)
+                            last_done = ts
+                            attempts.pop(ts, None)
+                            if follow_checkpoint is not None:
+                                follow_checkpoint.record(
+                                    ts, None, outputs, ingest_stats, None if joined_df is None else len(joined_df), sink.output(ts)
+                                )
+                            # The theme vocabulary and series are written after each timestamp, so a restarted follow continues them
+                            self.processor.theme_index.save()
+                            if self.processor.theme_series is not None:
+                                self.processor.theme_series.save()
+                            self.logger.info(f"Followed {ts}: written {latency:.0f}s after publication")
+
+                            # Only the last keep_last timestamps are kept per timestamp (bounded memory)
+                            for name, by_timestamp in stats_acc.items():
+                                if name.endswith("_by_timestamp"):
+                                    self._keep_last_timestamps(by_timestamp, keep_last)
+                            self._keep_last_timestamps(latency_by_ts, keep_last)
+
+                    if retry:
+                        stop_event.wait(backoff)
+                        backoff = min(backoff * 2, max_backoff_seconds)
+                    else:
+                        backoff = poll_interval_seconds
+
+            except KeyboardInterrupt:
+                self.logger.info("Follow interrupted, closing the sink")
+
+        if self.processor.loader.raw_cache is not None:
+            self.processor.loader.raw_cache.flush()
+        stats_acc = self._finish_aggregations(stats_acc)
+        follow_result = {
+            "timestamps_processed": processed,
+            "timestamps_failed": failed,
+            "stats": stats_acc,
+            "latency": {
+                "by_timestamp": latency_by_ts,
+                "mean_publication_to_written_seconds": latency_sum / latency_count if latency_count else None,
+                "max_publication_to_written_seconds": latency_max,
+            },
+            "output": sink.metadata(),
+            "processing_time_seconds": time.time() - start_time,
+        }
+        if follow_checkpoint is not None:
+            follow_result["checkpoint"] = follow_checkpoint.metadata()
+        return follow_result
+
+
+"""
+NINTH CLASS: GDELTDownloadPrefetcher
+This one downloads the zip files of many timestamps concurrently, so the network is used
+while the earlier timestamps are being processed by the GDELTTimestampBatchRunner
+"""
+
+class GDELTDownloadPrefetcher:
+
+    """
+    Concurrent download stage for the GDELTTimestampBatchRunner.
+
+    - a pool of max_workers threads downloads all the files (gkg, mentions, export) of the timestamps
+    - at most max_connections_per_host connections are opened to the same host
+    - at most max_pending_timestamps timestamps are downloaded ahead of the processing (bounded memory)
+    - results are always given back in timestamp order
+    """
+
+    def __init__(
+        self,
+        loader: "GDELTDataLoader",
+        max_workers: int = 4,
+        max_connections_per_host: int = 4,
+        max_pending_timestamps: int = 8
+    ):
+
+        """
+        Args:
+            loader: The GDELTDataLoader that knows the site (base_url) and the file names
+            max_workers: Number of download threads
+            max_connections_per_host: Maximum simultaneous connections to the same host
+            max_pending_timestamps: Maximum number of timestamps downloaded but not yet given back
+        """
+
+        if max_workers < 1 or max_connections_per_host < 1 or max_pending_timestamps < 1:
+            raise ValueError("max_workers, max_connections_per_host and max_pending_timestamps must be >= 1")
+
+        self.loader = loader
+        self.max_workers = max_workers
+        self.max_connections_per_host = max_connections_per_host
+        self.max_pending_timestamps = max_pending_timestamps
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        import requests
 
+        # One connection pool per host, blocking when all its connections are in use
+        # This is what enforces the per-host connection limit
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=max_connections_per_host,
+            pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gdelt-download")
+
+    def __enter__(self) -> "GDELTDownloadPrefetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+
+        """Stop the pending downloads and release the threads and connections"""
+
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def iter_downloads(
+        self,
+        timestamps: List[str],
+        files_to_download: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, Optional[Dict[str, BinaryIO]], Optional[Exception]]]:
+
+        """
+        Download the files of all timestamps concurrently and yield them in timestamp order.
+
+        Inputs:
+            timestamps: Timestamps in format YYYYMMDDHHMMSS (already validated)
+            files_to_download: List of file types (e.g., ['gkg', 'export']). If None, all three files
+
+        Returns (yields):
+            (timestamp, {df_name: zip file}, None) when all files were downloaded, or
+            (timestamp, None, exception) with the first error found for that timestamp
+        """
+
+        df_names = list(self.loader.get_file_configs(files_to_download))
+        timestamps_iter = iter(timestamps)
+        pending = deque()
+
+        # Submit the downloads of the next timestamp (if there is any left)
+        def submit_next() -> bool:
+            ts = next(timestamps_iter, None)
+            if ts is None:
+                return False
+            futures = {
+                df_name: self._executor.submit(self.loader.fetch_raw_file, ts, df_name, self.session)
+                for df_name in df_names
+            }
+            pending.append((ts, futures))
+            return True
+
+        # Fill the window of timestamps to download ahead
+        while len(pending) < self.max_pending_timestamps and submit_next():
+            pass
+
+        while pending:
+            ts, futures = pending.popleft()
+            raw_files: Dict[str, BinaryIO] = {}
+            error: Optional[Exception] = None
+
+            # Wait for all the files of this timestamp (keep the first error, if any)
+            for df_name, future in futures.items():
+                try:
+                    raw_files[df_name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error downloading {df_name} for timestamp {ts}: {e}")
+                    if error is None:
+                        error = e
+
+            # Keep the window full while this timestamp is being processed
+            submit_next()
+
+            if error is not None:
+                for raw_file in raw_files.values():
+                    raw_file.close()
+                yield ts, None, error
+            else:
+                yield ts, raw_files, None
+
+
+"""
+TENTH CLASS: GDELTRawFileCache
+This one keeps the downloaded zip files (gkg, mentions, export) on disk,
+so re-running the same timestamps (e.g. with other country_codes or themes_tags) does not need the network
+"""
+
+class GDELTRawFileCache:
+
+    """
+    Content-addressed cache of the raw GDELT zip files.
+
+    - each zip is stored once under blobs/<sha256>.zip
+    - index.json maps the GDELT file name (e.g. 20251201143000.gkg.csv.zip) to its sha256, size and last access
+    - entries are validated by size and sha256 (and by size and md5 of masterfilelist.txt, if a local copy
+      is given) when written and the first time they are read in the process, outside the lock
+    - max_size_bytes caps the total size of the cache, the least recently used files are evicted first
+    - the last access of each hit is kept in memory and index.json is written every INDEX_FLUSH_EVERY hits
+      and by flush() (called by GDELTTimestampBatchRunner at the end of a run)
+    - offline=True means that the loader reads only from the cache and never downloads
+    """
+
+    INDEX_NAME = "index.json"
+
+    # Hits whose last access is only in memory before index.json is written again
+    INDEX_FLUSH_EVERY = 64
 
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size_bytes: Optional[int] = None,
+        masterfilelist_path: Optional[str] = None,
+        offline: bool = False
+    ):
+
+        """
+        Args:
+            cache_dir: Folder of the cache (created if it does not exist)
+            max_size_bytes: Maximum total size of the cached files. None means no limit
+            masterfilelist_path: Optional local copy of http://data.gdeltproject.org/gdeltv2/masterfilelist.txt
+            offline: If True, files that are not in the cache raise an error instead of being downloaded
+        """
+
+        self.cache_dir = Path(cache_dir)
+        self.blobs_dir = self.cache_dir / "blobs"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.masterfilelist_path = Path(masterfilelist_path) if masterfilelist_path else None
+        self.offline = offline
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        # The downloads may run in several threads (GDELTDownloadPrefetcher)
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self._masterfile_checksums: Optional[Dict[str, Tuple[int, str]]] = None
+        # Entries already validated in this process (not hashed again) and hits not written to index.json yet
+        self._validated: set = set()
+        self._unsaved_hits = 0
+
+    # ---------------------------------------------------------------------------
+    # Index helpers
+    # ---------------------------------------------------------------------------
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+
+        """Read index.json (an unreadable index just means an empty cache)"""
+
+        index_path = self.cache_dir / self.INDEX_NAME
+        if not index_path.exists():
+            return {}
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read cache index {index_path}, starting empty: {e}")
+            return {}
+
+    def _save_index(self) -> None:
+
+        """Write index.json atomically (write a temporary file, then replace)"""
+
+        index_path = self.cache_dir / self.INDEX_NAME
+        tmp_path = index_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+        self._unsaved_hits = 0
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blobs_dir / f"{sha256}.zip"
+
+    def _masterfile_checksum(self, file_name: str) -> Optional[Tuple[int, str]]:
+
+        """
+        Get (size, md5) of a file from the local masterfilelist.txt (parsed only once).
+        Each line looks like: <size> <md5> http://data.gdeltproject.org/gdeltv2/<file_name>
+        """
+
+        if self.masterfilelist_path is None:
+            return None
+
+        if self._masterfile_checksums is None:
+            checksums: Dict[str, Tuple[int, str]] = {}
+            with open(self.masterfilelist_path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 3:
+                        continue
+                    try:
+                        checksums[parts[2].rsplit("/", 1)[-1]] = (int(parts[0]), parts[1].lower())
+                    except ValueError:
+                        continue
+            self._masterfile_checksums = checksums
+
+        return self._masterfile_checksums.get(file_name)
+
+    @staticmethod
+    def _hash_file(file_obj: BinaryIO) -> Tuple[int, str, str]:
+
+        """Get (size, sha256, md5) of an open binary file, reading it in blocks from its beginning"""
+
+        sha256, md5, size = hashlib.sha256(), hashlib.md5(), 0
+        file_obj.seek(0)
+        for block in iter(lambda: file_obj.read(1024**2), b""):
+            sha256.update(block)
+            md5.update(block)
+            size += len(block)
+        file_obj.seek(0)
+        return size, sha256.hexdigest(), md5.hexdigest()
+
+    def _is_valid(self, file_name: str, size: int, sha256: str, md5: str, expected_size: int, expected_sha256: Optional[str]) -> bool:
+
+        """Validate a file by size, sha256 and (if available) the masterfilelist size and md5"""
+
+        if size != expected_size:
+            return False
+        if expected_sha256 is not None and sha256 != expected_sha256:
+            return False
+        master = self._masterfile_checksum(file_name)
+        if master is not None:
+            master_size, master_md5 = master
+            if size != master_size or md5 != master_md5:
+                return False
+        return True
+
+    # ---------------------------------------------------------------------------
+    # Public functions
+    # ---------------------------------------------------------------------------
+
+    def open(self, file_name: str) -> Optional[BinaryIO]:
+
+        """
+        Open a cached file.
+
+        Inputs:
+            file_name: GDELT file name (e.g. 20251201143000.gkg.csv.zip)
+
+        Returns:
+            The zip file opened in binary mode (the caller closes it), or None if it is not cached
+            (or the cached entry was invalid and got removed)
+        """
+
+        with self._lock:
+            entry = self._index.get(file_name)
+            if entry is None:
+                return None
+            sha256, expected_size = entry["sha256"], entry["size"]
+            validated = file_name in self._validated
+
+        try:
+            cached_file = open(self._blob_path(sha256), "rb")
+        except OSError:
+            cached_file = None
+
+        # The blob is hashed outside the lock, so the other download threads are not blocked meanwhile
+        if cached_file is not None and not validated:
+            size, file_sha256, md5 = self._hash_file(cached_file)
+            if not self._is_valid(file_name, size, file_sha256, md5, expected_size, sha256):
+                cached_file.close()
+                cached_file = None
+
+        with self._lock:
+            entry = self._index.get(file_name)
+            if cached_file is None:
+                self.logger.warning(f"Invalid cache entry for {file_name}, it will be downloaded again")
+                # Unless another thread stored the file again meanwhile
+                if entry is not None and entry["sha256"] == sha256:
+                    self._remove_entry(file_name)
+                    self._save_index()
+                return None
+
+            # Update the last access for the LRU eviction (written to index.json in batches)
+            self._validated.add(file_name)
+            if entry is not None:
+                entry["last_access"] = time.time()
+                self._unsaved_hits += 1
+                if self._unsaved_hits >= self.INDEX_FLUSH_EVERY:
+                    self._save_index()
+            return cached_file
+
+    def flush(self) -> None:
+
+        """Write the last accesses kept in memory to index.json"""
+
+        with self._lock:
+            if self._unsaved_hits:
+                self._save_index()
+
+    def get(self, file_name: str) -> Optional[bytes]:
+
+        """Same as open, but returns the content of the cached file as bytes"""
+
+        cached_file = self.open(file_name)
+        if cached_file is None:
+            return None
+        with cached_file:
+            return cached_file.read()
+
+    def put(self, file_name: str, content: Union[bytes, BinaryIO]) -> None:
+
+        """
+        Store a downloaded file in the cache and evict the least recently used files if the cache is too big.
+
+        Inputs:
+            file_name: GDELT file name (e.g. 20251201143000.gkg.csv.zip)
+            content: The zip file (bytes or an open binary file, which is copied block by block)
+        """
+
+        if isinstance(content, (bytes, bytearray)):
+            content = io.BytesIO(content)
+
+        # A download that does not match masterfilelist.txt is corrupted and should not be used at all
+        size, sha256, md5 = self._hash_file(content)
+        if not self._is_valid(file_name, size, sha256, md5, size, None):
+            raise ValueError(f"Downloaded {file_name} does not match the size/md5 of masterfilelist.txt")
+
+        with self._lock:
+            # Write the blob once (same content = same blob)
+            blob_path = self._blob_path(sha256)
+            if not blob_path.exists():
+                tmp_path = blob_path.with_suffix(f".tmp{threading.get_ident()}")
+                with open(tmp_path, "wb") as f:
+                    for block in iter(lambda: content.read(1024**2), b""):
+                        f.write(block)
+                os.replace(tmp_path, blob_path)
+            content.seek(0)
+
+            self._index[file_name] = {
+                "sha256": sha256,
+                "size": size,
+                "last_access": time.time()
+            }
+            self._validated.add(file_name)
+            self._evict()
+            self._save_index()
+
+    def contains(self, file_name: str) -> bool:
+
+        """Check if a file is in the index (without reading or validating it)"""
+
+        with self._lock:
+            return file_name in self._index
+
+    def total_size(self) -> int:
+
+        """Total size in bytes of the distinct cached blobs"""
+
+        with self._lock:
+            return sum({e["sha256"]: e["size"] for e in self._index.values()}.values())
+
+    def _remove_entry(self, file_name: str) -> None:
+
+        """Remove an entry from the index and its blob if no other entry uses it (lock must be held)"""
+
+        entry = self._index.pop(file_name, None)
+        self._validated.discard(file_name)
+        if entry is None:
+            return
+        if not any(e["sha256"] == entry["sha256"] for e in self._index.values()):
+            try:
+                self._blob_path(entry["sha256"]).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+
+        """Evict the least recently used entries until the cache fits in max_size_bytes (lock must be held)"""
+
+        if self.max_size_bytes is None:
+            return
+
+        total = sum({e["sha256"]: e["size"] for e in self._index.values()}.values())
+        for file_name, _ in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_size_bytes:
+                break
+            entry = self._index[file_name]
+            shared = sum(1 for e in self._index.values() if e["sha256"] == entry["sha256"]) > 1
+            self._remove_entry(file_name)
+            if not shared:
+                total -= entry["size"]
+            self.logger.info(f"Evicted {file_name} from the raw cache")
+
+
+"""
+ELEVENTH CLASS: GDELTSQLiteJoinStore
+This one keeps the gkg, mentions and export rows of all the timestamps of a batch in a sqlite file
+with indexed join keys, so GDELTTimestampBatchRunner joins the whole range with a single query at the end
+and the database can still be queried after the run
+"""
+
+class GDELTSQLiteJoinStore:
+
+    """
+    Persistent sqlite join store for GDELTTimestampBatchRunner.
+
+    - one table per file (gkg, mentions, export) with a "Time Stamp" column
+    - normalized key columns (TRIM(CAST(... AS TEXT)) computed once when the rows are added),
+      indexed together with "Time Stamp": _doc_key (gkg_V2DOCUMENTIDENTIFIER), _mention_key (MentionIdentifier),
+      _event_key (GlobalEventID) and _url_key (SOURCEURL)
+    - rows are bulk inserted with executemany, in one transaction per timestamp, in WAL mode
+    - adding a timestamp again replaces its rows
+    - the join matches rows of the same timestamp only, so it gives the same rows as the per timestamp join of DataJoiner
+    """
+
+    TIMESTAMP_COLUMN = "Time Stamp"
+
+    # Normalized key columns of each table: {table: {key column: source column}}
+    KEY_COLUMNS = {
+        "gkg": {"_doc_key": "gkg_V2DOCUMENTIDENTIFIER"},
+        "mentions": {"_mention_key": "MentionIdentifier", "_event_key": "GlobalEventID"},
+        "export": {"_event_key": "GlobalEventID", "_url_key": "SOURCEURL"},
+    }
+
+    # Pragmas set on every connection (WAL lets the database be read while it is written)
+    PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -256 * 1024, # in KiB
+        "mmap_size": 1024**3,
+    }
+
+    def __init__(
+        self,
+        db_path: str,
+        mentions_columns: Optional[List[str]] = None,
+        export_columns: Optional[List[str]] = None
+    ):
+
+        """
+        Args:
+            db_path: Path of the sqlite file (created if it does not exist, its folder too)
+            mentions_columns: Columns from mentions to map (same as mentions_columns_to_map of GDELTProcessor)
+            export_columns: Columns from export to map (same as export_columns_to_map of GDELTProcessor)
+        """
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Used for the default columns to map and the names of the mapped columns
+        self.joiner = DataJoiner(mentions_columns, export_columns, engine="sql")
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        # Columns of the last rows added to each table (the table may have more, from earlier runs)
+        self.added_columns: Dict[str, List[str]] = {}
+
+        import sqlite3
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        for pragma, value in self.PRAGMAS.items():
+            self.conn.execute(f"PRAGMA {pragma}={value}")
+
+    def __enter__(self) -> "GDELTSQLiteJoinStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+
+        """Close the connection (the database file is kept)"""
+
+        self.conn.close()
+
+    def check_columns(self, mentions_columns: Optional[List[str]], export_columns: Optional[List[str]]) -> None:
+
+        """
+        Check that the store maps the same columns as the processor (mentions_columns_to_map and export_columns_to_map
+        of GDELTProcessor, None meaning the defaults of DataJoiner), since the store gives the names of the mapped columns
+        """
+
+        expected = {
+            "mentions": self.joiner._get_mentions_columns(mentions_columns),
+            "export": self.joiner._get_export_columns(export_columns),
+        }
+        store = {
+            "mentions": self.joiner._get_mentions_columns(self.joiner.mentions_columns),
+            "export": self.joiner._get_export_columns(self.joiner.export_columns),
+        }
+        changed = [name for name in expected if list(expected[name]) != list(store[name])]
+        if changed:
+            raise ValueError(
+                f"The join store maps other columns than the processor ({', '.join(changed)}): "
+                + "; ".join(f"{name}: store {store[name]}, processor {expected[name]}" for name in changed)
+                + ". Give GDELTSQLiteJoinStore the mentions_columns_to_map and export_columns_to_map of the processor"
+            )
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _quote(name: str) -> str:
+
+        """Quote a column or table name for sqlite (e.g. "V2.1DATE", "Time Stamp")"""
+
+        return '"' + str(name).replace('"', '""') + '"'
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _sql_type(dtype) -> str:
+
+        """sqlite type of a column with this dtype"""
+
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            return "INTEGER"
+        if pd.api.types.is_float_dtype(dtype):
+            return "REAL"
+        return "TEXT"
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _to_python(series: pd.Series) -> List[Any]:
+
+        """Values of a column as python objects for sqlite (missing values as None)"""
+
+        values = series.astype(object)
+        return values.where(series.notna(), None).tolist()
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _normalize_key(series: pd.Series) -> List[Optional[str]]:
+
+        """Join key as TRIM(CAST(key AS TEXT)) of the sql join (missing values as None, so they never match)"""
+
+        values = series.astype(object)
+        missing = values.isna()
+        return values.astype(str).str.strip(" ").astype(object).where(~missing, None).tolist()
+
+    def table_columns(self, table: str) -> List[str]:
+
+        """Columns of a table of the store (empty if the table does not exist)"""
+
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({self._quote(table)})")]
+
+    def _ensure_table(self, table: str, df: pd.DataFrame) -> None:
+
+        """Create the table and its indexes for the columns of df, or add the columns of df it does not have yet"""
+
+        existing = self.table_columns(table)
+        if existing:
+            for col in df.columns:
+                if col not in existing:
+                    self.conn.execute(f"ALTER TABLE {self._quote(table)} ADD COLUMN {self._quote(col)} {self._sql_type(df[col].dtype)}")
+            return
+
+        definitions = [f"{self._quote(self.TIMESTAMP_COLUMN)} TEXT"]
+        definitions += [f"{self._quote(col)} {self._sql_type(df[col].dtype)}" for col in df.columns]
+        definitions += [f"{self._quote(key)} TEXT" for key in self.KEY_COLUMNS[table]]
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self._quote(table)} ({', '.join(definitions)})")
+
+        # The timestamp is the first column of every index: the rows of a timestamp are joined with the same timestamp only
+        ts = self._quote(self.TIMESTAMP_COLUMN)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {self._quote(f'idx_{table}_ts')} ON {self._quote(table)} ({ts})")
+        for key in self.KEY_COLUMNS[table]:
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self._quote(f'idx_{table}{key}')} ON {self._quote(table)} ({ts}, {self._quote(key)})"
+            )
+
+    def _insert(self, table: str, timestamp: str, df: pd.DataFrame) -> int:
+
+        """Replace the rows of this timestamp in the table by the rows of df. Returns the number of rows"""
+
+        df.columns = [c.strip() for c in df.columns]
+        self._ensure_table(table, df)
+        self.conn.execute(f"DELETE FROM {self._quote(table)} WHERE {self._quote(self.TIMESTAMP_COLUMN)} = ?", (timestamp,))
+
+        keys = {key: source for key, source in self.KEY_COLUMNS[table].items() if source in df.columns}
+        columns = [self.TIMESTAMP_COLUMN] + list(df.columns) + list(keys)
+        values = (
+            [[timestamp] * len(df)]
+            + [self._to_python(df[col]) for col in df.columns]
+            + [self._normalize_key(df[source]) for source in keys.values()]
+        )
+
+        insert = (
+            f"INSERT INTO {self._quote(table)} ({', '.join(map(self._quote, columns))}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        self.conn.executemany(insert, zip(*values))
+        self.added_columns[table] = list(df.columns)
+        return len(df)
+
+    def add(
+        self,
+        timestamp: str,
+        gkg_df: pd.DataFrame,
+        mentions_df: Optional[pd.DataFrame] = None,
+        export_df: Optional[pd.DataFrame] = None
+    ) -> None:
+
+        """
+        Add (or replace) the rows of one timestamp, in one transaction.
+
+        Inputs:
+            timestamp: Timestamp of the files (YYYYMMDDHHMMSS)
+            gkg_df: Processed gkg (gkg_ prefixed columns, as given to DataJoiner)
+            mentions_df: Mentions dataframe (optional)
+            export_df: Export dataframe (optional)
+        """
+
+        counts = {}
+        with self.conn:
+            for table, df in (("gkg", gkg_df), ("mentions", mentions_df), ("export", export_df)):
+                if df is not None:
+                    counts[table] = self._insert(table, timestamp, df)
+
+        self.logger.info(f"Added {timestamp} to the join store: {counts}")
+
+    def join(self, timestamps: List[str], files: List[str]) -> pd.DataFrame:
+
+        """
+        Join the rows of the given timestamps with a single query.
+
+        Inputs:
+            timestamps: Timestamps to join (YYYYMMDDHHMMSS)
+            files: Files of the joincase (e.g. ['gkg', 'mentions', 'export'], see GDELTProcessor._get_files_for_joincase)
+
+        Returns:
+            Joined dataframe, same columns and rows as the concatenated per timestamp joins of DataJoiner
+            ("Time Stamp" first, then the gkg columns and the mapped columns)
+        """
+
+        table_columns = self.table_columns("gkg")
+        if not table_columns or not timestamps:
+            return pd.DataFrame()
+        # The columns of this run when rows were added, else all the columns of the table
+        gkg_columns = [self.TIMESTAMP_COLUMN] + [
+            c for c in self.added_columns.get("gkg", table_columns)
+            if c != self.TIMESTAMP_COLUMN and c not in self.KEY_COLUMNS["gkg"]
+        ]
+
+        ts = self._quote(self.TIMESTAMP_COLUMN)
+        with_mentions = "mentions" in files and bool(self.table_columns("mentions"))
+        with_export = "export" in files and bool(self.table_columns("export"))
+
+        # SELECT g.*, m.<col> AS Mentions_<col>, e.<col> AS Export_<col>
+        selections = [f"g.{self._quote(col)}" for col in gkg_columns]
+        joins = []
+        order = ["g.rowid"]
+        if with_mentions:
+            m_cols = self.joiner._get_mentions_columns(self.joiner.mentions_columns)
+            aliases = self.joiner._get_column_aliases(m_cols, "Mentions")
+            selections += [f"m.{self._quote(col)} AS {self._quote(alias)}" for col, alias in zip(m_cols, aliases)]
+            joins.append(f"LEFT JOIN mentions AS m ON m.{ts} = g.{ts} AND m._mention_key = g._doc_key")
+            order.append("m.rowid")
+        if with_export:
+            e_cols = self.joiner._get_export_columns(self.joiner.export_columns)
+            aliases = self.joiner._get_column_aliases(e_cols, "Export")
+            selections += [f"e.{self._quote(col)} AS {self._quote(alias)}" for col, alias in zip(e_cols, aliases)]
+            # Export through mentions when both are given, else directly to gkg
+            key = "m._event_key" if with_mentions else "g._doc_key"
+            column = "_event_key" if with_mentions else "_url_key"
+            joins.append(f"LEFT JOIN export AS e ON e.{ts} = g.{ts} AND e.{column} = {key}")
+            order.append("e.rowid")
+
+        # The timestamps of this run (the store may also hold other ones)
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS join_timestamps (ts TEXT PRIMARY KEY)")
+        with self.conn:
+            self.conn.execute("DELETE FROM join_timestamps")
+            self.conn.executemany("INSERT OR IGNORE INTO join_timestamps (ts) VALUES (?)", [(t,) for t in timestamps])
+
+        query = (
+            "SELECT " + ",\n    ".join(selections)
+            + "\nFROM gkg AS g\n" + "\n".join(joins)
+            + f"\nWHERE g.{ts} IN (SELECT ts FROM join_timestamps)"
+            + f"\nORDER BY g.{ts}, " + ", ".join(order)
+        )
+        result = pd.read_sql_query(query, self.conn)
+
+        self.logger.info(f"Joined {len(timestamps)} timestamps from the join store: {len(result)} rows, {len(result.columns)} columns")
+        return result
+
+    def query(self, sql: str, params: Optional[Union[tuple, dict]] = None) -> pd.DataFrame:
+
+        """Run any query on the store (tables gkg, mentions, export) and return it as a dataframe"""
+
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+
+"""
+TWELFTH CLASS: GDELTProcessPool
+This one runs process_fileset of several timestamps at the same time in worker processes,
+as everything after the download (filters, GKGProcessor, join, statistics) is pandas work that uses one core
+"""
+
+@dataclass
+class ArrowIPCFrame:
+    """A dataframe sent between processes as an Arrow IPC stream (see GDELTProcessPool)"""
+    buffer: bytes
+    dtypes: Dict[str, Any] # dtype of each column, to get exactly the same dtypes back
+    missing: Dict[str, Any] # missing value (None or NaN) of the object columns that have some
+
+
+class GDELTProcessPool:
+
+    """
+    Process pool for GDELTTimestampBatchRunner.
+
+    - every worker builds the GDELTProcessor once (GDELTProcessor.worker_config), so the configuration
+      and the headers of Dictionaries.xlsx are loaded once per worker, not once per timestamp
+    - the zip files are downloaded by the main process and sent to the workers as bytes
+    - the dataframes of the results come back as Arrow IPC streams (ArrowIPCFrame) instead of pickled dataframes;
+      dataframes that Arrow cannot give back exactly (e.g. lists inside the cells) and everything else are pickled
+    - results are given in timestamp order, with the error of each failed timestamp, as when processing one by one
+    """
+
+    # "spawn" starts clean workers (the main process may be running download threads)
+    START_METHOD = "spawn"
+
+    # The processor of a worker process (built once by _init_worker)
+    _worker_processor: Optional["GDELTProcessor"] = None
+
+    def __init__(self, processor: "GDELTProcessor", max_workers: int = 4, max_pending_timestamps: int = 8):
+
+        """
+        Args:
+            processor: The configured GDELTProcessor (its worker_config is used to build the one of each worker)
+            max_workers: Number of worker processes
+            max_pending_timestamps: Timestamps submitted ahead of the one whose result is awaited
+        """
+
+        import multiprocessing
+
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending_timestamps = max(self.max_workers, int(max_pending_timestamps))
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.START_METHOD),
+            initializer=GDELTProcessPool._init_worker,
+            # The workers log as the main process: same level and same logging.disable
+            initargs=(processor.worker_config(), logging.getLogger().getEffectiveLevel(), logging.root.manager.disable)
+        )
+
+    def __enter__(self) -> "GDELTProcessPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+
+        """Stop the workers (timestamps not started yet are cancelled)"""
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    # -------------------------------------------
+    # In the worker processes
+    # -------------------------------------------
+
+    @classmethod
+    def _init_worker(cls, processor_config: Dict[str, Any], log_level: int = logging.INFO, log_disable: int = logging.NOTSET) -> None:
+
+        """Build the processor of this worker (once), with the logging level of the main process"""
+
+        configure_logging(log_level)
+        logging.disable(log_disable)
+        cls._worker_processor = GDELTProcessor(**processor_config)
+
+    @classmethod
+    def _process_in_worker(
+        cls,
+        fileset: "GDELTFileSet",
+        mapping_columns: Optional["GDELTMappingQuality"],
+        raw_files: Dict[str, bytes]
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+
+        """process_fileset of one timestamp. Returns (encoded result, outputs, ingest_stats)"""
+
+        processor = cls._worker_processor
+        result, outputs = processor.process_fileset(
+            fileset,
+            mapping_columns,
+            raw_files={df_name: io.BytesIO(content) for df_name, content in raw_files.items()},
+            return_outputs=True
+        )
+        ingest_stats = processor.loader.ingest_stats.pop(fileset.timestamp, None)
+        return cls._encode(result), outputs, ingest_stats
+
+    # -------------------------------------------
+    # Dataframes through Arrow IPC
+    # -------------------------------------------
+
+    @classmethod
+    def _encode(cls, value: Any) -> Any:
+
+        """Replace the dataframes inside a result (tuples, lists, dicts) by ArrowIPCFrame when possible"""
+
+        if isinstance(value, pd.DataFrame):
+            return cls._frame_to_ipc(value) or value
+        if isinstance(value, dict):
+            return {k: cls._encode(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return type(value)(cls._encode(v) for v in value)
+        return value
+
+    @classmethod
+    def _decode(cls, value: Any) -> Any:
+
+        """Inverse of _encode"""
+
+        if isinstance(value, ArrowIPCFrame):
+            return cls._frame_from_ipc(value)
+        if isinstance(value, dict):
+            return {k: cls._decode(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return type(value)(cls._decode(v) for v in value)
+        return value
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _frame_to_ipc(df: pd.DataFrame) -> Optional[ArrowIPCFrame]:
+
+        """
+        Arrow IPC stream of df, or None if Arrow cannot give it back exactly
+        (pyarrow missing, duplicated or non-text column names, object columns with other things than text)
+        """
+
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return None
+
+        if not df.columns.is_unique or not all(isinstance(c, str) for c in df.columns):
+            return None
+
+        missing = {}
+        for col, dtype in df.dtypes.items():
+            if dtype != object:
+                continue
+            if pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+                return None
+            # Arrow has a single null: remember if the column used None or NaN
+            kinds = {value is None for value in df[col][df[col].isna()]}
+            if len(kinds) > 1:
+                return None
+            if kinds:
+                missing[col] = None if kinds.pop() else np.nan
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=True)
+        except (pa.ArrowException, TypeError, ValueError):
+            return None
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return ArrowIPCFrame(buffer=sink.getvalue().to_pybytes(), dtypes=df.dtypes.to_dict(), missing=missing)
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _frame_from_ipc(frame: ArrowIPCFrame) -> pd.DataFrame:
+
+        """Dataframe of an ArrowIPCFrame, with its original dtypes and missing values"""
+
+        import pyarrow as pa
+
+        df = pa.ipc.open_stream(frame.buffer).read_all().to_pandas()
+        for col, dtype in frame.dtypes.items():
+            if df[col].dtype != dtype:
+                df[col] = df[col].astype(dtype)
+        for col, value in frame.missing.items():
+            df[col] = df[col].where(df[col].notna(), value)
+        return df
+
+    # -------------------------------------------
+    # In the main process
+    # -------------------------------------------
+
+    def iter_results(
+        self,
+        downloads: Iterator[Tuple[str, Optional[Dict[str, BinaryIO]], Optional[Exception]]],
+        fileset_for: Callable[[str], "GDELTFileSet"],
+        mapping_columns: Optional["GDELTMappingQuality"]
+    ) -> Iterator[Tuple[str, Any, Optional[GDELTTimestampOutputs], Optional[Dict[str, Any]], Optional[Exception]]]:
+
+        """
+        Process the downloaded timestamps in the workers.
+
+        Inputs:
+            downloads: (timestamp, raw_files, download_error) in timestamp order (GDELTDownloadPrefetcher.iter_downloads)
+            fileset_for: Function giving the GDELTFileSet of a timestamp
+            mapping_columns: Passed through to process_fileset
+
+        Yields:
+            (timestamp, result of process_fileset, outputs, ingest_stats, error) in timestamp order
+        """
+
+        window = deque()
+
+        def next_result():
+            ts, future, error = window.popleft()
+            if error is not None:
+                return ts, None, None, None, error
+            try:
+                encoded, outputs, ingest_stats = future.result()
+            except Exception as e:
+                return ts, None, None, None, e
+            return ts, self._decode(encoded), outputs, ingest_stats, None
+
+        try:
+            for ts, raw_files, download_error in downloads:
+                if download_error is not None:
+                    window.append((ts, None, download_error))
+                else:
+                    # The zip files are sent to the worker as bytes
+                    content = {}
+                    for df_name, raw in raw_files.items():
+                        with raw:
+                            content[df_name] = raw.read()
+                    future = self.executor.submit(GDELTProcessPool._process_in_worker, fileset_for(ts), mapping_columns, content)
+                    window.append((ts, future, None))
+
+                # Keep at most max_pending_timestamps timestamps submitted
+                while len(window) >= self.max_pending_timestamps:
+                    yield next_result()
+
+            while window:
+                yield next_result()
+        finally:
+            for _, future, _ in window:
+                if future is not None:
+                    future.cancel()
+
+
+"""
+THIRTEENTH CLASS: GDELTOutputSink (and GDELTParquetDatasetSink, GDELTCSVAppendSink, GDELTParquetFileSink)
+These ones write the joined df of each timestamp as soon as it is processed,
+so GDELTTimestampBatchRunner never keeps the joined dfs of the whole range in memory
+"""
+
+class GDELTOutputSink:
+
+    """
+    Base class of the output sinks of GDELTTimestampBatchRunner.run(sink=...).
+
+    - write(timestamp, df) is called once per processed timestamp
+    - close() is called by the runner at the end of the run and returns the metadata of what was written
+    - subclasses implement _write and, if needed, _close
+    - holds(timestamp, output) tells if the output written by an earlier run is still there when the sink is
+      opened again (only GDELTParquetDatasetSink: the single file sinks start a new file); then a resumed run
+      does not keep the joined rows in its checkpoint and does not write them again
+    """
+
+    # Name of the sink in the metadata
+    KIND = "sink"
+
+    def __init__(self, path: str):
+
+        """
+        Args:
+            path: Where the output is written (a file or a folder depending on the sink)
+        """
+
+        self.path = Path(path)
+        self.files: List[str] = []
+        self.rows_by_timestamp: Dict[str, int] = {}
+        self.closed = False
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def __enter__(self) -> "GDELTOutputSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write(self, timestamp: str, df: pd.DataFrame) -> None:
+
+        """Write the joined df of one timestamp"""
+
+        if self.closed:
+            raise ValueError(f"The {self.KIND} sink is already closed")
+        self._write(timestamp, df)
+        self.rows_by_timestamp[timestamp] = self.rows_by_timestamp.get(timestamp, 0) + len(df)
+
+    def close(self) -> Dict[str, Any]:
+
+        """Finish the output (the runner calls it at the end of the run). Returns metadata()"""
+
+        if not self.closed:
+            self._close()
+            self.closed = True
+            self.logger.info(f"Wrote {sum(self.rows_by_timestamp.values())} rows to {self.path}")
+        return self.metadata()
+
+    def metadata(self) -> Dict[str, Any]:
+
+        """What was written: kind of sink, path, files, rows in total and per timestamp"""
+
+        return {
+            "sink": self.KIND,
+            "path": str(self.path),
+            "files": list(self.files),
+            "rows": sum(self.rows_by_timestamp.values()),
+            "rows_by_timestamp": dict(self.rows_by_timestamp),
+        }
+
+    def output(self, timestamp: str) -> Dict[str, Any]:
+
+        """Metadata of the output of one written timestamp (kept in the checkpoint instead of its joined rows)"""
+
+        return {"sink": self.KIND, "path": str(self.path), "rows": self.rows_by_timestamp.get(timestamp, 0)}
+
+    def holds(self, timestamp: str, output: Dict[str, Any]) -> bool:
+
+        """True if the output of a timestamp written by an earlier run (its output()) is still in this sink"""
+
+        return False
+
+    def adopt(self, timestamp: str, output: Dict[str, Any]) -> None:
+
+        """Count a timestamp written by an earlier run (resume) without writing it again"""
+
+        self.rows_by_timestamp[timestamp] = output["rows"]
+
+    def _write(self, timestamp: str, df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+
+class _ArrowSchemaMixin:
+
+    """Keep the Arrow schema of the first df, so all the Parquet outputs of a run have the same columns and types"""
+
+    schema = None
+
+    def _to_arrow_table(self, df: pd.DataFrame):
+
+        """Arrow table of df with the schema of the first df (columns that were all missing in it are text)"""
+
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.schema is None:
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ]).remove_metadata()
+        if table.schema.names != self.schema.names:
+            missing = set(self.schema.names) - set(table.schema.names)
+            extra = set(table.schema.names) - set(self.schema.names)
+            if missing or extra:
+                raise ValueError(f"The columns changed during the run (missing: {sorted(missing)}, new: {sorted(extra)})")
+            table = table.select(self.schema.names)
+        return table.replace_schema_metadata(None).cast(self.schema)
+
+
+class GDELTParquetDatasetSink(_ArrowSchemaMixin, GDELTOutputSink):
+
+    """
+    Parquet dataset partitioned by date and hour of the timestamp:
+    <path>/date=YYYYMMDD/hour=HH/<timestamp>.parquet (one file per timestamp, written again if the timestamp is)
+    It can be read back with pd.read_parquet(path) (the partitions become the columns date and hour).
+    """
+
+    KIND = "parquet_dataset"
+
+    def __init__(self, path: str, compression: str = "snappy"):
+        super().__init__(path)
+        self.compression = compression
+
+    def _file_path(self, timestamp: str) -> Path:
+        return self.path / f"date={timestamp[:8]}" / f"hour={timestamp[8:10]}" / f"{timestamp}.parquet"
+
+    def _write(self, timestamp: str, df: pd.DataFrame) -> None:
+        import pyarrow.parquet as pq
+
+        file_path = self._file_path(timestamp)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(self._to_arrow_table(df), file_path, compression=self.compression)
+        if str(file_path) not in self.files:
+            self.files.append(str(file_path))
+
+    def holds(self, timestamp: str, output: Dict[str, Any]) -> bool:
+        return output.get("sink") == self.KIND and output.get("path") == str(self.path) and self._file_path(timestamp).exists()
+
+    def adopt(self, timestamp: str, output: Dict[str, Any]) -> None:
+        super().adopt(timestamp, output)
+        if str(self._file_path(timestamp)) not in self.files:
+            self.files.append(str(self._file_path(timestamp)))
+
+
+class GDELTParquetFileSink(_ArrowSchemaMixin, GDELTOutputSink):
+
+    """
+    Single Parquet file, one row group per timestamp appended as they come (the file is complete once closed)
+    """
+
+    KIND = "parquet_file"
+
+    def __init__(self, path: str, compression: str = "snappy"):
+        super().__init__(path)
+        self.compression = compression
+        self.writer = None
+
+    def _write(self, timestamp: str, df: pd.DataFrame) -> None:
+        import pyarrow.parquet as pq
+
+        table = self._to_arrow_table(df)
+        if self.writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+            self.files.append(str(self.path))
+        self.writer.write_table(table)
+
+    def _close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+class GDELTCSVAppendSink(GDELTOutputSink):
+
+    """
+    Single CSV file: the header and the rows of the first timestamp overwrite the file, the next ones are appended
+    (in the columns order of the first timestamp)
+    """
+
+    KIND = "csv"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.columns: Optional[List[str]] = None
+
+    def _write(self, timestamp: str, df: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.columns = list(df.columns)
+            df.to_csv(self.path, index=False, mode="w", header=True)
+            self.files.append(str(self.path))
+            return
+
+        if set(df.columns) != set(self.columns):
+            missing = set(self.columns) - set(df.columns)
+            extra = set(df.columns) - set(self.columns)
+            raise ValueError(f"The columns changed during the run (missing: {sorted(missing)}, new: {sorted(extra)})")
+        df[self.columns].to_csv(self.path, index=False, mode="a", header=False)
+
+
+"""
+FOURTEENTH CLASS: GDELTBatchCheckpoint
+This one keeps on disk what GDELTTimestampBatchRunner already finished (a manifest plus one shard per timestamp),
+so a run that stopped (error, killed process) can be resumed without downloading and processing those timestamps again
+"""
+
+class GDELTBatchCheckpoint:
+
+    """
+    Checkpoint of a batch run.
+
+    - shards/<timestamp>.pkl keeps the result of process_fileset of the timestamp, its outputs (GDELTTimestampOutputs)
+      and its ingest statistics
+      (without the joined rows when a sink that keeps them across runs already wrote them)
+    - manifest.json records each finished timestamp (shard, rows, time, output of the sink) and the signature of the run
+      (joincase, statistics, key columns, mapping columns and the processor inputs)
+    - a checkpoint is only resumed with the same signature, since the shards of another configuration
+      would give other rows and statistics
+    - with keep_last only the last timestamps are kept (their shards and manifest entries), so the checkpoint
+      of a long-running follow does not grow
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    # Content of the shards: (result, outputs, ingest_stats). Part of the signature, so older shards are not resumed
+    SHARD_FORMAT = 2
+
+    def __init__(self, checkpoint_dir: str, signature: Dict[str, Any], keep_last: Optional[int] = None):
+
+        """
+        Args:
+            checkpoint_dir: Folder of the checkpoint (created if it does not exist)
+            signature: Configuration of the run (JSON serializable, other values are kept as text)
+            keep_last: Optional number of finished timestamps kept; the shards of the older ones are deleted.
+                None keeps all of them (run, which loads every shard on resume)
+        """
+
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.shards_dir = self.checkpoint_dir / "shards"
+        self.shards_dir.mkdir(parents=True, exist_ok=True)
+        self.signature = json.loads(json.dumps(signature, sort_keys=True, default=str))
+        self.keep_last = keep_last
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._manifest = self._load_manifest()
+
+    # ---------------------------------------------------------------------------
+    # Manifest helpers
+    # ---------------------------------------------------------------------------
+
+    def _load_manifest(self) -> Dict[str, Any]:
+
+        """Read manifest.json (an unreadable manifest just means nothing was finished)"""
+
+        manifest_path = self.checkpoint_dir / self.MANIFEST_NAME
+        if not manifest_path.exists():
+            return {"signature": None, "timestamps": {}}
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read checkpoint manifest {manifest_path}, starting empty: {e}")
+            return {"signature": None, "timestamps": {}}
+
+    def _save_manifest(self) -> None:
+
+        """Write manifest.json atomically (write a temporary file, then replace)"""
+
+        manifest_path = self.checkpoint_dir / self.MANIFEST_NAME
+        tmp_path = manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path)
+
+    def _shard_path(self, timestamp: str) -> Path:
+        return self.shards_dir / f"{timestamp}.pkl"
+
+    # ---------------------------------------------------------------------------
+    # Public functions
+    # ---------------------------------------------------------------------------
+
+    def reset(self) -> None:
+
+        """Forget the finished timestamps of an earlier run and start this one from scratch"""
+
+        for shard in self.shards_dir.glob("*.pkl"):
+            shard.unlink()
+        self._manifest = {"signature": self.signature, "timestamps": {}}
+        self._save_manifest()
+
+    def resume(self) -> List[str]:
+
+        """
+        Check that the manifest belongs to the same configuration and return its finished timestamps
+        (the ones whose shard is missing are processed again).
+        """
+
+        if self._manifest["signature"] is None and not self._manifest["timestamps"]:
+            self.reset()
+            return []
+        if self._manifest["signature"] != self.signature:
+            changed = sorted(
+                key for key in set(self.signature) | set(self._manifest["signature"] or {})
+                if self.signature.get(key) != (self._manifest["signature"] or {}).get(key)
+            )
+            raise ValueError(
+                f"The checkpoint in {self.checkpoint_dir} was written with another configuration "
+                f"(changed: {changed}). Use another output_dir or run without resume"
+            )
+
+        done = []
+        for timestamp, entry in sorted(self._manifest["timestamps"].items()):
+            if (self.checkpoint_dir / entry["shard"]).exists():
+                done.append(timestamp)
+            else:
+                self.logger.warning(f"Shard of {timestamp} is missing, it will be processed again")
+        return done
+
+    def record(
+        self,
+        timestamp: str,
+        result: Any,
+        outputs: Optional[GDELTTimestampOutputs],
+        ingest_stats: Optional[Dict[str, Any]],
+        rows: Optional[int],
+        output: Optional[Dict[str, Any]] = None
+    ) -> None:
+
+        """
+        Write the shard of a finished timestamp and add it to the manifest.
+        output is the metadata of the sink the joined rows were written to (GDELTOutputSink.output), when the
+        result has no joined rows because of it.
+        """
+
+        shard_path = self._shard_path(timestamp)
+        tmp_path = shard_path.with_suffix(".pkl.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((result, outputs, ingest_stats), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, shard_path)
+
+        self._manifest["timestamps"][timestamp] = {
+            "shard": str(shard_path.relative_to(self.checkpoint_dir)),
+            "rows": rows,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if output is not None:
+            self._manifest["timestamps"][timestamp]["output"] = output
+        self._prune()
+        self._save_manifest()
+
+    def _prune(self) -> None:
+
+        """Delete the shards and manifest entries of the timestamps before the last keep_last"""
+
+        if self.keep_last is None:
+            return
+        finished = sorted(self._manifest["timestamps"])
+        for timestamp in finished[:max(len(finished) - self.keep_last, 0)]:
+            entry = self._manifest["timestamps"].pop(timestamp)
+            (self.checkpoint_dir / entry["shard"]).unlink(missing_ok=True)
+
+    def output(self, timestamp: str) -> Optional[Dict[str, Any]]:
+
+        """Sink output recorded with a finished timestamp (None if its joined rows are in the shard)"""
+
+        return self._manifest["timestamps"][timestamp].get("output")
+
+    def load(self, timestamp: str) -> Tuple[Any, Optional[GDELTTimestampOutputs], Optional[Dict[str, Any]]]:
+
+        """Result of process_fileset, outputs and ingest statistics of a finished timestamp"""
+
+        with open(self.checkpoint_dir / self._manifest["timestamps"][timestamp]["shard"], "rb") as f:
+            return pickle.load(f)
+
+    def metadata(self) -> Dict[str, Any]:
+
+        """Where the checkpoint is and how many timestamps it has"""
+
+        return {
+            "path": str(self.checkpoint_dir),
+            "timestamps_done": sorted(self._manifest["timestamps"]),
+        }
+
+
+"""
+FIFTEENTH CLASS: GDELTLastUpdateWatcher
+This one reads lastupdate.txt of the GDELT site (or a local file with the same lines),
+so GDELTTimestampBatchRunner.follow knows which timestamp was published last
+"""
+
+class GDELTLastUpdateWatcher:
+
+    """
+    Reader of lastupdate.txt. Each line is "<size> <md5> <url of the zip file>", e.g.
+    150383 297a16b493de7cf6ca809a7cc31d0b93 http://data.gdeltproject.org/gdeltv2/20150218230000.export.CSV.zip
+    """
+
+    DEFAULT_SOURCE = GDELTDataLoader.DEFAULT_BASE_URL + "lastupdate.txt"
+
+    # <timestamp>.<file type> in the file name of each line
+    FILE_PATTERN = re.compile(r"(\d{14})\.(gkg|mentions|export)\.csv\.zip$", re.IGNORECASE)
+
+    def __init__(self, source: Optional[str] = None, request_timeout: float = 30):
+
+        """
+        Args:
+            source: URL (http/https) or local path of lastupdate.txt. Default: the one of the GDELT site
+            request_timeout: Timeout of each request, in seconds
+        """
+
+        self.source = source or self.DEFAULT_SOURCE
+        self.request_timeout = request_timeout
+
+        import requests
+
+        self.session = requests.Session()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def read(self) -> Dict[str, List[str]]:
+
+        """Published files of lastupdate.txt: {timestamp: [file types]}"""
+
+        if re.match(r"https?://", self.source):
+            response = self.session.get(self.source, timeout=self.request_timeout)
+            response.raise_for_status()
+            text = response.text
+        else:
+            text = Path(self.source).read_text(encoding="utf-8")
+
+        published: Dict[str, List[str]] = {}
+        for line in text.splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            match = self.FILE_PATTERN.search(parts[-1])
+            if match is None:
+                self.logger.warning(f"Unexpected line in {self.source}: {line}")
+                continue
+            published.setdefault(match.group(1), []).append(match.group(2).lower())
+        return published
+
+    def latest_timestamp(self, files: Optional[List[str]] = None) -> Optional[str]:
+
+        """
+        Latest timestamp for which all the files are published (None if there is none yet)
+
+        Args:
+            files: File types needed (e.g. ["gkg", "export"]). None means any file
+        """
+
+        published = self.read()
+        ready = [ts for ts, file_types in published.items() if not files or set(files) <= set(file_types)]
+        return max(ready) if ready else None
+
+
+"""
+SIXTEENTH CLASS: LocationParser
+NOTICE: THIS CLASS CONTAINS A SERIES OF FUNCTIONS THAT ARE USED TO PARSE THE LOCATIONS OF THE GKG FILE (V2ENHANCEDLOCATIONS)
+"""
+
+class LocationParser:
+
+    """
+    ONLY FOR GKG LOCATIONS!!
+    A V2ENHANCEDLOCATIONS cell is a ';'-separated list of locations, each one with '#'-separated fields:
+    LocationType#FullName#CountryCode#ADM1Code#ADM2Code#Latitude#Longitude#FeatureID#CharOffset
+    """
+
+    FIELDS = ["LocationType", "FullName", "CountryCode", "ADM1Code", "ADM2Code", "Latitude", "Longitude", "FeatureID", "CharOffset"]
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def _split_locations(series: pd.Series) -> pd.Series:
+
+        """One row per location (index: position of the cell in series), empty cells and tokens are skipped"""
+
+        cells = pd.Series(series.to_numpy(), index=np.arange(len(series)))
+        cells = cells[cells.notna()].astype(str)
+        locations = cells.str.split(';').explode()
+        return locations[locations.notna() & (locations != "")]
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def explode_location_column(series: pd.Series) -> pd.DataFrame:
+
+        """
+        Parse a whole V2ENHANCEDLOCATIONS column into a long table with one row per location.
+
+        Returns:
+            DataFrame with columns 'Row' (position of the cell in series) and FIELDS:
+            LocationType (Int64), Latitude and Longitude (float64), the others as text (missing fields are None)
+        """
+
+        locations = LocationParser._split_locations(series)
+        parts = locations.str.split('#', n=len(LocationParser.FIELDS) - 1, expand=True) if not locations.empty else pd.DataFrame()
+        parts = parts.reindex(columns=range(len(LocationParser.FIELDS)))
+
+        long = pd.DataFrame({'Row': locations.index.to_numpy()})
+        for i, field in enumerate(LocationParser.FIELDS):
+            values = parts[i].to_numpy(dtype=object)
+            if field == "LocationType":
+                long[field] = pd.to_numeric(pd.Series(values), errors="coerce").astype("Int64")
+            elif field in ("Latitude", "Longitude"):
+                long[field] = pd.to_numeric(pd.Series(values), errors="coerce").astype("float64")
+            else:
+                long[field] = pd.Series(values, dtype=object).where(pd.notna(values) & (values != ""), None)
+        return long
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def country_code_table(series: pd.Series) -> pd.DataFrame:
+
+        """
+        Only the CountryCode of each location (the cells are split up to the third field, the rest is not parsed).
+
+        Returns:
+            DataFrame with columns 'Row' (position of the cell in series) and 'CountryCode'
+        """
+
+        locations = LocationParser._split_locations(series)
+        if locations.empty:
+            return pd.DataFrame({'Row': pd.Series(dtype="int64"), 'CountryCode': pd.Series(dtype=object)})
+        parts = locations.str.split('#', n=3, expand=True)
+        codes = parts[2] if 2 in parts.columns else pd.Series(None, index=parts.index, dtype=object)
+        return pd.DataFrame({'Row': locations.index.to_numpy(), 'CountryCode': codes.to_numpy(dtype=object)})
+
+    # It is a static method because does not receive an implicit first argument
+    # It is just inside this class for organization purposes
+    @staticmethod
+    def country_mask(series: pd.Series, codes: frozenset) -> np.ndarray:
+
+        """
+        True for the cells with at least one location whose CountryCode is in codes (a membership test of the
+        CountryCode only, no regex over the whole cell).
+
+        With pyarrow the cells are split and the CountryCode of each location is extracted and looked up in Arrow
+        (no Python object or DataFrame per location); without it only the CountryCode of the locations is split out
+        with pandas.
+
+        The former regex (?<=#)(codes)(?=#) matched a code in any inner field, but the only other fields that are
+        a bare country code (ADM1Code and FeatureID of country level locations) are always the CountryCode of
+        that same location, so both give the same rows.
+        """
+
+        mask = np.zeros(len(series), dtype=bool)
+        if not codes or series.empty:
+            return mask
+
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            locations = LocationParser._split_locations(series)
+            country_codes = locations.str.split('#', n=3).str[2]
+            mask[locations.index.to_numpy()[country_codes.isin(codes).to_numpy()]] = True
+            return mask
+
+        value_set = pa.array(sorted(codes), type=pa.string())
+        cells = pa.Array.from_pandas(series)
+        chunks = cells.chunks if isinstance(cells, pa.ChunkedArray) else [cells]
+        start = 0
+        for chunk in chunks:
+            if pa.types.is_dictionary(chunk.type):
+                chunk = chunk.dictionary_decode()
+            if chunk.type != pa.string():
+                chunk = chunk.cast(pa.string())
+            locations = pc.split_pattern(chunk, ";")
+            # Third field of each location (null for the empty tokens and the locations with less fields)
+            country_codes = pc.extract_regex(pc.list_flatten(locations), r"^[^#]*#[^#]*#(?P<CountryCode>[^#]*)").field(0)
+            hit = pc.fill_null(pc.is_in(country_codes, value_set=value_set), False).to_numpy(zero_copy_only=False)
+            mask[start + pc.list_parent_indices(locations).to_numpy()[hit]] = True
+            start += len(chunk)
+        return mask
+
+
+"""
+SEVENTEENTH CLASS: GDELTThemeIndex
+This one keeps a dictionary-encoded vocabulary of the gkg themes (one integer id per theme, shared by all the timestamps)
+and resolves each themes_tags prefix once to the ids of the themes that begin with it
+"""
+
+class GDELTThemeIndex:
+
+    """
+    Theme vocabulary and prefix lookup for the themes_tags filter.
+
+    - each theme gets an integer id the first time it is seen; the ids never change (the vocabulary only grows)
+    - a prefix is resolved with a binary search on the sorted vocabulary (all the themes beginning with it are
+      a contiguous range), and cached until new themes are added
+    - the rows are then filtered with an integer membership test of their theme ids
+    - with a path, the vocabulary is kept in a JSON file, so it persists across batch runs
+    - add_category_list loads the themes of GraphCategoryList/GDELT-Global_Knowledge_Graph_CategoryList.xlsx
+    """
+
+    def __init__(self, path: Optional[str] = None, category_list_path: Optional[str] = None):
+
+        """
+        Args:
+            path: Optional JSON file of the vocabulary (read if it exists, written by save())
+            category_list_path: Optional GKG category list (xlsx with the columns Type and Name) to add to the vocabulary
+        """
+
+        self.path = Path(path) if path else None
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.themes: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._saved_size = 0
+        # Sorted vocabulary and resolved prefixes (rebuilt when the vocabulary grows)
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._prefix_cache: Dict[Tuple[str, ...], np.ndarray] = {}
+
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.add(json.load(f)["themes"])
+                self._saved_size = len(self.themes)
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Could not read theme index {self.path}, starting empty: {e}")
+        if category_list_path is not None:
+            self.add_category_list(category_list_path)
+
+    def __len__(self) -> int:
+        return len(self.themes)
+
+    def add(self, themes: List[str]) -> None:
+
+        """Add themes to the vocabulary (the ones already in it keep their id)"""
+
+        size = len(self.themes)
+        for theme in themes:
+            if theme not in self.ids:
+                self.ids[theme] = len(self.themes)
+                self.themes.append(theme)
+        if len(self.themes) != size:
+            self._sorted = None
+            self._prefix_cache = {}
+
+    def add_category_list(self, category_list_path: str) -> None:
+
+        """Add the themes of the GKG category list (rows with Type "Theme", or all the Names if there is no Type column)"""
+
+        sheets = pd.read_excel(category_list_path, sheet_name=None)
+        for sheet in sheets.values():
+            if "Name" not in sheet.columns:
+                continue
+            names = sheet["Name"] if "Type" not in sheet.columns else sheet.loc[sheet["Type"] == "Theme", "Name"]
+            self.add([str(name).strip() for name in names.dropna() if str(name).strip()])
+
+    def encode(self, themes: Union[pd.Series, np.ndarray]) -> np.ndarray:
+
+        """Ids of the themes (int32, the themes not seen yet are added); missing values get -1"""
+
+        values = pd.Series(themes, dtype=object)
+        present = values.notna().to_numpy()
+        distinct = pd.unique(values[present])
+        self.add([theme for theme in distinct if theme not in self.ids])
+        codes = np.full(len(values), -1, dtype=np.int32)
+        codes[present] = values[present].map(self.ids).to_numpy(dtype=np.int32)
+        return codes
+
+    def prefix_ids(self, prefixes: List[str]) -> np.ndarray:
+
+        """Ids of all the themes that begin with one of the prefixes (sorted, resolved once per vocabulary size)"""
+
+        key = tuple(sorted(set(prefixes)))
+        if key in self._prefix_cache:
+            return self._prefix_cache[key]
+
+        if self._sorted is None:
+            order = np.argsort(np.array(self.themes, dtype=object)) if self.themes else np.array([], dtype=np.int64)
+            self._sorted = (np.array(self.themes, dtype=object)[order].astype(str), order.astype(np.int32))
+        sorted_themes, sorted_ids = self._sorted
+
+        ranges = []
+        for prefix in key:
+            # The themes beginning with the prefix are the ones in [prefix, prefix + highest character)
+            start = np.searchsorted(sorted_themes, prefix, side="left")
+            end = np.searchsorted(sorted_themes, prefix + chr(0x10FFFF), side="left")
+            ranges.append(sorted_ids[start:end])
+        ids = np.unique(np.concatenate(ranges)) if ranges else np.array([], dtype=np.int32)
+        self._prefix_cache[key] = ids
+        return ids
+
+    def row_mask(self, rows: np.ndarray, themes: Union[pd.Series, np.ndarray], prefixes: List[str], n_rows: int) -> np.ndarray:
+
+        """
+        True for the rows with at least one theme beginning with one of the prefixes.
+
+        Args:
+            rows: Row (position) of each theme, as in the long tables of ThemeParser
+            themes: The themes (same length as rows)
+            prefixes: The themes_tags
+            n_rows: Number of rows
+        """
+
+        codes = self.encode(themes)
+        hit = np.isin(codes, self.prefix_ids(prefixes))
+        mask = np.zeros(n_rows, dtype=bool)
+        mask[np.asarray(rows)[hit]] = True
+        return mask
+
+    def list_row_mask(self, lists: pd.Series, prefixes: List[str]) -> np.ndarray:
+
+        """
+        row_mask for a compact theme column (Arrow list<dictionary<int32, string>>, see GKGProcessor._compact_theme_columns).
+        The dictionary values are encoded (not the indices), so it works with any dictionary, not only this vocabulary.
+        """
+
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        # Every row begins with an empty prefix (as with the strings)
+        if "" in prefixes:
+            return np.ones(len(lists), dtype=bool)
+
+        arrow = pa.array(lists.array)
+        chunks = arrow.chunks if isinstance(arrow, pa.ChunkedArray) else [arrow]
+        rows, codes, start = [], [], 0
+        for chunk in chunks:
+            values = pc.list_flatten(chunk)
+            # Ids of the dictionary values, with -1 (last position) for missing values
+            dictionary_codes = np.append(self.encode(values.dictionary.to_numpy(zero_copy_only=False)), -1)
+            codes.append(dictionary_codes[pc.fill_null(values.indices, -1).to_numpy()])
+            rows.append(start + pc.list_parent_indices(chunk).to_numpy())
+            start += len(chunk)
+
+        # The prefixes are resolved after the encoding, so they include the themes added by it
+        mask = np.zeros(len(lists), dtype=bool)
+        if codes:
+            hit = np.isin(np.concatenate(codes), self.prefix_ids(prefixes))
+            mask[np.concatenate(rows)[hit]] = True
+        return mask
+
+    def str_row_mask(self, cells: pd.Series, prefixes: List[str]) -> np.ndarray:
+
+        """
+        row_mask for a ','-separated theme column (gkg_V2ENHANCEDTHEMES_list_str).
+        The cells are split in Arrow and only the distinct themes are encoded (no long table of Python strings);
+        without pyarrow they are split with pandas into the long table of row_mask.
+        """
+
+        # Every row begins with an empty prefix (as with the strings)
+        if "" in prefixes:
+            return np.ones(len(cells), dtype=bool)
+
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            values = pd.Series(cells.to_numpy(), index=np.arange(len(cells)))
+            tokens = values[values.notna()].astype(str).str.split(',').explode().str.strip()
+            tokens = tokens[tokens.notna() & (tokens != "")]
+            return self.row_mask(tokens.index.to_numpy(), tokens.to_numpy(dtype=object), prefixes, len(cells))
+
+        arrow = pa.Array.from_pandas(cells)
+        chunks = arrow.chunks if isinstance(arrow, pa.ChunkedArray) else [arrow]
+        rows, codes, start = [], [], 0
+        for chunk in chunks:
+            if pa.types.is_dictionary(chunk.type):
+                chunk = chunk.dictionary_decode()
+            if chunk.type != pa.string():
+                chunk = chunk.cast(pa.string())
+            tokens = pc.split_pattern(chunk, ",")
+            values = pc.dictionary_encode(pc.utf8_trim_whitespace(pc.list_flatten(tokens)))
+            # Ids of the distinct themes, with -1 for the empty tokens and (last position) for missing values
+            dictionary = pd.Series(values.dictionary.to_numpy(zero_copy_only=False), dtype=object)
+            dictionary_codes = np.append(self.encode(dictionary.mask(dictionary == "")), -1)
+            codes.append(dictionary_codes[pc.fill_null(values.indices, -1).to_numpy()])
+            rows.append(start + pc.list_parent_indices(tokens).to_numpy())
+            start += len(chunk)
+
+        # The prefixes are resolved after the encoding, so they include the themes added by it
+        mask = np.zeros(len(cells), dtype=bool)
+        if codes:
+            hit = np.isin(np.concatenate(codes), self.prefix_ids(prefixes))
+            mask[np.concatenate(rows)[hit]] = True
+        return mask
+
+    def save(self) -> None:
+
+        """Write the vocabulary to path (atomically), if it has a path and new themes were added"""
+
+        if self.path is None or len(self.themes) == self._saved_size:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"themes": self.themes}, f)
+        os.replace(tmp_path, self.path)
+        self._saved_size = len(self.themes)
+
+
+"""
+EIGHTEENTH CLASS: KeyColumnSketch
+This one keeps the statistics of one key column (length and distinct values) in a form that can be merged,
+so GDELTTimestampBatchRunner can give the uniqueness of the keys over the whole range, not only per timestamp
+"""
+
+class KeyColumnSketch:
+
+    """
+    Length and distinct values of a key column, built in one pass over the native values (no str copies, no unique lists).
+
+    - each value is hashed to 64 bits (pd.util.hash_array, the same hash in every process)
+    - "exact": the distinct hashes are kept (8 bytes per distinct key); exact up to 64-bit hash collisions
+    - "hll": HyperLogLog registers (2**precision bytes whatever the number of keys), approximate distinct count
+      (relative error about 1.04 / sqrt(2**precision), 0.8% with the default precision)
+    - merge() combines the sketches of several timestamps (union of the hashes / maximum of the registers)
+    """
+
+    MODES = ("exact", "hll")
+    DEFAULT_PRECISION = 14
+
+    def __init__(self, mode: str = "exact", precision: int = DEFAULT_PRECISION):
+
+        """
+        Args:
+            mode: "exact" or "hll"
+            precision: Number of bits of the hash used to choose the register ("hll" only, 4 to 18)
+        """
+
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode: {mode}. Must be one of: {', '.join(self.MODES)}")
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.mode = mode
+        self.precision = precision
+        # Rows added, missing values included (as the column_length of check_key_columns)
+        self.length = 0
+        self._hashes = np.array([], dtype=np.uint64)
+        self._registers = np.zeros(2**precision, dtype=np.uint8) if mode == "hll" else None
+
+    def add(self, series: pd.Series) -> "KeyColumnSketch":
+
+        """Add the values of a column (missing values only count in the length)"""
+
+        self.length += int(series.shape[0])
+        values = series.dropna()
+        if values.empty:
+            return self
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            native = values.to_numpy(dtype=object)
+        elif pd.api.types.is_integer_dtype(values.dtype):
+            native = values.to_numpy(dtype=np.int64)  # also the nullable Int64 key columns of GDELTJoinKeys
+        else:
+            native = values.to_numpy()
+        hashes = pd.util.hash_array(native)
+
+        if self.mode == "exact":
+            self._hashes = np.union1d(self._hashes, hashes)
+            return self
+
+        # HyperLogLog: the first bits choose the register, the register keeps the highest rank
+        # (position of the first 1 bit) seen in the remaining bits
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.int64)
+        remaining = hashes & np.uint64((1 << bits) - 1)
+        rank = (bits - self._bit_length(remaining) + 1).astype(np.uint8)
+        np.maximum.at(self._registers, index, rank)
+        return self
+
+    @staticmethod
+    def _bit_length(values: np.ndarray) -> np.ndarray:
+
+        """Number of bits of each uint64 (0 for 0), from its two 32-bit halves so the float64 log2 is exact"""
+
+        high = (values >> np.uint64(32)).astype(np.float64)
+        low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        return np.where(
+            high > 0,
+            33 + np.floor(np.log2(np.maximum(high, 1))),
+            np.where(low > 0, 1 + np.floor(np.log2(np.maximum(low, 1))), 0)
+        ).astype(np.int64)
+
+    def merge(self, other: "KeyColumnSketch") -> "KeyColumnSketch":
+
+        """Add the rows and values of another sketch of the same mode and precision (in place)"""
+
+        if other.mode != self.mode or other.precision != self.precision:
+            raise ValueError(
+                f"Cannot merge a {other.mode} sketch (precision {other.precision}) "
+                f"into a {self.mode} sketch (precision {self.precision})"
+            )
+        self.length += other.length
+        if self.mode == "exact":
+            self._hashes = np.union1d(self._hashes, other._hashes)
+        else:
+            np.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def __eq__(self, other: object) -> bool:
+
+        """Same mode, precision, length and hashes / registers (so the sketches of serial, pool and resumed runs compare by value)"""
+
+        if not isinstance(other, KeyColumnSketch):
+            return NotImplemented
+        if (self.mode, self.precision, self.length) != (other.mode, other.precision, other.length):
+            return False
+        if self.mode == "exact":
+            return bool(np.array_equal(self._hashes, other._hashes))
+        return bool(np.array_equal(self._registers, other._registers))
+
+    # Mutable (add / merge), so not hashable
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"KeyColumnSketch(mode={self.mode!r}, precision={self.precision}, length={self.length}, distinct={self.distinct()})"
+
+    def distinct(self) -> int:
+
+        """Number of distinct values (estimated with "hll")"""
+
+        if self.mode == "exact":
+            return int(len(self._hashes))
+
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self._registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self._registers == 0))
+        # Small range correction (linear counting) when many registers are still empty
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def metrics(self, prefix: str) -> Dict[str, int]:
+
+        """Statistics with the names of check_key_columns: <prefix>_length, _uniquevalues_length, _length_difference"""
+
+        distinct = self.distinct()
+        return {
+            f"{prefix}_length": self.length,
+            f"{prefix}_uniquevalues_length": distinct,
+            f"{prefix}_length_difference": self.length - distinct,
+        }
+
+
+"""
+NINETEENTH CLASS: GDELTJoinKeys
+This one normalizes the join keys of each file once, when the file is loaded (GDELTDataLoader),
+so DataJoiner, KeyColumnsCheckUp and MappingAnalyzer compare integers instead of trimming and comparing strings
+"""
+
+class GDELTJoinKeys:
+
+    """
+    Canonical key columns, added next to the key columns of each file as "<column>__key" (nullable Int64).
+
+    - "id" keys (GlobalEventID): the integer value itself
+    - "url" keys (V2DOCUMENTIDENTIFIER, MentionIdentifier, SOURCEURL): the text without the surrounding spaces
+      (as TRIM(CAST(... AS TEXT)) of the sql join) hashed to 64 bits with pd.util.hash_array (the same hash in every process).
+      Each distinct text is hashed once; if two texts of the file get the same hash, the file gets no key column
+    - missing values have no key (they never match); blank texts have the key BLANK_KEY
+    - when two files are compared (pair), the texts of the keys found in both are checked once per key,
+      so a hash collision between files is detected and the callers go back to comparing the texts
+    """
+
+    # Name of the key column of a column
+    KEY_SUFFIX = "__key"
+
+    # Key columns of each file type (names of Dictionaries.xlsx) and their kind
+    KEY_COLUMNS = {
+        "gkg": {"V2DOCUMENTIDENTIFIER": "url"},
+        "mentions": {"MentionIdentifier": "url", "GlobalEventID": "id"},
+        "export": {"GlobalEventID": "id", "SOURCEURL": "url"},
+    }
+
+    # Key of an empty (or only spaces) text
+    BLANK_KEY = int(pd.util.hash_array(np.array([""], dtype=object), categorize=False).view(np.int64)[0])
+
+    @classmethod
+    def key_name(cls, column: str) -> str:
+
+        """Name of the key column of a column"""
+
+        return f"{column}{cls.KEY_SUFFIX}"
+
+    @classmethod
+    def add_key_columns(cls, df: pd.DataFrame, file_type: str) -> pd.DataFrame:
+
+        """
+        Add the key columns of a loaded file (in place; key columns that were not loaded are skipped).
+
+        Inputs:
+            df: Data frame with the dictionary headers
+            file_type: One of 'gkg', 'mentions', 'export'
+
+        Returns:
+            The same data frame
+        """
+
+        for column, kind in cls.KEY_COLUMNS.get(file_type, {}).items():
+            if column not in df.columns:
+                continue
+            keys = cls.id_keys(df[column]) if kind == "id" else cls.url_keys(df[column])
+            if keys is None:
+                logging.getLogger(cls.__name__).warning(
+                    f"No key column for {file_type} {column}: the texts are compared instead"
+                )
+                continue
+            df[cls.key_name(column)] = keys
+        return df
+
+    @staticmethod
+    def id_keys(series: pd.Series) -> Optional[pd.Series]:
+
+        """Integer key of an id column (None if the column was not parsed as integers)"""
+
+        if not pd.api.types.is_integer_dtype(series.dtype):
+            return None
+        return series.astype("Int64")
+
+    @classmethod
+    def url_keys(cls, series: pd.Series) -> Optional[pd.Series]:
+
+        """64-bit hash of the stripped text of each value (None if two different texts get the same hash)"""
+
+        hashed = cls._hash_texts(series, lambda texts: texts.str.strip(" "))
+        return None if hashed is None else hashed[0]
+
+    @classmethod
+    def canonical_url_keys(cls, series: pd.Series) -> Optional[Tuple[pd.Series, pd.Series]]:
+
+        """
+        64-bit hash of the canonical URL of each value (see canonical_urls); blank URLs have no key.
+
+        Returns:
+            (key per row, canonical URL by key), or None if two different canonical URLs get the same hash
+        """
+
+        return cls._hash_texts(series, cls.canonical_urls, blank_is_missing=True)
+
+    @staticmethod
+    def _hash_texts(
+        series: pd.Series,
+        normalize: Callable[[pd.Series], pd.Series],
+        blank_is_missing: bool = False
+    ) -> Optional[Tuple[pd.Series, pd.Series]]:
+
+        """
+        Normalize and hash each distinct value of series once.
+
+        Returns:
+            (key per row as nullable Int64, normalized text by key), or None if two different texts get the same hash
+        """
+
+        values = series.astype(object)
+        missing = values.isna().to_numpy()
+        codes, uniques = pd.factorize(values.to_numpy()[~missing])
+        texts = normalize(pd.Series(uniques, dtype=object).astype(str)).to_numpy(dtype=object)
+        # Different raw values can have the same normalized text (and so the same hash), which is not a collision
+        hashes = pd.util.hash_array(texts, categorize=False).view(np.int64)
+        if len(np.unique(hashes)) != len(pd.unique(texts)):
+            return None
+
+        keys = np.zeros(len(values), dtype=np.int64)
+        keys[~missing] = hashes[codes]
+        if blank_is_missing:
+            missing = missing.copy()
+            missing[~missing] = (texts == "")[codes]
+        texts_by_key = pd.Series(texts, index=hashes, dtype=object)
+        return (
+            pd.Series(pd.arrays.IntegerArray(keys, missing), index=series.index),
+            texts_by_key[~texts_by_key.index.duplicated()]
+        )
+
+    @classmethod
+    def canonical_urls(cls, urls: pd.Series) -> pd.Series:
+
+        """
+        Canonical form of URLs, so trivial variants of the same document are the same text:
+        no scheme (http and https), lower case host without "www." and default port, no fragment,
+        no trailing slash and no tracking parameters (utm_*, fbclid, gclid, ..., see TRACKING_PARAMETERS) in the query
+        """
+
+        urls = urls.astype(str).str.strip()
+        urls = urls.str.replace(r"#.*$", "", regex=True).str.replace(r"^[A-Za-z][A-Za-z0-9+.-]*://", "", regex=True)
+        parts = urls.str.extract(r"^([^/?]*)([^?]*)(?:\?(.*))?$")
+        host = parts[0].fillna("").str.lower().str.replace(r"^www\.", "", regex=True).str.replace(r":(?:80|443)$", "", regex=True)
+        path = parts[1].fillna("").str.replace(r"/+$", "", regex=True)
+        query = parts[2].fillna("")
+        # Only the URLs with a query go through the (python) filter of the parameters
+        with_query = query.ne("")
+        query[with_query] = query[with_query].map(cls._strip_tracking_parameters)
+        return host + path + ("?" + query).where(query.ne(""), "")
+
+    # Query parameters that only track where the reader came from (they do not change the document)
+    TRACKING_PARAMETERS = re.compile(
+        r"^(?:utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|ocid|cmpid|smid|icid|ns_\w+)$", re.IGNORECASE
+    )
+
+    @classmethod
+    def _strip_tracking_parameters(cls, query: str) -> str:
+
+        """The query of a URL without its tracking parameters (the others keep their order)"""
+
+        return "&".join(
+            parameter for parameter in query.split("&")
+            if parameter and not cls.TRACKING_PARAMETERS.match(parameter.split("=", 1)[0])
+        )
+
+    @classmethod
+    def keys_of(cls, df: pd.DataFrame, column: str) -> Optional[pd.Series]:
+
+        """Key column of a column of df (None if df has none, e.g. it was loaded without keys)"""
+
+        name = cls.key_name(column)
+        return df[name] if name in df.columns else None
+
+    @classmethod
+    def pair(
+        cls,
+        left_df: pd.DataFrame,
+        left_column: str,
+        right_df: pd.DataFrame,
+        right_column: str
+    ) -> Optional[Tuple[pd.Series, pd.Series]]:
+
+        """
+        Key columns to compare left_column of left_df with right_column of right_df.
+
+        Returns:
+            (left keys, right keys), or None if one of them has no key column, one is an "id" key and the other
+            a "url" key, or a key of both files is the hash of two different texts (the texts have to be compared)
+        """
+
+        left_keys = cls.keys_of(left_df, left_column)
+        right_keys = cls.keys_of(right_df, right_column)
+        if left_keys is None or right_keys is None:
+            return None
+        if cls._kind(left_column) != cls._kind(right_column):
+            return None
+        if cls._kind(left_column) == "url" and not cls._same_texts(left_keys, left_df[left_column], right_keys, right_df[right_column]):
+            logging.getLogger(cls.__name__).warning(
+                f"Hash collision between {left_column} and {right_column}: the texts are compared instead"
+            )
+            return None
+        return left_keys, right_keys
+
+    @classmethod
+    def _kind(cls, column: str) -> Optional[str]:
+
+        """"id" or "url" for a key column (with or without the gkg_ prefix of GKGProcessor)"""
+
+        for columns in cls.KEY_COLUMNS.values():
+            for name, kind in columns.items():
+                if column in (name, f"gkg_{name}"):
+                    return kind
+        return None
+
+    @staticmethod
+    def _same_texts(left_keys: pd.Series, left_text: pd.Series, right_keys: pd.Series, right_text: pd.Series) -> bool:
+
+        """True if each key found in both files stands for the same stripped text (one comparison per common key)"""
+
+        def text_by_key(keys: pd.Series, text: pd.Series) -> pd.Series:
+            valid = keys.notna().to_numpy()
+            by_key = pd.Series(text.to_numpy(dtype=object)[valid], index=keys.to_numpy(dtype=np.int64, na_value=0)[valid])
+            return by_key[~by_key.index.duplicated()]
+
+        left = text_by_key(left_keys, left_text)
+        right = text_by_key(right_keys, right_text)
+        common = left.index.intersection(right.index)
+        if common.empty:
+            return True
+        left_common = left.loc[common].astype(str).str.strip(" ").to_numpy()
+        right_common = right.loc[common].astype(str).str.strip(" ").to_numpy()
+        return bool((left_common == right_common).all())
+
+    @classmethod
+    def filled_mask(cls, keys: pd.Series) -> pd.Series:
+
+        """Keys that are not missing and not blank (a value that can be mapped)"""
+
+        return keys.notna() & keys.ne(cls.BLANK_KEY).fillna(False)
+
+    @classmethod
+    def drop(cls, df: Optional[pd.DataFrame], inplace: bool = True) -> Optional[pd.DataFrame]:
+
+        """The data frame without its key columns (they are not part of the output)"""
+
+        if df is None:
+            return None
+        key_columns = [col for col in df.columns if isinstance(col, str) and col.endswith(cls.KEY_SUFFIX)]
+        if not key_columns:
+            return df
+        if not inplace:
+            return df.drop(columns=key_columns)
+        df.drop(columns=key_columns, inplace=True)
+        return df
+
+"""
+TWENTIETH CLASS: GDELTURLIndex (on _TimestampKeyIndex, shared with GDELTEventWindow)
+This one keeps the export rows of the last timestamps indexed by the hash of their canonical SOURCEURL,
+so in the gkg_export joincase a gkg document also matches the URL variants (http/https, trailing slash,
+tracking parameters) and the events of the earlier timestamps, not only the exact URL of the same timestamp
+"""
+
+class _TimestampKeyIndex:
+
+    """
+    Rows of the last timestamps with an int64 key each, indexed as the sorted keys and the row offset of each one.
+
+    - _add_rows() keeps the rows of a timestamp (adding a timestamp again replaces them) and _evict() drops the old ones
+    - rows are the kept rows of all the timestamps, in the order they were added (the offsets point into it)
+    - _left_join_keys() gives the positions of a LEFT JOIN of some keys with the kept rows (a binary search per key);
+      per key, the matches come in timestamp order and then in file order
+    - with UNIQUE_KEYS only the newest row of each key is matched
+    """
+
+    UNIQUE_KEYS = False
+
+    def __init__(self):
+        # Per timestamp, in the order they were added: (rows, key per row, extra data of the subclass)
+        self._timestamps: Dict[str, Tuple[pd.DataFrame, pd.Series, Any]] = {}
+        # The index of the kept rows, built again after a change (see _build)
+        self._rows: Optional[pd.DataFrame] = None
+        self._sorted_keys = np.array([], dtype=np.int64)
+        self._offsets = np.array([], dtype=np.int64)
+        self._row_timestamps = np.array([], dtype=np.int64)
+        # Matches of the last left_join
+        self.last_stats: Dict[str, int] = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def __len__(self) -> int:
+        return sum(len(entry[0]) for entry in self._timestamps.values())
+
+    @property
+    def timestamps(self) -> List[str]:
+        return list(self._timestamps)
+
+    @property
+    def rows(self) -> pd.DataFrame:
+
+        """The kept rows (of all the timestamps, in the order they were added), as given by the offsets"""
+
+        self._build()
+        return self._rows
+
+    def _add_rows(self, timestamp: str, rows: pd.DataFrame, keys: pd.Series, extra: Any = None) -> None:
+
+        """Keep the rows of a timestamp with their keys (nullable Int64, missing keys are never matched)"""
+
+        self._timestamps.pop(timestamp, None)
+        self._timestamps[timestamp] = (rows.reset_index(drop=True), keys.reset_index(drop=True), extra)
+        self._evict()
+        self._rows = None
+
+    def _evict(self) -> None:
+
+        """Drop the timestamps that are not kept any more (the subclasses decide which)"""
+
+    def _build(self) -> None:
+
+        """Sort the keys of the kept rows (stable, so equal keys keep the timestamp and file order)"""
+
+        if self._rows is not None:
+            return
+        frames = [entry[0] for entry in self._timestamps.values()]
+        keys = [entry[1] for entry in self._timestamps.values()]
+        self._rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        key_values = np.concatenate([k.to_numpy(dtype=np.int64, na_value=0) for k in keys]) if keys else np.array([], dtype=np.int64)
+        valid = ~np.concatenate([k.isna().to_numpy() for k in keys]) if keys else np.array([], dtype=bool)
+        self._offsets = np.flatnonzero(valid)[np.argsort(key_values[valid], kind="stable")]
+        self._sorted_keys = key_values[self._offsets]
+        if self.UNIQUE_KEYS and len(self._sorted_keys):
+            # The last row of each run of equal keys is the newest one
+            last = np.append(self._sorted_keys[1:] != self._sorted_keys[:-1], True)
+            self._offsets, self._sorted_keys = self._offsets[last], self._sorted_keys[last]
+        self._row_timestamps = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+
+    def _left_join_keys(self, keys: pd.Series, valid: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+
+        """
+        LEFT JOIN of keys (nullable Int64) with the kept rows.
+
+        Inputs:
+            keys: Key of each left row
+            valid: Optional mask of the left rows that can be matched at all (missing keys never are)
+
+        Returns:
+            (left positions, row offsets in rows or -1 when there is no match, counts) where counts has
+            "rows" (left rows), "rows_matched" and "rows_matched_earlier_timestamps" (matched by a row of a
+            timestamp before the last one added)
+        """
+
+        self._build()
+        values = keys.to_numpy(dtype=np.int64, na_value=0)
+        can_match = keys.notna().to_numpy() if valid is None else valid & keys.notna().to_numpy()
+
+        # Range of the sorted keys equal to each key (empty if there is none)
+        first = np.searchsorted(self._sorted_keys, values, side="left")
+        counts = np.where(can_match, np.searchsorted(self._sorted_keys, values, side="right") - first, 0)
+
+        # One joined row per match, or a single unmatched one
+        per_row = np.maximum(counts, 1)
+        left = np.repeat(np.arange(len(values)), per_row)
+        within = np.arange(len(left)) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+        matched = np.repeat(counts > 0, per_row)
+        right = np.full(len(left), -1, dtype=np.int64)
+        right[matched] = self._offsets[np.repeat(first, per_row)[matched] + within[matched]]
+
+        earlier = matched.copy()
+        earlier[matched] = self._row_timestamps[right[matched]] != len(self._timestamps) - 1
+        return left, right, {
+            "rows": int(len(values)),
+            "rows_matched": int(np.count_nonzero(counts)),
+            "rows_matched_earlier_timestamps": int(len(np.unique(left[earlier]))),
+        }
+
+
+class GDELTURLIndex(_TimestampKeyIndex):
+
+    """
+    Export rows of the last max_timestamps timestamps, indexed by canonical URL (GDELTJoinKeys.canonical_url_keys).
+
+    - add() keeps the given columns of the export rows of a timestamp (the oldest timestamp is dropped
+      when there are more than max_timestamps, so the memory is bounded)
+    - left_join() gives the positions of a LEFT JOIN of gkg_V2DOCUMENTIDENTIFIER with the indexed rows
+      and keeps in last_stats how many gkg rows were matched, by the index and by the exact text of the URL
+    - a key found in both that stands for two different canonical URLs (a hash collision) is never matched
+    """
+
+    def __init__(self, max_timestamps: Optional[int] = 96):
+
+        """
+        Args:
+            max_timestamps: Timestamps of export rows kept (96 = the last 24 hours). None keeps all of them
+        """
+
+        if max_timestamps is not None and max_timestamps < 1:
+            raise ValueError("max_timestamps must be at least 1 (or None)")
+        super().__init__()
+        self.max_timestamps = max_timestamps
+        # Canonical URL by key of the kept rows (to detect hash collisions)
+        self._texts = pd.Series(dtype=object)
+
+    def add(self, timestamp: str, export_df: pd.DataFrame, columns: List[str]) -> None:
+
+        """
+        Add the export rows of a timestamp (only their SOURCEURL and the given columns are kept).
+        Adding a timestamp again replaces its rows.
+        """
+
+        hashed = GDELTJoinKeys.canonical_url_keys(export_df["SOURCEURL"])
+        if hashed is None:
+            self.logger.warning(f"Hash collision between the export URLs of {timestamp}: they are not indexed")
+            keys = pd.Series(pd.array([None] * len(export_df), dtype="Int64"), index=export_df.index)
+            texts = pd.Series(dtype=object)
+        else:
+            keys, texts = hashed
+            # A key of the earlier timestamps that stands for another URL is left out of this timestamp
+            other = self._texts_by_key(exclude=timestamp)
+            common = texts.index.intersection(other.index)
+            colliding = common[texts.loc[common].to_numpy() != other.loc[common].to_numpy()]
+            if len(colliding):
+                self.logger.warning(f"{len(colliding)} hash collisions with the earlier export URLs: those rows are not indexed")
+                keys = keys.mask(keys.isin(colliding))
+
+        # The exact keys of the loader (if there are) only count the matches of the exact join in last_stats
+        exact_keys = GDELTJoinKeys.keys_of(export_df, "SOURCEURL")
+        exact = None if exact_keys is None else exact_keys.dropna().unique().to_numpy(dtype=np.int64)
+
+        kept = list(dict.fromkeys(["SOURCEURL"] + [col for col in columns if col in export_df.columns]))
+        self._add_rows(timestamp, export_df[kept], keys, (texts, exact))
+
+    def _evict(self) -> None:
+        while self.max_timestamps is not None and len(self._timestamps) > self.max_timestamps:
+            self._timestamps.pop(next(iter(self._timestamps)))
+
+    def _texts_by_key(self, exclude: Optional[str] = None) -> pd.Series:
+
+        """Canonical URL by key of the kept timestamps (except the one given in exclude)"""
+
+        others = [entry[2][0] for ts, entry in self._timestamps.items() if ts != exclude and len(entry[2][0])]
+        if not others:
+            return pd.Series(dtype=object)
+        texts = pd.concat(others)
+        return texts[~texts.index.duplicated()]
+
+    def _build(self) -> None:
+        if self._rows is None:
+            super()._build()
+            self._texts = self._texts_by_key()
+
+    def left_join(self, urls: pd.Series, exact_keys: Optional[pd.Series] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+
+        """
+        LEFT JOIN of URLs (gkg_V2DOCUMENTIDENTIFIER) with the kept export rows by canonical URL.
+
+        Inputs:
+            urls: URL of each left row
+            exact_keys: Optional key of each left row as in the exact join (GDELTJoinKeys key column),
+                        only to count in last_stats the rows the exact join of the last timestamp would match
+
+        Returns:
+            (left positions, row offsets in rows, -1 when there is no match) of each joined row,
+            or None if two URLs of urls get the same hash (then the exact join has to be used)
+        """
+
+        self._build()
+        hashed = GDELTJoinKeys.canonical_url_keys(urls)
+        if hashed is None:
+            self.logger.warning("Hash collision between the gkg URLs: the exact join is used instead")
+            return None
+        keys, texts = hashed
+
+        # Keys of both that stand for different canonical URLs are not matched
+        common = texts.index.intersection(self._texts.index)
+        colliding = common[texts.loc[common].to_numpy() != self._texts.loc[common].to_numpy()]
+        left, right, counts = self._left_join_keys(keys, ~keys.isin(colliding).fillna(False).to_numpy())
+
+        # Matches by the index, from the earlier timestamps and (if the keys are given) by the exact join of this one
+        self.last_stats = {f"gkg_{name}": value for name, value in counts.items()}
+        self.last_stats["export_rows_indexed"] = int(len(self._row_timestamps))
+        latest_exact = list(self._timestamps.values())[-1][2][1] if self._timestamps else None
+        if exact_keys is not None and latest_exact is not None:
+            self.last_stats["gkg_rows_matched_exact"] = int(exact_keys.isin(latest_exact).fillna(False).sum())
+        return left, right
+
+
+"""
+TWENTY-FIRST CLASS: GDELTEventWindow
+This one keeps the export events of the last hours indexed by GlobalEventID, so in the joincase "all"
+the mentions of a timestamp also find the events first seen in the earlier timestamps (GDELTTimestampBatchRunner)
+"""
+
+class GDELTEventWindow(_TimestampKeyIndex):
+
+    """
+    Export rows of the timestamps of the last window_hours hours, indexed by GlobalEventID.
+
+    - add() keeps GlobalEventID and the given columns of the export rows of a timestamp and drops the timestamps
+      that are window_hours or more before it, so the memory is bounded by the size of the window
+    - left_join() gives the positions of a LEFT JOIN of the GlobalEventID of mentions with the kept events
+      (an event kept in several timestamps is matched once, with its newest row) and keeps in last_stats
+      how many mentions rows were matched, by the window and by the export file of the same timestamp
+    """
+
+    UNIQUE_KEYS = True
+
+    def __init__(self, window_hours: float = 24):
+
+        """
+        Args:
+            window_hours: Hours of export events kept before the last timestamp added (24 = 96 timestamps)
+        """
+
+        if window_hours <= 0:
+            raise ValueError("window_hours must be positive")
+        super().__init__()
+        self.window_hours = window_hours
+
+    def add(self, timestamp: str, export_df: pd.DataFrame, columns: List[str]) -> None:
+
+        """
+        Add the export events of a timestamp (only their GlobalEventID and the given columns are kept).
+        Adding a timestamp again replaces its rows.
+        """
+
+        keys = self._event_keys(export_df["GlobalEventID"])
+        kept = list(dict.fromkeys(["GlobalEventID"] + [col for col in columns if col in export_df.columns]))
+        self._add_rows(timestamp, export_df[kept], keys, keys.dropna().unique().to_numpy(dtype=np.int64))
+
+    def _evict(self) -> None:
+
+        """Drop the timestamps window_hours or more before the newest one"""
+
+        newest = max(parse_ts(ts) for ts in self._timestamps)
+        oldest_kept = newest - timedelta(hours=self.window_hours)
+        for ts in [ts for ts in self._timestamps if parse_ts(ts) <= oldest_kept]:
+            self._timestamps.pop(ts)
+
+    @staticmethod
+    def _event_keys(event_ids: pd.Series) -> pd.Series:
+
+        """GlobalEventID as nullable Int64 (values that are not whole numbers are missing)"""
+
+        if pd.api.types.is_integer_dtype(event_ids.dtype):
+            return event_ids.astype("Int64")
+        numbers = pd.to_numeric(event_ids, errors="coerce")
+        return numbers.where(numbers.notna() & (numbers % 1 == 0)).astype("Int64")
+
+    def left_join(self, event_ids: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        LEFT JOIN of the GlobalEventID of mentions (one per joined row so far) with the kept events.
+
+        Returns:
+            (left positions, row offsets in rows, -1 when there is no match) of each joined row
+        """
+
+        keys = self._event_keys(event_ids)
+        left, right, counts = self._left_join_keys(keys)
+
+        # Matches by the window, from the earlier timestamps and by the export file of the last timestamp alone
+        self.last_stats = {f"mentions_{name}": value for name, value in counts.items()}
+        self.last_stats["export_rows_indexed"] = int(len(self._row_timestamps))
+        if self._timestamps:
+            latest_events = list(self._timestamps.values())[-1][2]
+            self.last_stats["mentions_rows_matched_exact"] = int(keys.isin(latest_events).fillna(False).sum())
+        return left, right
+
+
+"""
+TWENTY-SECOND CLASS: GDELTAggregation
+This one computes a group-by rollup of the joined rows of each timestamp (counts, sums, mean and variance per group)
+in a form that can be merged, so GDELTTimestampBatchRunner gives the rollup of the whole range without keeping the joined rows
+"""
+
+class GDELTAggregation:
+
+    """
+    Group-by rollup of the joined df, computed per timestamp (partial) and merged over the range (merge).
+
+    - group_by: columns of the joined df ("Time Stamp" gives one group per timestamp), or the exploded ones:
+        "theme": one group per theme of gkg_V2ENHANCEDTHEMES_list_str (or of the compact gkg_V2ENHANCEDTHEMES_list)
+        "location_country": one group per CountryCode of gkg_V2ENHANCEDLOCATIONS
+      (a row is counted once in each of its themes/countries, a row without any is in no group)
+    - measures: numeric columns of the joined df. Per group and measure: count (values not missing), sum,
+      mean, var (sample variance), std, min and max
+    - distinct_on: optional columns of the unit that is counted, e.g. ["gkg_GKGRECORDID"] counts each document once
+      per group instead of once per joined mention/event (the measures should then be columns of that unit,
+      the first row of each unit is used). The units are made distinct within each timestamp
+    - the state of a group is (rows, and per measure: count, sum, mean, m2, min, max), where m2 is the sum of the
+      squared deviations from the mean, so two states are merged exactly (Chan et al.) in any order
+    """
+
+    EXPLODED_COLUMNS = ("theme", "location_country")
+
+    def __init__(self, group_by: Union[str, List[str]], measures: Optional[List[str]] = None, distinct_on: Optional[List[str]] = None):
+
+        """
+        Args:
+            group_by: Column(s) of the groups (see above)
+            measures: Numeric columns summarized per group (None: only the rows are counted)
+            distinct_on: Columns of the unit counted (None: every joined row)
+        """
+
+        self.group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        if not self.group_by:
+            raise ValueError("group_by needs at least one column")
+        self.measures = list(measures or [])
+        self.distinct_on = list(distinct_on or [])
+        overlap = set(self.measures) & set(self.group_by)
+        if overlap:
+            raise ValueError(f"Columns both in group_by and measures: {', '.join(sorted(overlap))}")
+
+    def __repr__(self) -> str:
+        # Also the text of the aggregation in the checkpoint signature, so it must not depend on the object
+        return f"GDELTAggregation(group_by={self.group_by!r}, measures={self.measures!r}, distinct_on={self.distinct_on!r})"
+
+    # ---------------------------------------------------------------------------
+    # Rows of the groups
+    # ---------------------------------------------------------------------------
+
+    @staticmethod
+    def _exploded(joined_df: pd.DataFrame, name: str) -> pd.DataFrame:
+
+        """Long table of an exploded group column: 'Row' (position in joined_df) and name, one row per distinct value of a row"""
+
+        if name == "theme":
+            if "gkg_V2ENHANCEDTHEMES_list_str" in joined_df.columns:
+                cells = pd.Series(joined_df["gkg_V2ENHANCEDTHEMES_list_str"].to_numpy(), index=np.arange(len(joined_df)))
+                values = cells[cells.notna()].astype(str).str.split(',').explode().str.strip()
+                rows = values.index.to_numpy()
+                values = values.to_numpy(dtype=object)
+            elif "gkg_V2ENHANCEDTHEMES_list" in joined_df.columns:
+                import pyarrow as pa
+                import pyarrow.compute as pc
+
+                arrow = pa.array(joined_df["gkg_V2ENHANCEDTHEMES_list"].array)
+                chunks = arrow.chunks if isinstance(arrow, pa.ChunkedArray) else [arrow]
+                rows_list, values_list, start = [], [], 0
+                for chunk in chunks:
+                    flat = pc.list_flatten(chunk)
+                    if isinstance(flat.type, pa.DictionaryType):
+                        flat = flat.dictionary_decode()
+                    values_list.append(flat.to_numpy(zero_copy_only=False))
+                    rows_list.append(start + pc.list_parent_indices(chunk).to_numpy())
+                    start += len(chunk)
+                rows = np.concatenate(rows_list) if rows_list else np.array([], dtype=np.int64)
+                values = np.concatenate(values_list) if values_list else np.array([], dtype=object)
+            else:
+                raise ValueError("group_by 'theme' needs gkg_V2ENHANCEDTHEMES_list_str or gkg_V2ENHANCEDTHEMES_list in the joined df")
+        elif name == "location_country":
+            if "gkg_V2ENHANCEDLOCATIONS" not in joined_df.columns:
+                raise ValueError("group_by 'location_country' needs gkg_V2ENHANCEDLOCATIONS in the joined df")
+            table = LocationParser.country_code_table(joined_df["gkg_V2ENHANCEDLOCATIONS"])
+            rows, values = table["Row"].to_numpy(), table["CountryCode"].to_numpy(dtype=object)
+        else:
+            raise ValueError(f"Unknown exploded column: {name}. Must be one of: {', '.join(GDELTAggregation.EXPLODED_COLUMNS)}")
+
+        long = pd.DataFrame({"Row": rows, name: values})
+        long = long[long[name].notna() & (long[name] != "")]
+        return long.drop_duplicates(ignore_index=True)
+
+    def _group_rows(self, joined_df: pd.DataFrame) -> pd.DataFrame:
+
+        """The group_by, distinct_on and measure columns of the joined rows, one row per joined row and group"""
+
+        columns = [col for col in dict.fromkeys(self.group_by + self.distinct_on + self.measures) if col not in self.EXPLODED_COLUMNS]
+        missing = [col for col in columns if col not in joined_df.columns]
+        if missing:
+            raise ValueError(f"Columns of the aggregation not in the joined df: {', '.join(missing)}")
+
+        frame = joined_df[columns].reset_index(drop=True)
+        for name in self.group_by:
+            if name in self.EXPLODED_COLUMNS:
+                long = self._exploded(joined_df, name)
+                frame = frame.assign(_row=np.arange(len(joined_df))) if "_row" not in frame.columns else frame
+                frame = frame.merge(long, left_on="_row", right_on="Row", how="inner").drop(columns="Row")
+        frame = frame.drop(columns="_row", errors="ignore")
+
+        # Each unit once per group (the first of its rows)
+        if self.distinct_on:
+            frame = frame.drop_duplicates(subset=list(dict.fromkeys(self.group_by + self.distinct_on)), ignore_index=True)
+        return frame
+
+    # ---------------------------------------------------------------------------
+    # States
+    # ---------------------------------------------------------------------------
+
+    @staticmethod
+    def _group_codes(frame: pd.DataFrame, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+
+        """Group of each row (0 to groups - 1, missing values are a group of their own) and the first row of each group"""
+
+        if frame.empty:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        per_column = []
+        for col in columns:
+            codes, _ = pd.factorize(frame[col])
+            per_column.append(np.where(codes < 0, codes.max() + 1, codes))
+        _, first, inverse = np.unique(np.column_stack(per_column), axis=0, return_index=True, return_inverse=True)
+        return inverse.reshape(-1), first
+
+    def _reduce(self, parts: pd.DataFrame) -> pd.DataFrame:
+
+        """One state per group of the states in parts (a joined row is a state of one row)"""
+
+        codes, first = self._group_codes(parts, self.group_by)
+        n_groups = len(first)
+        state = parts[self.group_by].iloc[first].reset_index(drop=True)
+        state["rows"] = np.bincount(codes, weights=parts["rows"].to_numpy(dtype=np.float64), minlength=n_groups).astype(np.int64)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for measure in self.measures:
+                part_count = parts[f"{measure}__count"].to_numpy(dtype=np.float64)
+                part_mean = parts[f"{measure}__mean"].to_numpy(dtype=np.float64)
+                count = np.bincount(codes, weights=part_count, minlength=n_groups)
+                total = np.bincount(codes, weights=parts[f"{measure}__sum"].to_numpy(dtype=np.float64), minlength=n_groups)
+                mean = np.where(count > 0, total / count, np.nan)
+                # m2 = sum of the m2 of the parts + count of each part * (mean of the part - mean of the group)^2
+                deviation = np.where(part_count > 0, part_count * (part_mean - mean[codes]) ** 2, 0.0)
+                m2 = np.bincount(codes, weights=np.nan_to_num(parts[f"{measure}__m2"].to_numpy(dtype=np.float64)) + deviation, minlength=n_groups)
+                minimum = np.full(n_groups, np.nan)
+                maximum = np.full(n_groups, np.nan)
+                np.fmin.at(minimum, codes, parts[f"{measure}__min"].to_numpy(dtype=np.float64))
+                np.fmax.at(maximum, codes, parts[f"{measure}__max"].to_numpy(dtype=np.float64))
+                state[f"{measure}__count"] = count.astype(np.int64)
+                state[f"{measure}__sum"] = total
+                state[f"{measure}__mean"] = mean
+                state[f"{measure}__m2"] = np.where(count > 0, m2, np.nan)
+                state[f"{measure}__min"] = minimum
+                state[f"{measure}__max"] = maximum
+        return state
+
+    def partial(self, joined_df: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        State of the groups of the joined df of one timestamp.
+
+        Returns:
+            DataFrame with the group_by columns, "rows" and per measure <measure>__count, __sum, __mean, __m2, __min, __max
+        """
+
+        frame = self._group_rows(joined_df)
+        parts = frame[self.group_by].copy()
+        parts["rows"] = 1
+        for measure in self.measures:
+            values = pd.to_numeric(frame[measure], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+            parts[f"{measure}__count"] = present.astype(np.int64)
+            parts[f"{measure}__sum"] = np.where(present, values, 0.0)
+            parts[f"{measure}__mean"] = values
+            parts[f"{measure}__m2"] = np.where(present, 0.0, np.nan)
+            parts[f"{measure}__min"] = values
+            parts[f"{measure}__max"] = values
+        return self._reduce(parts)
+
+    def merge(self, states: List[pd.DataFrame]) -> pd.DataFrame:
+
+        """Merge the states of several timestamps (or runs) into one state (same as the partial of all their rows)"""
+
+        states = [state for state in states if state is not None]
+        if not states:
+            raise ValueError("merge needs at least one state")
+        if len(states) == 1:
+            return states[0]
+        return self._reduce(pd.concat(states, ignore_index=True))
+
+    def result(self, state: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        The rollup of a state, sorted by the groups.
+
+        Returns:
+            DataFrame with the group_by columns, "rows" (joined rows, or units with distinct_on) and per measure
+            <measure>_count, _sum, _mean, _var, _std, _min, _max (var and std need at least two values)
+        """
+
+        out = state[self.group_by + ["rows"]].copy()
+        for measure in self.measures:
+            count = state[f"{measure}__count"].to_numpy(dtype=np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                var = np.where(count > 1, state[f"{measure}__m2"].to_numpy(dtype=np.float64) / (count - 1), np.nan)
+            out[f"{measure}_count"] = state[f"{measure}__count"].to_numpy()
+            out[f"{measure}_sum"] = state[f"{measure}__sum"].to_numpy()
+            out[f"{measure}_mean"] = state[f"{measure}__mean"].to_numpy()
+            out[f"{measure}_var"] = var
+            out[f"{measure}_std"] = np.sqrt(var)
+            out[f"{measure}_min"] = state[f"{measure}__min"].to_numpy()
+            out[f"{measure}_max"] = state[f"{measure}__max"].to_numpy()
+        return out.sort_values(self.group_by, ignore_index=True)
+
+
+"""
+TWENTY-THIRD CLASS: GDELTThemeTimeSeries
+This one keeps dense theme x 15-minute matrices of the gkg documents (documents per theme and their tone),
+filled by GDELTTimestampBatchRunner while it processes, so the theme time series are read with one slice per prefix
+"""
+
+class GDELTThemeTimeSeries:
+
+    """
+    Documents per theme and 15-minute bucket, and the sum of their tone (gkg_ACTUAL_TONE), as dense NumPy matrices.
+
+    - one row per theme (the ids of its own GDELTThemeIndex, which never change) and one column per 15 minutes
+      from the first timestamp; the matrices grow (doubling) when a new theme or timestamp comes
+    - slice_counts() gives the documents and tone of each theme of the gkg rows of one timestamp
+      (GDELTProcessor, also in the worker processes) and add() writes them in the column of the timestamp
+      (adding a timestamp again replaces its column, so a resumed timestamp is not counted twice)
+    - a document is counted once per theme; the gkg rows are the ones kept by the filters of the processor
+    - query() reads the themes that begin with some prefixes (a binary search on the sorted vocabulary,
+      GDELTThemeIndex.prefix_ids) over a range of timestamps (a slice of the columns)
+    - prefixes: only the themes that begin with one of them are kept (None keeps all of them)
+    - with a path (folder), save() writes documents.npy, tone_sum.npy, tone_count.npy, filled.npy, series.json and
+      the vocabulary (themes.json), and they are read again when the series is created, so it grows across runs
+    """
+
+    VALUES = ("documents", "tone_sum", "tone_mean")
+
+    # The documents of one timestamp: each gkg record once per theme
+    SLICE_AGGREGATION = GDELTAggregation(["theme"], measures=["gkg_ACTUAL_TONE"], distinct_on=["gkg_GKGRECORDID"])
+
+    def __init__(self, path: Optional[str] = None, prefixes: Optional[List[str]] = None):
+
+        """
+        Args:
+            path: Optional folder where the matrices are kept (read if they exist, written by save())
+            prefixes: Only keep the themes that begin with one of these (e.g. ["EPU", "TAX"]). None keeps all of them
+        """
+
+        self.path = Path(path) if path else None
+        self.prefixes = [str(prefix).strip() for prefix in prefixes] if prefixes else None
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.theme_index = GDELTThemeIndex(str(self.path / "themes.json") if self.path is not None else None)
+        # First timestamp (column 0) and number of columns used
+        self._start: Optional[datetime] = None
+        self._n_buckets = 0
+        self._documents = np.zeros((0, 0), dtype=np.int32)
+        self._tone_count = np.zeros((0, 0), dtype=np.int32)
+        self._tone_sum = np.zeros((0, 0), dtype=np.float64)
+        # Columns of the timestamps added (the others are not known, not zero)
+        self._filled = np.zeros(0, dtype=bool)
+        self._changed = False
+
+        if self.path is not None and (self.path / "series.json").exists():
+            self._load()
+
+    def __repr__(self) -> str:
+        # Also the text of the series in the checkpoint signature (the counts of a timestamp only depend on the prefixes)
+        return f"GDELTThemeTimeSeries(prefixes={self.prefixes!r})"
+
+    @property
+    def timestamps(self) -> List[str]:
+
+        """Timestamps added, in order"""
+
+        return [format_ts(self._start + TIMESTAMP_STEP * int(b)) for b in np.flatnonzero(self._filled[:self._n_buckets])]
+
+    # ---------------------------------------------------------------------------
+    # Filling
+    # ---------------------------------------------------------------------------
+
+    def slice_counts(self, gkg_df: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        Documents and tone of each theme of the gkg rows of one timestamp (only the themes of prefixes).
+
+        Returns:
+            DataFrame with "theme", "rows" (documents) and gkg_ACTUAL_TONE__count, __sum (see GDELTAggregation.partial)
+        """
+
+        counts = self.SLICE_AGGREGATION.partial(gkg_df)
+        if self.prefixes is not None:
+            counts = counts[counts["theme"].astype(str).str.startswith(tuple(self.prefixes))]
+        return counts[["theme", "rows", "gkg_ACTUAL_TONE__count", "gkg_ACTUAL_TONE__sum"]].reset_index(drop=True)
+
+    def _bucket(self, timestamp: str) -> int:
+
+        """Column of a timestamp (the matrices are grown, or shifted for a timestamp before the first one)"""
+
+        dt = parse_ts(timestamp)
+        if self._start is None:
+            self._start = dt
+        offset = int((dt - self._start) // TIMESTAMP_STEP)
+        if offset < 0:
+            # Earlier than the first column: the columns are moved right
+            self._reserve(self._documents.shape[0], self._n_buckets - offset, shift=-offset)
+            self._start, self._n_buckets, offset = dt, self._n_buckets - offset, 0
+        self._reserve(self._documents.shape[0], offset + 1)
+        self._n_buckets = max(self._n_buckets, offset + 1)
+        return offset
+
+    def _reserve(self, n_themes: int, n_buckets: int, shift: int = 0) -> None:
+
+        """Make room for n_themes rows and n_buckets columns (doubling), the columns moved shift to the right"""
+
+        rows, cols = self._documents.shape
+        if n_themes <= rows and n_buckets <= cols and shift == 0:
+            return
+        new_rows = max(rows, n_themes) if n_themes <= rows else max(n_themes, 2 * rows, 64)
+        new_cols = max(cols, n_buckets) if n_buckets <= cols else max(n_buckets, 2 * cols, 96)
+
+        # Columns with data in the current matrices
+        used = min(self._n_buckets, cols, new_cols - shift)
+
+        def grown(matrix: np.ndarray) -> np.ndarray:
+            out = np.zeros((new_rows, new_cols), dtype=matrix.dtype)
+            out[:rows, shift:shift + used] = matrix[:, :used]
+            return out
+
+        self._documents = grown(self._documents)
+        self._tone_count = grown(self._tone_count)
+        self._tone_sum = grown(self._tone_sum)
+        filled = np.zeros(new_cols, dtype=bool)
+        filled[shift:shift + used] = self._filled[:used]
+        self._filled = filled
+
+    def add(self, timestamp: str, counts: pd.DataFrame) -> None:
+
+        """Write the counts of a timestamp (slice_counts) in its column, replacing what was there"""
+
+        validate_ts_rules(timestamp)
+        if self.prefixes is not None:
+            counts = counts[counts["theme"].astype(str).str.startswith(tuple(self.prefixes))]
+        ids = self.theme_index.encode(counts["theme"].astype(str).to_numpy(dtype=object))
+        column = self._bucket(timestamp)
+        self._reserve(len(self.theme_index), self._n_buckets)
+
+        for matrix in (self._documents, self._tone_count, self._tone_sum):
+            matrix[:, column] = 0
+        self._documents[ids, column] = counts["rows"].to_numpy(dtype=np.int32)
+        self._tone_count[ids, column] = counts["gkg_ACTUAL_TONE__count"].to_numpy(dtype=np.int32)
+        self._tone_sum[ids, column] = counts["gkg_ACTUAL_TONE__sum"].to_numpy(dtype=np.float64)
+        self._filled[column] = True
+        self._changed = True
+
+    # ---------------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------------
+
+    def query(
+        self,
+        prefixes: Union[str, List[str]],
+        timestamp_start: Optional[str] = None,
+        timestamp_end: Optional[str] = None,
+        value: str = "documents",
+        by_theme: bool = True
+    ) -> pd.DataFrame:
+
+        """
+        Time series of the themes that begin with the prefixes.
+
+        Inputs:
+            prefixes: Prefix or prefixes of the themes ("" for all)
+            timestamp_start, timestamp_end: Range of timestamps (both included, None: from the first / to the last one)
+            value: "documents" (documents per theme), "tone_sum" (sum of their tone) or "tone_mean" (mean tone)
+            by_theme: True gives one column per theme, False one column with all of them together
+                      (then "documents" counts a document once per matching theme it has, not once)
+
+        Returns:
+            DataFrame with one row per timestamp of the range (index "Time Stamp"); the timestamps never added are NaN
+        """
+
+        if value not in self.VALUES:
+            raise ValueError(f"Unknown value: {value}. Must be one of: {', '.join(self.VALUES)}")
+        prefixes = [prefixes] if isinstance(prefixes, str) else list(prefixes)
+        ids = self.theme_index.prefix_ids(prefixes)
+        ids = ids[ids < self._documents.shape[0]].astype(np.int64)
+
+        first = 0 if timestamp_start is None or self._start is None else int((parse_ts(timestamp_start) - self._start) // TIMESTAMP_STEP)
+        last = self._n_buckets - 1 if timestamp_end is None or self._start is None else int((parse_ts(timestamp_end) - self._start) // TIMESTAMP_STEP)
+        buckets = np.arange(first, last + 1)
+        inside = (buckets >= 0) & (buckets < self._n_buckets)
+        timestamps = [format_ts(self._start + TIMESTAMP_STEP * int(b)) for b in buckets] if self._start is not None else []
+
+        # Columns of the range inside the matrices (a contiguous slice), NaN outside and for the timestamps never added
+        lo, hi = max(first, 0), min(last + 1, self._n_buckets)
+        block = {}
+        for name, matrix in (("documents", self._documents), ("tone_count", self._tone_count), ("tone_sum", self._tone_sum)):
+            values = np.full((len(ids), len(buckets)), np.nan)
+            if hi > lo:
+                values[:, inside] = matrix[ids, lo:hi]
+            block[name] = values if by_theme else values.sum(axis=0, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = block["tone_sum"] / block["tone_count"] if value == "tone_mean" else block[value]
+        known = np.zeros(len(buckets), dtype=bool)
+        known[inside] = self._filled[buckets[inside]]
+        out[:, ~known] = np.nan
+
+        columns = [self.theme_index.themes[i] for i in ids] if by_theme else ["+".join(prefixes) or "all"]
+        frame = pd.DataFrame(out.T, index=pd.Index(timestamps, name="Time Stamp"), columns=columns)
+        return frame
+
+    def metadata(self) -> Dict[str, Any]:
+
+        """Size of the series"""
+
+        timestamps = self.timestamps
+        return {
+            "path": str(self.path) if self.path is not None else None,
+            "themes": len(self.theme_index),
+            "timestamps": len(timestamps),
+            "first_timestamp": timestamps[0] if timestamps else None,
+            "last_timestamp": timestamps[-1] if timestamps else None,
+        }
+
+    # ---------------------------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------------------------
+
+    def save(self) -> None:
+
+        """Write the used part of the matrices to path (each file atomically), if it has a path and something was added"""
+
+        if self.path is None or not self._changed:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        n_themes = len(self.theme_index)
+        arrays = {
+            "documents": self._documents[:n_themes, :self._n_buckets],
+            "tone_count": self._tone_count[:n_themes, :self._n_buckets],
+            "tone_sum": self._tone_sum[:n_themes, :self._n_buckets],
+            "filled": self._filled[:self._n_buckets],
+        }
+        self.theme_index.save()
+        for name, array in arrays.items():
+            tmp_path = self.path / f"{name}.npy.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, self.path / f"{name}.npy")
+        # series.json is written last, with the shape of the matrices, so _load can tell if a save was interrupted
+        tmp_path = self.path / "series.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "start": format_ts(self._start) if self._start is not None else None,
+                "prefixes": self.prefixes,
+                "themes": n_themes,
+                "timestamps": self._n_buckets,
+            }, f)
+        os.replace(tmp_path, self.path / "series.json")
+        self._changed = False
+
+    def _load(self) -> None:
+
+        """Read the matrices written by save() (a series whose files do not match each other or themes.json starts empty)"""
+
+        try:
+            with open(self.path / "series.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = {name: np.load(self.path / f"{name}.npy") for name in ("documents", "tone_count", "tone_sum", "filled")}
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Could not read theme series {self.path}, starting empty: {e}")
+            return
+
+        # The matrices, series.json and themes.json are written one after the other: a missing or older file
+        # (e.g. themes.json unreadable, or a save that was interrupted) gives shapes that do not match
+        rows, columns = arrays["documents"].shape if arrays["documents"].ndim == 2 else (-1, -1)
+        shapes = {name: arrays[name].shape for name in ("documents", "tone_count", "tone_sum")}
+        expected = (meta.get("themes", rows), meta.get("timestamps", columns))
+        if (
+            any(shape != (rows, columns) for shape in shapes.values())
+            or arrays["filled"].shape != (columns,)
+            or (rows, columns) != expected
+            or rows > len(self.theme_index)
+        ):
+            self.logger.warning(
+                f"Theme series {self.path} does not match its themes ({len(self.theme_index)} themes in themes.json, "
+                f"matrices {shapes}, series.json {expected}), starting empty"
+            )
+            return
+
+        if meta.get("prefixes") != self.prefixes:
+            self.logger.warning(f"Theme series {self.path} was written with prefixes {meta.get('prefixes')}, not {self.prefixes}")
+        self._start = parse_ts(meta["start"]) if meta.get("start") else None
+        self._n_buckets = len(arrays["filled"])
+        self._reserve(len(self.theme_index), self._n_buckets)
+        self._documents[:rows, :self._n_buckets] = arrays["documents"]
+        self._tone_count[:rows, :self._n_buckets] = arrays["tone_count"]
+        self._tone_sum[:rows, :self._n_buckets] = arrays["tone_sum"]
+        self._filled[:self._n_buckets] = arrays["filled"]
@@ -0,0 +1,253 @@
+"""
+COMMAND LINE FOR THE GDELT PROCESSING
+==========================================
+Same processing as GDELT_Process.py, with the inputs given on the command line instead of edited in the script.
+Only the standard library is imported up front: --help, the validation of the inputs and --dry-run
+(the timestamps and the files that would be processed) do not load pandas or the processing classes.
+
+Run it as:
+    python GDELT_CLI.py --start 20251201143000 --end 20251202143000 --joincase gkg_export --format parquet
+    python GDELT_CLI.py --start 20251201143000 --end 20251202143000 --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+from DataProcessingClasses.GDELT_Timestamps import (
+    JOINCASE_FILES,
+    configure_logging,
+    expand_timestamps,
+    file_urls,
+)
+
+# ================== Resolve paths relative to this script ======================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DICT_PATH = os.path.join(BASE_DIR, "Dictionary", "Dictionaries.xlsx")
+OUTPUT_DIR = os.path.join(BASE_DIR, "Output")
+RAW_CACHE_DIR = os.path.join(BASE_DIR, "RawCache")
+CATEGORY_LIST_PATH = os.path.join(BASE_DIR, "GraphCategoryList", "GDELT-Global_Knowledge_Graph_CategoryList.xlsx")
+
+# ================== Default inputs (as in GDELT_Process.py) ====================
+
+DEFAULT_COUNTRY_CODES = [
+    'FR', 'GM', 'LU', 'LH', 'PL', 'RE', 'AU', 'BE', 'SP', 'DA', 'SZ', 'NL', 'FI',
+    'IT', 'HU', 'BU', 'SW', 'LG', 'EZ', 'MT', 'EN', 'IC', 'GL', 'LS', 'LO', 'SI',
+    'CY', 'NO', 'PO', 'HR', 'VT', 'MN', 'GK'
+]
+DEFAULT_THEMES_TAGS = ["EPU", "TAX"]
+DEFAULT_GKG_COLUMNS_TO_DROP = [
+    "V2SOURCECOLLECTIONIDENTIFIER", "V2GCAM", "V2.1SHARINGIMAGE",
+    "V2.1RELATEDIMAGES", "V2.1SOCIALIMAGEEMBEDS", "V2.1SOCIALVIDEOEMBEDS",
+    "V2.1QUOTATIONS", "V2.1ALLNAMES", "V2.1AMOUNTS", "V2.1ENHANCEDDATES",
+    "V2.1TRANSLATIONINFO", "V2EXTRASXML", "V1COUNTS", "V2.1COUNTS",
+    "V1PERSONS", "V2ENHANCEDPERSONS", "V1ORGANIZATIONS", "V2ENHANCEDORGANIZATIONS"
+]
+DEFAULT_MENTIONS_COLUMNS_TO_MAP = ["MentionDocTone"]
+DEFAULT_EXPORT_COLUMNS_TO_MAP = [
+    "Actor1Code", "Actor1Name", "Actor1Geo_Type", "Actor1Geo_Fullname", "Actor1Geo_CountryCode",
+    "Actor2Geo_CountryCode", "ActionGeo_CountryCode", "NumMentions", "GoldsteinScale", "AvgTone"
+]
+
+# Key columns of each joincase (key_column_dictionary_document of GDELTFileSet)
+DEFAULT_KEY_COLUMNS = {
+    "gkg_only": {},
+    "gkg_mentions": {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "mentions": "MentionIdentifier"},
+    "gkg_export": {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "export": "SOURCEURL"},
+    "all": {"gkg": "gkg_V2DOCUMENTIDENTIFIER", "mentions": ["MentionIdentifier", "GlobalEventID"], "export": "GlobalEventID"},
+}
+
+# Columns of the mapping quality statistics (statistics="all")
+DEFAULT_CHECKMAPPING_COLS = ["gkg_ACTUAL_TONE", "Export_AvgTone"]
+
+STATISTICS = ["all", "key_columns_stats", "none"]
+FORMATS = ["csv", "xlsx", "parquet", "pkl"]
+SINKS = ["parquet_dataset", "parquet_file", "csv"]
+
+
+def _code_list(value: str) -> List[str]:
+    """Comma separated list of the command line ("" = empty list, no filter)"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+
+    """Arguments of the command line"""
+
+    parser = argparse.ArgumentParser(
+        description="Download, filter and join the GDELT gkg / mentions / export files of a range of timestamps"
+    )
+
+    run = parser.add_argument_group("timestamps and join")
+    run.add_argument("--start", required=True, help="First timestamp, YYYYMMDDHHMMSS (minutes 00/15/30/45, seconds 00)")
+    run.add_argument("--end", default=None, help="Last timestamp (default: only --start)")
+    run.add_argument("--joincase", choices=list(JOINCASE_FILES), default="gkg_export", help="Files joined to gkg (default: gkg_export)")
+    run.add_argument("--statistics", choices=STATISTICS, default="key_columns_stats", help="Statistics computed (default: key_columns_stats)")
+    run.add_argument("--dry-run", action="store_true", help="Only list the timestamps and the files they need (nothing is downloaded)")
+
+    filters = parser.add_argument_group("filters")
+    filters.add_argument(
+        "--country-codes", type=_code_list, default=DEFAULT_COUNTRY_CODES,
+        help="Comma separated country codes of V2ENHANCEDLOCATIONS / Actor1Geo_CountryCode (\"\" for no filter)"
+    )
+    filters.add_argument(
+        "--themes-tags", type=_code_list, default=DEFAULT_THEMES_TAGS,
+        help="Comma separated beginnings of the V2ENHANCEDTHEMES themes to keep (\"\" for no filter)"
+    )
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output-dir", default=OUTPUT_DIR, help="Folder of the results (default: Output)")
+    output.add_argument("--format", choices=FORMATS, default="parquet", help="Format of the joined file and the statistics (default: parquet)")
+    output.add_argument("--sink", choices=SINKS, default=None, help="Write each joined timestamp as soon as it is processed (to <output-dir>/JoinedStream)")
+    output.add_argument("--theme-output", choices=["strings", "compact"], default="strings", help="Theme columns as text or as compact Arrow lists")
+
+    execution = parser.add_argument_group("execution")
+    execution.add_argument("--dictionary", default=DICT_PATH, help="Path of Dictionaries.xlsx")
+    execution.add_argument("--raw-cache", default=RAW_CACHE_DIR, help="Folder of the cache of downloaded zips (\"\" for no cache)")
+    execution.add_argument("--offline", action="store_true", help="Only read the raw cache, download nothing")
+    execution.add_argument("--on-error", choices=["raise", "skip"], default="raise", help="What to do when a timestamp fails")
+    execution.add_argument("--download-workers", type=int, default=4, help="Concurrent downloads (1 = download each timestamp right before it is processed)")
+    execution.add_argument("--process-workers", type=int, default=1, help="Worker processes (1 = process here)")
+    execution.add_argument("--checkpoint", action="store_true", help="Record each finished timestamp in <output-dir>/Checkpoint, so a stopped run can be resumed")
+    execution.add_argument("--resume", action="store_true", help="Skip the timestamps finished by an earlier run with the same inputs (implies --checkpoint)")
+    return parser
+
+
+def validate(args: argparse.Namespace, parser: argparse.ArgumentParser) -> List[str]:
+
+    """Check the inputs that argparse does not check; returns the timestamps to process"""
+
+    try:
+        timestamps = expand_timestamps(args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.download_workers < 1 or args.process_workers < 1:
+        parser.error("--download-workers and --process-workers must be >= 1")
+    if not args.dry_run and not os.path.exists(args.dictionary):
+        parser.error(f"Dictionary not found: {args.dictionary}")
+    if args.offline and not args.raw_cache:
+        parser.error("--offline needs a --raw-cache")
+    return timestamps
+
+
+def dry_run(args: argparse.Namespace, timestamps: List[str]) -> None:
+
+    """Print the timestamps and the files that they need (the ones already in the raw cache are marked)"""
+
+    # File names in the index of the raw cache (GDELTRawFileCache)
+    cached_files = set()
+    index_path = os.path.join(args.raw_cache, "index.json") if args.raw_cache else None
+    if index_path and os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            cached_files = set(json.load(f))
+
+    print(f"Timestamps: {len(timestamps)} ({timestamps[0]} - {timestamps[-1]})")
+    print(f"Joincase: {args.joincase} --> files: {', '.join(JOINCASE_FILES[args.joincase])}")
+    n_files = n_cached = 0
+    for ts in timestamps:
+        for url in file_urls(ts, args.joincase).values():
+            cached = url.rsplit("/", 1)[-1] in cached_files
+            n_files += 1
+            n_cached += cached
+            print(f"  {ts}  {url}{'  (cached)' if cached else ''}")
+    print(f"Files: {n_files} ({n_cached} in the raw cache)")
+
+
+def run(args: argparse.Namespace, timestamps: List[str]) -> Dict:
+
+    """Process the timestamps (the processing classes, and so pandas, are only imported here)"""
+
+    from DataProcessingClasses.OOP_DirectGDELT_Processing import (
+        GDELTCSVAppendSink,
+        GDELTFileSet,
+        GDELTMappingQuality,
+        GDELTParquetDatasetSink,
+        GDELTParquetFileSink,
+        GDELTProcessor,
+        GDELTRawFileCache,
+        GDELTThemeIndex,
+        GDELTTimestampBatchRunner,
+    )
+
+    raw_cache = GDELTRawFileCache(cache_dir=args.raw_cache, offline=args.offline) if args.raw_cache else None
+    processor = GDELTProcessor(
+        dictionary_path=args.dictionary,
+        output_dir=args.output_dir,
+        country_codes=args.country_codes or None,
+        themes_tags=args.themes_tags or None,
+        gkg_columns_to_drop=DEFAULT_GKG_COLUMNS_TO_DROP,
+        mentions_columns_to_map=DEFAULT_MENTIONS_COLUMNS_TO_MAP,
+        export_columns_to_map=DEFAULT_EXPORT_COLUMNS_TO_MAP,
+        raw_cache=raw_cache,
+        theme_index=GDELTThemeIndex(os.path.join(args.output_dir, "ThemeIndex.json"), category_list_path=CATEGORY_LIST_PATH),
+        theme_output=args.theme_output
+    )
+
+    base_fileset = GDELTFileSet(
+        timestamp=timestamps[0],
+        joincase=args.joincase,
+        statistics=args.statistics,
+        key_column_dictionary_document=DEFAULT_KEY_COLUMNS[args.joincase]
+    )
+    mapping_columns = GDELTMappingQuality(
+        checkmapping_cols=DEFAULT_CHECKMAPPING_COLS,
+        identifier_col="gkg_V2DOCUMENTIDENTIFIER"
+    )
+
+    sink_dir = os.path.join(args.output_dir, "JoinedStream")
+    sinks = {
+        "parquet_dataset": lambda: GDELTParquetDatasetSink(sink_dir),
+        "parquet_file": lambda: GDELTParquetFileSink(os.path.join(sink_dir, "joined.parquet")),
+        "csv": lambda: GDELTCSVAppendSink(os.path.join(sink_dir, "joined.csv")),
+    }
+
+    runner = GDELTTimestampBatchRunner(processor)
+    batch_result = runner.run(
+        base_fileset=base_fileset,
+        mapping_columns=mapping_columns if args.statistics == "all" else None,
+        timestamp_start=timestamps[0],
+        timestamp_end=timestamps[-1],
+        on_error=args.on_error,
+        return_mode="always_dict",
+        flatten_df_key_columns_stats=True,
+        download_workers=args.download_workers,
+        process_workers=args.process_workers,
+        sink=sinks[args.sink]() if args.sink else None,
+        checkpoint=args.checkpoint,
+        resume=args.resume
+    )
+
+    # Save the joined df and the key column statistics (as GDELT_Process.py does)
+    timestamp_range = f"{timestamps[0]}-{timestamps[-1]}"
+    if batch_result["joined_df"] is not None:
+        processor.save_results(batch_result["joined_df"], timestamp_range, format=args.format)
+    flat_stats = (batch_result.get("stats") or {}).get("df_key_columns_stats_flat")
+    if flat_stats:
+        processor.save_key_columns_analysis(flat_stats, timestamp_range, format=args.format)
+    return batch_result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    timestamps = validate(args, parser)
+
+    if args.dry_run:
+        dry_run(args, timestamps)
+        return 0
+
+    configure_logging()
+    batch_result = run(args, timestamps)
+
+    print(f"Timestamps processed: {len(batch_result['timestamps_processed'])} of {len(batch_result['timestamps_requested'])}")
+    for ts, error_msg in batch_result["timestamps_failed"].items():
+        print(f"  failed {ts}: {error_msg}")
+    return 1 if batch_result["timestamps_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
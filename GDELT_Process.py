@@ -16,8 +16,18 @@ from DataProcessingClasses.OOP_DirectGDELT_Processing import (
     MappingAnalyzer,
     GDELTDataLoader,
     GDELTProcessor,
-    GDELTTimestampBatchRunner
+    GDELTTimestampBatchRunner,
+    GDELTRawFileCache,
+    GDELTSQLiteJoinStore,
+    GDELTParquetDatasetSink,
+    GDELTParquetFileSink,
+    GDELTCSVAppendSink,
+    GDELTThemeIndex,
+    GDELTEventWindow,
+    GDELTAggregation,
+    GDELTThemeTimeSeries
 )
+from DataProcessingClasses.GDELT_Timestamps import configure_logging
 
 import os
  
@@ -36,15 +46,54 @@ OUTPUT_DIR = os.path.abspath(OUTPUT_DIR)
  
 # Ensure output directory exists
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Path to the cache of downloaded zip files: BASE, folder
+RAW_CACHE_DIR = os.path.join(BASE_DIR, "RawCache") # <--- EDIT IF NEEDED
+RAW_CACHE_DIR = os.path.abspath(RAW_CACHE_DIR)
+
+# Path to the theme index (vocabulary of the gkg themes, kept between runs) and to the GKG category list: BASE, folder, file
+THEME_INDEX_PATH = os.path.join(OUTPUT_DIR, "ThemeIndex.json") # <--- EDIT IF NEEDED
+
+# Path to the theme time series (documents and tone per theme every 15 minutes, kept between runs): BASE, folder
+THEME_SERIES_DIR = os.path.join(OUTPUT_DIR, "ThemeSeries") # <--- EDIT IF NEEDED
+CATEGORY_LIST_PATH = os.path.join(BASE_DIR, "GraphCategoryList", "GDELT-Global_Knowledge_Graph_CategoryList.xlsx") # <--- EDIT IF NEEDED
+
+# Path to the sqlite join store (only used if USE_JOIN_STORE is True): BASE, folder, file
+JOIN_STORE_PATH = os.path.join(OUTPUT_DIR, "JoinStore.sqlite") # <--- EDIT IF NEEDED
+USE_JOIN_STORE = False # If True, the whole range is joined at once in JOIN_STORE_PATH, which can be queried after the run
+
+# Streaming output (only used if OUTPUT_SINK is not None): BASE, folder
+# "parquet_dataset" (one file per timestamp under date=YYYYMMDD/hour=HH), "parquet_file" (one row group per timestamp) or "csv"
+OUTPUT_SINK = None # If not None, each joined timestamp is written right away and batch_result["joined_df"] is None
+SINK_DIR = os.path.join(OUTPUT_DIR, "JoinedStream") # <--- EDIT IF NEEDED
+
+# Follow mode: instead of the range below, keep processing each new timestamp published in lastupdate.txt
+# (written to a partitioned Parquet dataset in SINK_DIR, stop it with Ctrl+C)
+FOLLOW = False
+
+# Event window (only used with joincase="all"): hours of export events kept, so the mentions of a timestamp also find
+# the events first published in an earlier one. None joins each timestamp on its own
+EVENT_WINDOW_HOURS = None
  
 # Process ------------------------------------------------------------- DOWN --------------->
  
 if __name__ == "__main__":
+
+    # Log the progress of the processing to the console
+    configure_logging()
  
     # ======================== INPUTS TIME ==================================================
  
     # 1 ---> __init__ function --> arguments of the GDELTProcessor
  
+    # Cache of the downloaded zip files, so re-running the same timestamps with other filters needs no network
+    raw_cache = GDELTRawFileCache(
+        cache_dir=RAW_CACHE_DIR,
+        max_size_bytes=20 * 1024**3, # Optional: 20 GB, the least recently used files are evicted first (None = no limit)
+        masterfilelist_path=None, # Optional: local copy of masterfilelist.txt to validate the files with its md5 checksums
+        offline=False # If True, only the cache is read and nothing is downloaded
+    )
+
     # Here we need arguments: dictionary_path, output_dir, and optional column specifications
     processor = GDELTProcessor(
         # dictionary_path="./Dictionary/Dictionaries.xlsx",
@@ -75,7 +124,34 @@ if __name__ == "__main__":
             "ActionGeo_CountryCode",
             "NumMentions",
             "GoldsteinScale",
-            "AvgTone"]
+            "AvgTone"],
+        raw_cache=raw_cache, # Optional: None to always download
+        parse_chunksize=20000, # Optional: rows parsed at once per file (None = whole file at once)
+        max_ingest_memory_bytes=None, # Optional: stop a timestamp whose ingest needs more memory than this (e.g. 4 * 1024**3, approximate)
+        parse_engine="c", # Optional: "c" (default), "pyarrow" or "python" (slowest, used automatically for files the others cannot parse)
+        project_columns=True, # Optional: parse only the columns that are used (gkg_columns_to_drop and the columns not mapped are never loaded)
+        theme_engine="vectorized", # Optional: "vectorized" (default) or "python" (per cell, slower, same output)
+        join_engine="hash", # Optional: "hash" (default, in memory) or "sql" (through a sqlite database, same rows)
+        country_filter_engine="index", # Optional: "index" (default, CountryCode of each location) or "regex" (search of the codes between #...#, same rows)
+        filter_pushdown=True, # Optional: True (default) filters while parsing and before the theme processing, False after them (same rows)
+        themes_filter_engine="index", # Optional: "index" (default, theme ids of the theme index) or "python" (startswith per theme, same rows)
+        theme_index=GDELTThemeIndex(THEME_INDEX_PATH, category_list_path=CATEGORY_LIST_PATH), # Optional: None keeps the vocabulary in memory only
+        theme_output="strings", # Optional: "strings" (default, *_list_str text) or "compact" (Arrow lists of theme ids, save as "parquet")
+        dictionary_cache=True, # Optional: True (default) keeps the headers of Dictionaries.xlsx in Dictionaries.schema.json (read again when the xlsx changes)
+        mapping_engine="counts", # Optional: "counts" (default, value counts of the keys) or "lists" (list of mapped values per row, slower, same counts)
+        mapped_values=False, # Optional: True also keeps the "mapped ... values" lists in the key columns statistics (bigger files)
+        key_stats_engine="exact", # Optional: "exact" (default), "hll" (approximate unique values, fixed memory) or "strings" (original, no range statistics)
+        join_keys=True, # Optional: True (default) adds integer key columns when the files are loaded, so the joins and key checks compare integers
+        url_join="exact", # Optional: "exact" (default) or "canonical" (gkg_export: canonical URLs, also with the export rows of the last 24 hours)
+        # Optional: rollups of the joined rows computed per timestamp and merged over the range (batch_result["stats"]["aggregations"])
+        # group_by: joined columns, "theme" (one group per theme) or "location_country"; distinct_on counts each document once per group
+        aggregations={
+            "by_theme": GDELTAggregation(group_by=["theme"], measures=["gkg_ACTUAL_TONE"], distinct_on=["gkg_GKGRECORDID"]),
+            "by_timestamp": GDELTAggregation(group_by=["Time Stamp"], measures=["gkg_ACTUAL_TONE", "Export_GoldsteinScale"]),
+        },
+        keep_joined=True, # Optional: False does not keep the joined rows at all (only the statistics and the aggregations)
+        # Optional: documents and tone per theme and timestamp, written to THEME_SERIES_DIR (only the themes of the prefixes, None: all)
+        theme_series=GDELTThemeTimeSeries(THEME_SERIES_DIR, prefixes=["EPU", "TAX"])
     )
    
     # 2 ---> process_fileset function --> inputs used inside the GDELTProcessor
@@ -113,6 +189,32 @@ if __name__ == "__main__":
     runner = GDELTTimestampBatchRunner(processor) # we call our inputs in processor
     # -----------------------------------------------------------------------------
  
+    # Optional sink: the joined df of each timestamp is written as soon as it is processed (memory stays flat for long ranges)
+    if OUTPUT_SINK == "parquet_dataset":
+        sink = GDELTParquetDatasetSink(SINK_DIR)
+    elif OUTPUT_SINK == "parquet_file":
+        sink = GDELTParquetFileSink(os.path.join(SINK_DIR, "joined.parquet"))
+    elif OUTPUT_SINK == "csv":
+        sink = GDELTCSVAppendSink(os.path.join(SINK_DIR, "joined.csv"))
+    else:
+        sink = None
+
+    # Follow mode: runs until it is stopped, then prints the summary and ends here
+    if FOLLOW:
+        follow_result = runner.follow(
+            base_fileset=base_fileset,
+            sink=GDELTParquetDatasetSink(SINK_DIR), # Keeps working across restarts (one file per timestamp)
+            mapping_columns=mapping_columns,
+            poll_interval_seconds=60, # Time between two reads of lastupdate.txt when nothing new was published
+            max_backoff_seconds=900, # Maximum waiting time after an error (the waiting time doubles on each error)
+            max_retries=3, # Failures of a timestamp before it is skipped
+            event_window=GDELTEventWindow(EVENT_WINDOW_HOURS) if EVENT_WINDOW_HOURS else None
+        )
+        print(f"Timestamps processed: {len(follow_result['timestamps_processed'])}")
+        print(f"Timestamps failed: {len(follow_result['timestamps_failed'])}")
+        print(f"Mean latency from publication to output: {follow_result['latency']['mean_publication_to_written_seconds']} seconds")
+        raise SystemExit(0)
+
     # WE COME BACK TO INPUTS NOW
     batch_result = runner.run( # we call the function run using runner as inputs for __init__ in GDELTTimestampBatchRunner
         base_fileset=base_fileset,
@@ -121,7 +223,22 @@ if __name__ == "__main__":
         timestamp_end="20251202143000", # 02.Dec.2025, 14:30:00 (this will process 97 timestamps: 24hrs * 4 per hour + 1)
         on_error="raise", # It could also be "skip" to continue processing even if some timestamps fail
         return_mode="always_dict", # Otherwise "match_processor" to return in the same format as processor.process_fileset()
-        flatten_df_key_columns_stats=True # To save df_key_columns_stats as a single flattened dict (this is good for Excel export)
+        flatten_df_key_columns_stats=True, # To save df_key_columns_stats as a single flattened dict (this is good for Excel export)
+        download_workers=4, # 1 downloads each timestamp right before processing it, >1 downloads the next timestamps concurrently
+        max_connections_per_host=4, # Maximum simultaneous connections to the GDELT site (only when download_workers > 1)
+        max_pending_timestamps=8, # How many timestamps can be downloaded ahead of the processing (only when download_workers > 1)
+        process_workers=1, # 1 processes the timestamps here, >1 processes several timestamps at once in worker processes (same results)
+        # Optional: keep the rows of all timestamps in a sqlite file with indexed keys and join them with one query at the end
+        join_store=GDELTSQLiteJoinStore(
+            JOIN_STORE_PATH,
+            mentions_columns=processor.mentions_columns_to_map,
+            export_columns=processor.export_columns_to_map
+        ) if USE_JOIN_STORE else None,
+        sink=sink, # None keeps every joined df in memory and returns the concatenation in batch_result["joined_df"]
+        checkpoint=True, # Record each finished timestamp in OUTPUT_DIR/Checkpoint (manifest plus one shard per timestamp)
+        resume=False, # If True, the timestamps finished by an earlier (stopped) run with the same inputs are not processed again
+        # Optional: join the mentions with the export events of the last EVENT_WINDOW_HOURS (not only of their own timestamp)
+        event_window=GDELTEventWindow(EVENT_WINDOW_HOURS) if EVENT_WINDOW_HOURS else None
     )
 
     join_df_format = "xlsx" # Can be "csv", "xlsx", "parquet", "pkl" (pickle)
@@ -134,12 +251,19 @@ if __name__ == "__main__":
     # Extract timestamps for filename
     timestamp_range = f"{batch_result['timestamps_requested'][0]}-{batch_result['timestamps_requested'][-1]}"
     
-    # Save the joined df (this is always present regardless of statistics level)
-    processor.save_results(
-        batch_result["joined_df"], 
-        timestamp_range, 
-        format=join_df_format
-    )
+    # Save the joined df (this is always present regardless of statistics level, unless it was already written by the sink)
+    if batch_result["joined_df"] is not None:
+        processor.save_results(
+            batch_result["joined_df"], 
+            timestamp_range, 
+            format=join_df_format
+        )
+    elif "output" in batch_result:
+        print(f"Joined rows written by the sink: {batch_result['output']['rows']} in {batch_result['output']['path']}")
+
+    # Save the rollup of each aggregation over the range (GDELT_Joint_<range>_<name>)
+    for name, rollup in batch_result["stats"].get("aggregations", {}).items():
+        processor.save_results(rollup, f"{timestamp_range}_{name}", format=join_df_format)
  
     # Save key-column checkup workbook (only if base_fileset.statistics="key_columns_stats" or "all")
     # Check if we have the flattened stats (when flatten_df_key_columns_stats=True)
@@ -175,6 +299,13 @@ if __name__ == "__main__":
                     for metric_key, metric_value in metrics.items():
                         print(f"    {metric_key}: {metric_value}")
             
+            # Print the key column statistics of the whole range (a key repeated in several timestamps is counted once)
+            print("\nWhole range:")
+            for file_key, metrics in batch_result["stats"].get("key_columns_stats_range", {}).items():
+                print(f"  {file_key.upper()} File:")
+                for metric_key, metric_value in metrics.items():
+                    print(f"    {metric_key}: {metric_value}")
+            
             # Print mapping quality statistics
             print("\n" + "="*80)
             print("MAPPING QUALITY STATISTICS BY TIMESTAMP")
@@ -193,6 +324,20 @@ if __name__ == "__main__":
     print(f"Timestamps requested: {len(batch_result['timestamps_requested'])}")
     print(f"Timestamps processed: {len(batch_result['timestamps_processed'])}")
     print(f"Timestamps failed: {len(batch_result['timestamps_failed'])}")
+    # Matches of gkg with export by canonical URL against the exact join (only with url_join="canonical")
+    url_index_range = batch_result["stats"].get("url_index_range")
+    if url_index_range:
+        print(f"URL join match rate: {url_index_range['match_rate']:.2%} (exact join: {url_index_range.get('match_rate_exact', float('nan')):.2%})")
+
+    # Documents per timestamp with an EPU theme, from the theme series (only with theme_series)
+    if processor.theme_series is not None:
+        epu = processor.theme_series.query("EPU", batch_result["timestamps_requested"][0], batch_result["timestamps_requested"][-1], by_theme=False)
+        print(f"EPU theme hits per timestamp (mean over the range): {epu.iloc[:, 0].mean():.1f}")
+
+    # Matches of the mentions with the export events of the window against the same-timestamp join (only with event_window)
+    event_window_range = batch_result["stats"].get("event_window_range")
+    if event_window_range:
+        print(f"Event window match rate: {event_window_range['match_rate']:.2%} (same timestamp: {event_window_range.get('match_rate_exact', float('nan')):.2%})")
     
     # In case there were any timestamps that were not processed, please print
     if batch_result['timestamps_failed']:
@@ -202,7 +347,8 @@ if __name__ == "__main__":
             print(f"  {ts}: {error_msg}")
     
     # As summary please print the size of the joined df
-    print(f"\nFinal joined dataframe shape: {batch_result['joined_df'].shape}")
+    if batch_result["joined_df"] is not None:
+        print(f"\nFinal joined dataframe shape: {batch_result['joined_df'].shape}")
     print("="*80)
     
     # WHEN RETURN MODE WAS "match_processor" =======> comment or outcomment the block according to the inputs above
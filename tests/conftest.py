@@ -0,0 +1,15 @@
+"""
+Shared setup of the tests: the repository folder on the path, so the classes are imported
+as in GDELT_Process.py (from DataProcessingClasses.OOP_DirectGDELT_Processing import ...)
+
+Run them from the repository folder as:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+# Path of this file: .../tests/conftest.py, the repository is one folder up
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
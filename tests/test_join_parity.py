@@ -0,0 +1,130 @@
+"""
+Parity of the joins of DataJoiner: the "hash" engine (in memory) against the original "sql" engine (LEFT JOINs in sqlite),
+with duplicate keys, keys found on one side only, missing and blank keys, and with the key columns of GDELTJoinKeys
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataProcessingClasses.OOP_DirectGDELT_Processing import DataJoiner, GDELTJoinKeys
+
+
+MENTIONS_COLUMNS = ["MentionDocTone"]
+EXPORT_COLUMNS = ["Actor1Code", "AvgTone"]
+
+
+@pytest.fixture
+def gkg() -> pd.DataFrame:
+    """gkg rows: a repeated URL (g0, g4), a URL with spaces (g1), one without match (g2), a missing one (g3) and a blank one (g5)"""
+
+    return pd.DataFrame({
+        "gkg_GKGRECORDID": ["g0", "g1", "g2", "g3", "g4", "g5"],
+        "gkg_V2DOCUMENTIDENTIFIER": ["u1", "u2 ", "u3", np.nan, "u1", ""],
+        "gkg_ACTUAL_TONE": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+
+
+@pytest.fixture
+def mentions() -> pd.DataFrame:
+    """Mentions: two of u1 (one of an event missing in export), one of u2, a missing URL and a URL only found here"""
+
+    return pd.DataFrame({
+        "GlobalEventID": [10, 99, 12, 13, 13],
+        "MentionIdentifier": ["u1", "u1", "u2", np.nan, "u9"],
+        "MentionDocTone": [0.1, 0.2, 0.3, 0.4, 0.5],
+    })
+
+
+@pytest.fixture
+def export() -> pd.DataFrame:
+    """Events: two of u1, u2 with spaces, URLs only found here, a missing and a blank URL, and the event 10 twice"""
+
+    return pd.DataFrame({
+        "GlobalEventID": [10, 11, 12, 13, 14, 15, 10],
+        "SOURCEURL": ["u1", "u1", " u2", "u7", np.nan, "", "u8"],
+        "Actor1Code": ["A10", "A11", "A12", "A13", "A14", "A15", "A10b"],
+        "AvgTone": [-1.0, -2.0, -3.0, -4.0, -5.0, -6.0, -7.0],
+    })
+
+
+def _join(engine: str, gkg: pd.DataFrame, mentions, export) -> pd.DataFrame:
+    joiner = DataJoiner(MENTIONS_COLUMNS, EXPORT_COLUMNS, engine=engine)
+    return joiner.join(
+        gkg.copy(),
+        None if mentions is None else mentions.copy(),
+        None if export is None else export.copy()
+    )
+
+
+def _rows(df: pd.DataFrame, columns: list) -> list:
+    """Rows as tuples, missing values as None (the sql engine gives them as None or NaN depending on the type)"""
+
+    return [tuple(None if pd.isna(value) else value for value in row) for row in df[columns].itertuples(index=False)]
+
+
+def _assert_same_rows(expected: pd.DataFrame, actual: pd.DataFrame) -> None:
+    """Same columns and values row by row (numbers compared as float64, as the sql engine gives them)"""
+
+    assert list(expected.columns) == list(actual.columns)
+    assert len(expected) == len(actual)
+    for col in expected.columns:
+        a, b = expected[col].reset_index(drop=True), actual[col].reset_index(drop=True)
+        if pd.api.types.is_numeric_dtype(a.dtype) and pd.api.types.is_numeric_dtype(b.dtype):
+            np.testing.assert_allclose(a.astype("float64"), b.astype("float64"), rtol=1e-6, err_msg=col)
+        else:
+            assert _rows(a.to_frame(), [col]) == _rows(b.to_frame(), [col]), col
+
+
+@pytest.mark.parametrize("joincase", ["gkg_mentions", "gkg_export", "all"])
+def test_hash_join_gives_the_rows_of_the_sql_join(joincase: str, gkg, mentions, export) -> None:
+    mentions = mentions if joincase in ("gkg_mentions", "all") else None
+    export = export if joincase in ("gkg_export", "all") else None
+
+    _assert_same_rows(_join("sql", gkg, mentions, export), _join("hash", gkg, mentions, export))
+
+
+def test_gkg_export_keeps_every_gkg_row_and_repeats_the_duplicate_keys(gkg, export) -> None:
+    joined = _join("hash", gkg, None, export)
+
+    # g0 and g4 match both events of u1, g1 matches " u2" (spaces trimmed), g5 the blank URL,
+    # g2 and g3 have no event, and the events of u7, u8 and the missing URL are not joined
+    assert _rows(joined, ["gkg_GKGRECORDID", "Export_Actor1Code"]) == [
+        ("g0", "A10"), ("g0", "A11"),
+        ("g1", "A12"),
+        ("g2", None),
+        ("g3", None),
+        ("g4", "A10"), ("g4", "A11"),
+        ("g5", "A15"),
+    ]
+
+
+def test_all_joins_the_events_through_the_mentions(gkg, mentions, export) -> None:
+    joined = _join("hash", gkg, mentions, export)
+
+    # The event 10 is twice in export, the event 99 of the second u1 mention is not in export,
+    # and the mention of u9 (no gkg row) is not joined
+    assert _rows(joined, ["gkg_GKGRECORDID", "Mentions_MentionDocTone", "Export_Actor1Code"]) == [
+        ("g0", 0.1, "A10"), ("g0", 0.1, "A10b"), ("g0", 0.2, None),
+        ("g1", 0.3, "A12"),
+        ("g2", None, None),
+        ("g3", None, None),
+        ("g4", 0.1, "A10"), ("g4", 0.1, "A10b"), ("g4", 0.2, None),
+        ("g5", None, None),
+    ]
+
+
+@pytest.mark.parametrize("joincase", ["gkg_mentions", "gkg_export", "all"])
+def test_key_columns_give_the_rows_of_the_text_keys(joincase: str, gkg, mentions, export) -> None:
+    mentions = mentions if joincase in ("gkg_mentions", "all") else None
+    export = export if joincase in ("gkg_export", "all") else None
+    by_text = _join("hash", gkg, mentions, export)
+
+    # The integer key columns the loader adds to each file (see GDELTJoinKeys.add_key_columns)
+    gkg_keys = gkg.copy()
+    gkg_keys[GDELTJoinKeys.key_name("gkg_V2DOCUMENTIDENTIFIER")] = GDELTJoinKeys.url_keys(gkg["gkg_V2DOCUMENTIDENTIFIER"])
+    mentions_keys = None if mentions is None else GDELTJoinKeys.add_key_columns(mentions.copy(), "mentions")
+    export_keys = None if export is None else GDELTJoinKeys.add_key_columns(export.copy(), "export")
+    by_keys = GDELTJoinKeys.drop(_join("hash", gkg_keys, mentions_keys, export_keys))
+
+    _assert_same_rows(by_text, by_keys)
@@ -0,0 +1,123 @@
+"""
+Parity of the theme parsing: the "vectorized" theme engine of GKGProcessor (ThemeParser.explode_theme_column)
+against the reference per cell parsing (ThemeParser.parse_theme_cell, theme_engine="python")
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataProcessingClasses.OOP_DirectGDELT_Processing import GKGProcessor, ThemeParser
+
+
+# Theme cells that the parsing has to handle as parse_theme_cell does
+EDGE_V2_CELLS = [
+    "EPU_POLICY,12;TAX_FNCACT,40;",          # trailing ';'
+    "",                                       # empty cell
+    np.nan,                                   # missing cell
+    " ; ;",                                   # only empty tokens
+    "THEME_WITHOUT_NUMBER",                   # no offset
+    "EPU_ECONOMY,582;EPU_ECONOMY,827",        # same theme twice
+    "TAX_WORLDLANGUAGES,1.5;TAX_WORLDLANGUAGES,1.50",  # float offsets
+    "LEADER,abc",                             # offset that is not a number
+    " CRISISLEX_T03_DEAD , 7 ;MEDIA_MSM,,3",  # spaces and an empty offset
+    "WB_678_DIGITAL,8,9",                     # more than two parts
+    ",15;EPU_POLICY,20",                      # token without theme
+]
+EDGE_V1_CELLS = [
+    "EPU_POLICY;TAX_FNCACT;",
+    np.nan,
+    "",
+    "LEADER;",
+    "THEME_WITHOUT_NUMBER;EPU_ECONOMY",
+    "EPU_ECONOMY",
+    "TAX_WORLDLANGUAGES;TAX_FNCACT",
+    "LEADER",
+    "CRISISLEX_T03_DEAD; MEDIA_MSM ",
+    np.nan,
+    "EPU_POLICY",
+]
+
+FIXTURE_THEMES = [
+    "EPU_POLICY", "EPU_ECONOMY", "TAX_FNCACT", "TAX_WORLDLANGUAGES", "LEADER",
+    "ECON_STOCKMARKET", "GENERAL_GOVERNMENT", "CRISISLEX_CRISISLEXREC", "MEDIA_MSM", "WB_678_DIGITAL",
+]
+
+
+def _gkg_frame(v1_cells: list, v2_cells: list, keys: list) -> pd.DataFrame:
+    return pd.DataFrame({
+        "GKGRECORDID": [record for record, _ in keys],
+        "V2DOCUMENTIDENTIFIER": [url for _, url in keys],
+        "V1THEMES": v1_cells,
+        "V2ENHANCEDTHEMES": v2_cells,
+    })
+
+
+def _missing_as_none(series: pd.Series) -> list:
+    return [None if pd.isna(value) else value for value in series]
+
+
+@pytest.fixture
+def edge_gkg() -> pd.DataFrame:
+    """gkg rows with the edge cases of the theme cells (the last two rows share the key of the first one)"""
+
+    keys = [(f"20251201143000-{i}", f"https://example.com/{i}") for i in range(len(EDGE_V2_CELLS))]
+    keys[-2] = keys[0]
+    keys[-1] = keys[0]
+    return _gkg_frame(EDGE_V1_CELLS, EDGE_V2_CELLS, keys)
+
+
+@pytest.fixture
+def random_gkg() -> pd.DataFrame:
+    """Seeded gkg rows as the ones of the benchmark fixtures, with some repeated keys and missing cells"""
+
+    rng = random.Random(7)
+    v1_cells, v2_cells, keys = [], [], []
+    for i in range(500):
+        themes = rng.sample(FIXTURE_THEMES, rng.randint(0, 5))
+        v2_cells.append(";".join(f"{theme},{rng.randint(0, 5000)}" for theme in themes) if rng.random() > 0.05 else np.nan)
+        v1_cells.append(";".join(rng.sample(FIXTURE_THEMES, rng.randint(0, 4))) + ";")
+        record = rng.randint(0, 450)
+        keys.append((f"20251201143000-{record}", f"https://example.com/{record}"))
+    return _gkg_frame(v1_cells, v2_cells, keys)
+
+
+@pytest.mark.parametrize("frame", ["edge_gkg", "random_gkg"])
+def test_vectorized_engine_gives_the_reference_output(frame: str, request: pytest.FixtureRequest) -> None:
+    gkg = request.getfixturevalue(frame)
+
+    reference = GKGProcessor(theme_engine="python")._process_themes(gkg.copy())
+    vectorized = GKGProcessor(theme_engine="vectorized")._process_themes(gkg.copy())
+
+    assert list(vectorized.columns) == list(reference.columns)
+    pd.testing.assert_frame_equal(vectorized.astype(object), reference.astype(object))
+
+
+def test_explode_theme_column_matches_parse_theme_cell(edge_gkg: pd.DataFrame) -> None:
+    long = ThemeParser.explode_theme_column(edge_gkg["V2ENHANCEDTHEMES"])
+
+    expected = [
+        (row, item["Theme"], None if item["Number"] is None else str(item["Number"]))
+        for row, cell in enumerate(edge_gkg["V2ENHANCEDTHEMES"])
+        for item in ThemeParser.parse_theme_cell(cell)
+    ]
+    actual = list(zip(long["Row"].tolist(), long["Theme"].tolist(), _missing_as_none(long["Number"])))
+    assert actual == expected
+
+
+def test_numbers_are_formatted_as_the_reference() -> None:
+    long = ThemeParser.explode_theme_column(pd.Series(["A,12;B,1.50;C,abc;D"]))
+
+    assert _missing_as_none(long["Number"]) == ["12", "1.5", "abc", None]
+    assert [item["Number"] for item in ThemeParser.parse_theme_cell("A,12;B,1.50;C,abc;D")] == [12, 1.5, "abc", None]
+
+
+def test_empty_column_gives_empty_strings() -> None:
+    gkg = _gkg_frame([np.nan, ""], [np.nan, " ; "], [("1", "u1"), ("2", "u2")])
+
+    processed = GKGProcessor(theme_engine="vectorized")._process_themes(gkg)
+
+    assert processed["V2ENHANCEDTHEMES_list_str"].tolist() == ["", ""]
+    assert processed["Theme_row_common_str"].tolist() == ["", ""]